@@ -12,6 +12,8 @@ from dataclasses import dataclass
 import json
 import statistics
 
+from utils.db_executor import offload_db
+
 # 数据库相关导入
 try:
     from ..database.models import (
@@ -67,11 +69,12 @@ class LearningAnalyticsService:
         else:
             return await self._get_stats_from_cache(user_id, days)
 
-    async def _get_stats_from_db(self, user_id: str, days: int) -> LearningStats:
+    @offload_db
+    def _get_stats_from_db(self, user_id: str, days: int) -> LearningStats:
         """从数据库获取学习统计"""
 
         try:
-            with self.db_manager.get_session() as session:
+            with self.db_manager.get_read_session() as session:
                 # 获取指定天数内的学习会话
                 cutoff_date = datetime.now() - timedelta(days=days)
 
@@ -114,7 +117,7 @@ class LearningAnalyticsService:
 
                 # 计算进度百分比 (基于目标)
                 user = session.query(User).filter(User.user_id == user_id).first()
-                progress_percentage = await self._calculate_progress_percentage(user, session)
+                progress_percentage = self._calculate_progress_percentage(user, session)
 
                 return LearningStats(
                     total_sessions=total_sessions,
@@ -162,7 +165,7 @@ class LearningAnalyticsService:
             progress_percentage=min(total_sessions * 2, 100)  # 简单估算
         )
 
-    async def _calculate_progress_percentage(self, user, session) -> float:
+    def _calculate_progress_percentage(self, user, session) -> float:
         """计算学习进度百分比"""
 
         if not user or not user.target_jlpt_level:
@@ -209,11 +212,12 @@ class LearningAnalyticsService:
         else:
             return await self._identify_weak_areas_from_cache(user_id, limit)
 
-    async def _identify_weak_areas_from_db(self, user_id: str, limit: int) -> List[WeakArea]:
+    @offload_db
+    def _identify_weak_areas_from_db(self, user_id: str, limit: int) -> List[WeakArea]:
         """从数据库识别薄弱环节"""
 
         try:
-            with self.db_manager.get_session() as session:
+            with self.db_manager.get_read_session() as session:
                 # 分析学习进度中的薄弱环节
                 weak_progress = session.query(LearningProgress).filter(
                     and_(
@@ -319,11 +323,12 @@ class LearningAnalyticsService:
         else:
             return await self._get_trends_from_cache(user_id, days)
 
-    async def _get_trends_from_db(self, user_id: str, days: int) -> Dict[str, Any]:
+    @offload_db
+    def _get_trends_from_db(self, user_id: str, days: int) -> Dict[str, Any]:
         """从数据库获取学习趋势"""
 
         try:
-            with self.db_manager.get_session() as session:
+            with self.db_manager.get_read_session() as session:
                 cutoff_date = datetime.now() - timedelta(days=days)
 
                 # 按天分组获取学习数据
@@ -440,7 +445,8 @@ class VocabularyService:
                 user_id, word, reading, meaning, example_sentence, difficulty_level
             )
 
-    async def _add_vocabulary_to_db(
+    @offload_db
+    def _add_vocabulary_to_db(
             self, user_id: str, word: str, reading: str, meaning: str,
             example_sentence: str, difficulty_level: int
     ) -> bool:
@@ -521,11 +527,12 @@ class VocabularyService:
         else:
             return await self._get_due_vocabulary_from_cache(user_id, limit)
 
-    async def _get_due_vocabulary_from_db(self, user_id: str, limit: int) -> List[Dict[str, Any]]:
+    @offload_db
+    def _get_due_vocabulary_from_db(self, user_id: str, limit: int) -> List[Dict[str, Any]]:
         """从数据库获取待复习词汇"""
 
         try:
-            with self.db_manager.get_session() as session:
+            with self.db_manager.get_read_session() as session:
                 due_vocab = session.query(VocabularyProgress).filter(
                     and_(
                         VocabularyProgress.user_id == user_id,
@@ -583,7 +590,8 @@ class VocabularyService:
         else:
             return await self._update_review_in_cache(user_id, vocab_id, quality, response_time)
 
-    async def _update_review_in_db(
+    @offload_db
+    def _update_review_in_db(
             self, user_id: str, vocab_id: str, quality: int, response_time: float
     ) -> Dict[str, Any]:
         """在数据库中更新复习结果"""
@@ -724,7 +732,8 @@ class LearningServiceManager:
                 learning_points, vocabulary_learned, grammar_practiced, satisfaction_score
             )
 
-    async def _record_session_to_db(
+    @offload_db
+    def _record_session_to_db(
             self, user_id: str, session_type: str, duration_minutes: int,
             agents_used: List[str], learning_points: List[str], vocabulary_learned: List[str],
             grammar_practiced: List[str], satisfaction_score: int
@@ -15,7 +15,6 @@ try:
     from sqlalchemy import create_engine, event, pool
     from sqlalchemy.orm import sessionmaker, Session
     from sqlalchemy.engine import Engine
-    from sqlalchemy.pool import StaticPool
     import asyncpg
 
     DATABASE_AVAILABLE = True
@@ -75,6 +74,7 @@ class EnhancedDatabaseManager(DatabaseManager):
 
         self.engine = None
         self.SessionLocal = None
+        self.ReadSessionLocal = None
         self._connection_healthy = False
 
         self._setup_database()
@@ -99,6 +99,8 @@ class EnhancedDatabaseManager(DatabaseManager):
                 autoflush=False,
                 bind=self.engine
             )
+            if self.ReadSessionLocal is None:
+                self.ReadSessionLocal = self.SessionLocal
 
             # 测试连接
             self._test_connection()
@@ -110,16 +112,11 @@ class EnhancedDatabaseManager(DatabaseManager):
             raise
 
     def _setup_sqlite(self):
-        """配置SQLite"""
-        self.engine = create_engine(
-            self.config.database_url,
-            echo=self.config.debug_mode,
-            poolclass=StaticPool,
-            connect_args={
-                "check_same_thread": False,
-                "timeout": 20
-            }
-        )
+        """配置SQLite（使用共享引擎：WAL、busy_timeout 等连接设置与读写分离见 utils.db_engine）"""
+        from utils.db_engine import get_engine, get_sessionmaker
+        self.engine = get_engine(self.config.database_url)
+        # 只读查询走只读连接池，不占用写连接
+        self.ReadSessionLocal = get_sessionmaker(self.config.database_url, readonly=True)
 
     def _setup_postgresql(self):
         """配置PostgreSQL"""
@@ -153,17 +150,7 @@ class EnhancedDatabaseManager(DatabaseManager):
     def _setup_event_listeners(self):
         """设置数据库事件监听器"""
 
-        @event.listens_for(self.engine, "connect")
-        def set_sqlite_pragma(dbapi_connection, connection_record):
-            """SQLite优化设置"""
-            if self.config.database_url.startswith('sqlite'):
-                cursor = dbapi_connection.cursor()
-                cursor.execute("PRAGMA foreign_keys=ON")
-                cursor.execute("PRAGMA journal_mode=WAL")
-                cursor.execute("PRAGMA synchronous=NORMAL")
-                cursor.execute("PRAGMA temp_store=MEMORY")
-                cursor.execute("PRAGMA mmap_size=268435456")  # 256MB
-                cursor.close()
+        # SQLite 的 PRAGMA 由共享引擎在建立连接时统一设置（utils.db_engine）
 
         @event.listens_for(self.engine, "checkout")
         def receive_checkout(dbapi_connection, connection_record, connection_proxy):
@@ -279,6 +266,15 @@ class EnhancedDatabaseManager(DatabaseManager):
         finally:
             session.close()
 
+    @contextmanager
+    def get_read_session(self) -> Session:
+        """获取只读数据库会话（上下文管理器，只用于查询）"""
+        session = self.ReadSessionLocal()
+        try:
+            yield session
+        finally:
+            session.close()
+
     def get_session_simple(self) -> Session:
         """获取数据库会话（简单版本，需要手动管理）"""
         return self.SessionLocal()
@@ -4,9 +4,9 @@ Database Models for Japanese Learning Multi-Agent System
 日语学习多智能体系统的数据模型
 """
 
-from sqlalchemy import create_engine, Column, Integer, String, Text, Float, DateTime, Boolean, JSON, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, Float, DateTime, Boolean, JSON, ForeignKey
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import relationship, sessionmaker
+from sqlalchemy.orm import relationship
 from sqlalchemy.dialects.postgresql import UUID, ARRAY
 from datetime import datetime, date
 import uuid
@@ -298,8 +298,10 @@ class DatabaseManager:
     """数据库管理器"""
 
     def __init__(self, database_url: str):
-        self.engine = create_engine(database_url)
-        self.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
+        from utils.db_engine import get_engine, get_sessionmaker
+        self.engine = get_engine(database_url)
+        self.SessionLocal = get_sessionmaker(database_url)
+        self.ReadSessionLocal = get_sessionmaker(database_url, readonly=True)
 
     def create_tables(self):
         """创建所有表"""
@@ -309,6 +311,10 @@ class DatabaseManager:
         """获取数据库会话"""
         return self.SessionLocal()
 
+    def get_read_session(self):
+        """获取只读数据库会话（走只读连接池，只用于查询）"""
+        return self.ReadSessionLocal()
+
     def drop_tables(self):
         """删除所有表 - 仅用于开发环境"""
         Base.metadata.drop_all(bind=self.engine)
@@ -943,7 +943,10 @@
 """
 
 import asyncio
+import json
 import logging
+import sys
+import time
 from pathlib import Path
 from contextlib import asynccontextmanager
 from datetime import datetime
@@ -954,17 +957,31 @@ from pydantic import BaseModel
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import HTMLResponse, JSONResponse
+from fastapi.responses import HTMLResponse, JSONResponse, StreamingResponse, Response
 import uvicorn
 
 # 导入配置和工具
 from utils.config import settings
 from utils.database import init_database
+from utils.db_engine import dispose_engines
 from utils.websocket_manager import WebSocketManager
 from utils.llm_client import get_llm_client
+from utils.metrics import (
+    CONTENT_TYPE_LATEST, HTTP_REQUEST_DURATION, WEBSOCKET_CONNECTIONS, WEBSOCKET_SEND_QUEUE_DEPTH,
+    get_metrics_registry
+)
+from utils.tracing import current_trace_id, get_trace_store, orchestrator_stage, start_trace
+from utils.learning_queue import LearningEvent, get_learning_queue
+from utils.db_executor import run_db, shutdown_db_executor
+from utils.keyword_matcher import KeywordMatcher
 
 from src.api.routers.novel import router as novel_router
 
+# 进度追踪、迁移等模块按 data.* 导入（与 src/api/routers 一致），src 目录只在启动时加入一次
+SRC_DIR = str(Path(__file__).resolve().parent / 'src')
+if SRC_DIR not in sys.path:
+    sys.path.append(SRC_DIR)
+
 # 首先设置日志和创建logger
 from utils.logger import setup_logging
 
@@ -983,6 +1000,7 @@ try:
     from src.core.agents.core_agents.sato_coach import SatoCoach
     from src.core.agents.core_agents.mem_bot import MemBot
     from src.core.agents.core_agents.ai_analyzer import AIAnalyzer
+    from src.core.agents.agent_registry import get_shared_agents
 
     AGENTS_AVAILABLE = True
     logger.info("✅ 智能体已加载：田中 / 小美 / 山田 / 佐藤 / 记忆管家 / アイ")
@@ -1068,6 +1086,8 @@ except ImportError:
 
 # 全局变量
 websocket_manager = WebSocketManager()
+WEBSOCKET_CONNECTIONS.set_function(websocket_manager.get_connection_count)
+WEBSOCKET_SEND_QUEUE_DEPTH.set_function(websocket_manager.get_send_queue_depth)
 agents_system = None
 collaboration_manager = None
 
@@ -1084,12 +1104,36 @@ async def lifespan(app: FastAPI):
     # 初始化智能体系统
     await init_agents_system()
 
+    # 学习进度库迁移（为已有库补索引）
+    try:
+        await run_db(migrate_progress_database)
+    except Exception as e:
+        logger.error(f"学习进度库迁移失败: {e}")
+
+    # 小说库建表（只在启动时执行一次）
+    try:
+        from src.storage import novel_repo
+        await run_db(novel_repo.init_db)
+    except Exception as e:
+        logger.error(f"小说库初始化失败: {e}")
+
+    # 定期校正学习统计（增量计数的兜底）
+    reconcile_task = None
+    if settings.STATS_RECONCILE_INTERVAL > 0:
+        reconcile_task = asyncio.create_task(reconcile_stats_periodically(settings.STATS_RECONCILE_INTERVAL))
+
+    # 学习事件写后队列
+    await get_learning_queue().start()
+
     logger.info("✅ 系统初始化完成")
 
     yield
 
     # 关闭时清理
     logger.info("🛑 正在关闭系统...")
+    if reconcile_task:
+        reconcile_task.cancel()
+    await get_learning_queue().stop()
     await cleanup_resources()
     logger.info("✅ 系统已安全关闭")
 
@@ -1139,6 +1183,76 @@ async def add_utf8_header(request, call_next):
     return response
 
 
+@app.middleware("http")
+async def record_request_metrics(request, call_next):
+    """按路由模板记录请求耗时（流式响应只计到响应头返回）"""
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        HTTP_REQUEST_DURATION.observe(
+            time.perf_counter() - started,
+            method=request.method,
+            route=getattr(route, "path", "unmatched"),
+            status=str(status)
+        )
+
+
+@app.middleware("http")
+async def trace_requests(request, call_next):
+    """为 /api/ 请求开启一条 trace（沿用请求头 X-Trace-Id），响应头返回 trace id"""
+    path = request.url.path
+    if not path.startswith("/api/") or path.startswith("/api/v1/traces"):
+        return await call_next(request)
+
+    with start_trace(f"{request.method} {path}", trace_id=request.headers.get("x-trace-id")) as root:
+        response = await call_next(request)
+        if root is not None:
+            root.set_attribute("status", response.status_code)
+            response.headers["X-Trace-Id"] = current_trace_id()
+        return response
+
+
+def get_progress_summary_sync(user_id: str = "demo_user") -> Dict[str, Any]:
+    """读取学习进度摘要（同步，经 run_db 在数据库线程池中调用）"""
+    from data.repositories.progress_tracker import ProgressTracker
+
+    with ProgressTracker(readonly=True) as tracker:
+        return tracker.get_user_progress_summary(user_id)
+
+
+def reconcile_user_stats(user_id: str = "demo_user") -> Dict[str, int]:
+    """全表重新计数校正学习统计，返回修正量"""
+    from data.repositories.progress_tracker import ProgressTracker
+
+    with ProgressTracker() as tracker:
+        return tracker.reconcile_user_stats(user_id)
+
+
+def migrate_progress_database() -> List[int]:
+    """执行学习进度库的待执行迁移"""
+    from data.migrations import run_migrations
+    from data.models.base import engine
+
+    return run_migrations(engine)
+
+
+async def reconcile_stats_periodically(interval: float):
+    """后台任务：每隔 interval 秒校正一次学习统计"""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            drift = await run_db(reconcile_user_stats)
+            if any(drift.values()):
+                logger.warning(f"学习统计已校正: {drift}")
+        except Exception as e:
+            logger.error(f"校正学习统计失败: {e}")
+
+
 async def cleanup_resources():
     """清理系统资源"""
     try:
@@ -1158,6 +1272,10 @@ async def cleanup_resources():
             if hasattr(agent, 'save_state'):
                 await agent.save_state()
 
+    # 关闭数据库线程池与所有共享引擎的连接
+    shutdown_db_executor()
+    dispose_engines()
+
 
 async def init_agents_system():
     global agents_system, collaboration_manager
@@ -1166,15 +1284,8 @@ async def init_agents_system():
     if not AGENTS_AVAILABLE:
         raise RuntimeError("智能体模块导入失败：已禁止Mock回退，请修复导入后再启动。")
 
-    # 2) 正常情况下，实例化 6 个真实智能体
-    agents_system = {
-        'tanaka': TanakaSensei(),
-        'koumi': KoumiAgent(),
-        'yamada': YamadaSensei(),
-        'sato': SatoCoach(),
-        'membot': MemBot(),
-        'ai': AIAnalyzer(),
-    }
+    # 2) 正常情况下，取进程级共享的 6 个真实智能体（工作流/路由复用同一套实例）
+    agents_system = get_shared_agents()
 
     # 3) 保持你现有的协作管理器用法（无需改动其它代码）
     collaboration_manager = MixedCollaborationManager(agents_system)
@@ -1276,15 +1387,18 @@ class MultiAgentCollaborationHandler:
 
         try:
             # 1. 获取所有智能体的响应
-            responses = await self._get_agent_responses(request)
+            with orchestrator_stage("handler", "collect"):
+                responses = await self._get_agent_responses(request)
 
             # 2. 检测分歧
-            disagreements = await self._detect_disagreements(responses, request.message)
+            with orchestrator_stage("handler", "detect_disagreements"):
+                disagreements = await self._detect_disagreements(responses, request.message)
 
             # 3. 生成共识和建议
-            consensus, final_recommendation = await self._generate_consensus(
-                responses, disagreements, request.collaboration_mode
-            )
+            with orchestrator_stage("handler", "consensus"):
+                consensus, final_recommendation = await self._generate_consensus(
+                    responses, disagreements, request.collaboration_mode
+                )
 
             # 4. 确定是否需要用户仲裁
             user_arbitration_needed = len(disagreements) > 0 and any(
@@ -1315,7 +1429,8 @@ class MultiAgentCollaborationHandler:
             "session_id": request.session_id,
             "scene": request.scene_context,
             "collaboration_mode": request.collaboration_mode,
-            "history": []  # 可以从数据库加载历史记录
+            "history": [],  # 可以从数据库加载历史记录
+            "trace_id": current_trace_id()
         }
 
         # 并发获取所有智能体响应
@@ -1359,11 +1474,14 @@ class MultiAgentCollaborationHandler:
             # 获取智能体实例
             agent = self.agents[agent_id]
 
-            # 调用智能体处理
-            result = await agent.process_user_input(
-                user_input=message,
-                session_context=session_context,
-                scene=session_context.get("scene", "general")
+            # 调用智能体处理（超时视为失败，由 _get_agent_responses 降级）
+            result = await asyncio.wait_for(
+                agent.process_user_input(
+                    user_input=message,
+                    session_context=session_context,
+                    scene=session_context.get("scene", "general")
+                ),
+                timeout=settings.AGENT_RESPONSE_TIMEOUT
             )
 
             # 构建响应
@@ -1491,47 +1609,212 @@ class MultiAgentCollaborationHandler:
             return None, f"建议生成过程中出现错误：{str(e)}"
 
 
+# 简单冲突检测：(前项, 后项) 关键词对，一条回复含前项、另一条含后项即视为观点冲突
+CONFLICT_PAIRS = [
+    ('正确', '错误'), ('对', '不对'), ('应该', '不应该'),
+    ('建议', '不建议'), ('推荐', '不推荐')
+]
+CONFLICT_MATCHER = KeywordMatcher({
+    "first": [word1 for word1, _ in CONFLICT_PAIRS],
+    "second": [word2 for _, word2 in CONFLICT_PAIRS],
+}, lower=True)
+
+
 class MixedCollaborationManager:
     """混合协作管理器 - 支持真实和模拟智能体"""
 
-    def __init__(self, agents):
+    def __init__(self, agents, agent_timeout: Optional[float] = None, deadline: Optional[float] = None):
         self.agents = agents
+        # 单个智能体超时 / 整轮截止时间（秒）：慢智能体不会拖住整轮对话，超时后返回已完成的部分结果
+        # （流式模式下 agent_timeout 是相邻两段输出之间的最长间隔）
+        self.agent_timeout = agent_timeout if agent_timeout is not None else settings.AGENT_RESPONSE_TIMEOUT
+        self.deadline = deadline if deadline is not None else settings.COLLABORATION_DEADLINE
 
     async def process_user_input(self, session_id: str, user_input: str, active_agents: list, scene: str):
-        """处理用户输入 - 混合模式"""
-        responses = []
+        """处理用户输入 - 混合模式（并发处理，按 active_agents 顺序返回全部回应）"""
+        responses = [
+            response async for response in self.iter_user_input(session_id, user_input, active_agents, scene)
+        ]
+        return self._sort_by_agent_order(responses, active_agents)
+
+    async def iter_user_input(self, session_id: str, user_input: str, active_agents: list, scene: str,
+                              session_context: Optional[Dict[str, Any]] = None):
+        """
+        处理用户输入 - 按完成顺序逐个产出回应
+
+        所有智能体同时开始处理，哪个先完成就先产出哪个（asyncio.as_completed 语义），
+        调用方可以在每个智能体完成后立即推送，而不必等待最慢的智能体。
+        超过整轮截止时间仍未完成的智能体会被取消，并产出超时降级回应。
+        """
+        pending = {
+            asyncio.create_task(
+                self._get_user_input_response(agent_id, session_id, user_input, scene, session_context)
+            ): agent_id
+            for agent_id in active_agents
+            if agent_id in self.agents
+        }
 
-        for agent_id in active_agents:
-            if agent_id in self.agents:
-                agent = self.agents[agent_id]
+        try:
+            for next_done in asyncio.as_completed(list(pending), timeout=self.deadline):
+                yield await next_done
+        except asyncio.TimeoutError:
+            unfinished = [agent_id for task, agent_id in pending.items() if not task.done()]
+            logger.warning(f"⏰ 协作超过截止时间 {self.deadline}s，未完成的智能体: {unfinished}")
+            for agent_id in unfinished:
+                yield self._fallback_response(agent_id, timeout=True)
+        finally:
+            # 截止或调用方提前停止迭代（如连接断开）时，取消尚未完成的智能体调用
+            for task in pending:
+                if not task.done():
+                    task.cancel()
+
+    async def _get_user_input_response(self, agent_id: str, session_id: str, user_input: str, scene: str,
+                                       session_context: Optional[Dict[str, Any]] = None) -> Dict:
+        """获取单个智能体的回应，超时或失败时降级为简单回应"""
+        agent = self.agents[agent_id]
 
-                try:
-                    if hasattr(agent, 'process_user_input') and not hasattr(agent, 'is_mock'):
-                        # 真实智能体（如田中先生）
-                        response = await agent.process_user_input(
-                            user_input=user_input,
-                            session_context={"session_id": session_id},
-                            scene=scene
-                        )
-                        responses.append(response)
-                    else:
-                        # 模拟智能体
-                        response = await agent.process_user_input(user_input, {}, scene)
-                        responses.append(response)
-
-                except Exception as e:
-                    logger.error(f"❌ 智能体 {agent_id} 处理失败: {e}")
-                    # 降级到简单回应
-                    fallback_response = {
-                        "content": f"{agent.name}正在思考中，请稍等...\n\n**中文提示：** 智能体暂时无法回应。",
-                        "agent_id": agent_id,
-                        "agent_name": agent.name,
-                        "emotion": "🤔",
-                        "error": True
-                    }
-                    responses.append(fallback_response)
+        try:
+            if hasattr(agent, 'process_user_input') and not hasattr(agent, 'is_mock'):
+                # 真实智能体（如田中先生）
+                call = agent.process_user_input(
+                    user_input=user_input,
+                    session_context=session_context if session_context is not None else {"session_id": session_id},
+                    scene=scene
+                )
+            else:
+                # 模拟智能体
+                call = agent.process_user_input(user_input, {}, scene)
 
-        return responses
+            return await asyncio.wait_for(call, timeout=self.agent_timeout)
+
+        except asyncio.TimeoutError:
+            logger.warning(f"⏰ 智能体 {agent_id} 超过 {self.agent_timeout}s 未响应")
+            return self._fallback_response(agent_id, timeout=True)
+        except Exception as e:
+            logger.error(f"❌ 智能体 {agent_id} 处理失败: {e}")
+            return self._fallback_response(agent_id)
+
+    def _fallback_response(self, agent_id: str, timeout: bool = False) -> Dict:
+        """降级回应"""
+        agent = self.agents[agent_id]
+        response = {
+            "content": f"{agent.name}正在思考中，请稍等...\n\n**中文提示：** 智能体暂时无法回应。",
+            "agent_id": agent_id,
+            "agent_name": agent.name,
+            "emotion": "🤔",
+            "error": True
+        }
+        if timeout:
+            response["timeout"] = True
+        return response
+
+    def _timeout_response(self, agent_id: str, chunks: List[str]) -> Dict:
+        """流式输出超时：已推送过文本时以这段文本作为回应（truncated），否则使用降级回应"""
+        content = "".join(chunks)
+        if not content:
+            return self._fallback_response(agent_id, timeout=True)
+        agent = self.agents[agent_id]
+        return {
+            "content": content,
+            "agent_id": agent_id,
+            "agent_name": agent.name,
+            "emotion": getattr(agent, "current_emotion", "🤔"),
+            "timeout": True,
+            "truncated": True
+        }
+
+    @staticmethod
+    def _sort_by_agent_order(responses: List[Dict], active_agents: list) -> List[Dict]:
+        """按 active_agents 顺序排列回应"""
+        order = {agent_id: i for i, agent_id in enumerate(active_agents)}
+        return sorted(responses, key=lambda r: order.get(r.get("agent_id"), len(order)))
+
+    async def stream_user_input(self, session_id: str, user_input: str, active_agents: list, scene: str):
+        """
+        处理用户输入 - 流式模式
+
+        所有智能体并发生成，事件按到达顺序交错产出：
+        (agent_id, {"type": "delta", "content": ...}) 若干次，
+        最后 (agent_id, {"type": "done", "result": {...}})，result 与 process_user_input 中的单条回应同构。
+        agent_timeout 在流式模式下限制相邻两段输出的间隔（首段也一样），而不是整段输出的总时长；
+        某个智能体超时或整轮超过截止时间时：已经推送过文本的，以这段文本作为回应并标记 truncated，
+        还没有任何输出的，以降级回应作为该智能体的 done 事件。
+        """
+        queue: asyncio.Queue = asyncio.Queue()
+        agent_ids = [agent_id for agent_id in active_agents if agent_id in self.agents]
+        finished = set()
+        # 已推送给调用方的文本（截止时间到时用来结束未完成的智能体）
+        yielded: Dict[str, List[str]] = {agent_id: [] for agent_id in agent_ids}
+
+        async def pump(agent_id: str):
+            queued: List[str] = []
+            try:
+                await self._stream_agent(agent_id, session_id, user_input, scene, queue, queued)
+            except asyncio.TimeoutError:
+                logger.warning(f"⏰ 智能体 {agent_id} 流式输出超过 {self.agent_timeout}s 没有新内容")
+                await queue.put((agent_id, {"type": "done", "result": self._timeout_response(agent_id, queued)}))
+            except Exception as e:
+                logger.error(f"❌ 智能体 {agent_id} 流式处理失败: {e}")
+                await queue.put((agent_id, {"type": "done", "result": self._fallback_response(agent_id)}))
+
+        tasks = [asyncio.create_task(pump(agent_id)) for agent_id in agent_ids]
+        loop = asyncio.get_running_loop()
+        deadline_at = loop.time() + self.deadline
+
+        try:
+            while len(finished) < len(agent_ids):
+                remaining = deadline_at - loop.time()
+                try:
+                    agent_id, event = await asyncio.wait_for(queue.get(), timeout=max(remaining, 0))
+                except asyncio.TimeoutError:
+                    unfinished = [agent_id for agent_id in agent_ids if agent_id not in finished]
+                    logger.warning(f"⏰ 协作超过截止时间 {self.deadline}s，未完成的智能体: {unfinished}")
+                    for agent_id in unfinished:
+                        yield agent_id, {"type": "done",
+                                         "result": self._timeout_response(agent_id, yielded[agent_id])}
+                    break
+
+                if event["type"] == "delta":
+                    yielded[agent_id].append(event["content"])
+                elif event["type"] == "done":
+                    finished.add(agent_id)
+                yield agent_id, event
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    async def _stream_agent(self, agent_id: str, session_id: str, user_input: str, scene: str,
+                            queue: asyncio.Queue, queued: List[str]):
+        """
+        把单个智能体的流式事件写入队列，已写入的增量文本同时记入 queued；
+        等待下一个事件超过 agent_timeout 时抛出 asyncio.TimeoutError
+        """
+        agent = self.agents[agent_id]
+
+        if hasattr(agent, 'process_user_input_stream'):
+            stream = agent.process_user_input_stream(
+                user_input=user_input,
+                session_context={"session_id": session_id},
+                scene=scene
+            )
+            try:
+                while True:
+                    try:
+                        event = await asyncio.wait_for(stream.__anext__(), timeout=self.agent_timeout)
+                    except StopAsyncIteration:
+                        break
+                    if event["type"] == "delta":
+                        queued.append(event["content"])
+                    await queue.put((agent_id, event))
+            finally:
+                await stream.aclose()
+        else:
+            # 不支持流式的智能体：一次性产出完整回应
+            response = await asyncio.wait_for(agent.process_user_input(user_input, {}, scene),
+                                              timeout=self.agent_timeout)
+            await queue.put((agent_id, {"type": "delta", "content": response.get("content", "")}))
+            await queue.put((agent_id, {"type": "done", "result": response}))
 
     async def multi_agent_collaboration(
             self,
@@ -1544,43 +1827,31 @@ class MixedCollaborationManager:
 
         responses = []
         conflicts = []
-
-        # 1. 获取所有智能体的初始回复
-        for agent_id in active_agents:
-            if agent_id in self.agents:
-                try:
-                    agent = self.agents[agent_id]
-                    response = await agent.process_user_input(
-                        user_input=user_input,
-                        session_context=session_context or {},
-                        scene=mode
-                    )
-
-                    # 添加额外信息
-                    response['agent_id'] = agent_id
-                    response['confidence'] = 0.8  # 可以后续优化
-                    response['timestamp'] = datetime.now().isoformat()
-
-                    responses.append(response)
-
-                except Exception as e:
-                    logger.error(f"智能体 {agent_id} 处理失败: {e}")
-                    # 添加错误回复
-                    responses.append({
-                        "content": f"{self.agents[agent_id].name}正在思考中，请稍等...",
-                        "agent_id": agent_id,
-                        "agent_name": self.agents[agent_id].name,
-                        "emotion": "🤔",
-                        "error": True,
-                        "confidence": 0.0,
-                        "timestamp": datetime.now().isoformat()
-                    })
+        session_context = session_context or {}
+
+        # 1. 并发获取所有智能体的初始回复（超时的智能体以降级回复代替）
+        with orchestrator_stage("mixed", "collect"):
+            async for response in self.iter_user_input(
+                    session_id=session_context.get("session_id", ""),
+                    user_input=user_input,
+                    active_agents=active_agents,
+                    scene=mode,
+                    session_context=session_context
+            ):
+                # 添加额外信息
+                response['confidence'] = 0.0 if response.get("error") else 0.8  # 可以后续优化
+                response['timestamp'] = datetime.now().isoformat()
+                responses.append(response)
+
+        responses = self._sort_by_agent_order(responses, active_agents)
 
         # 2. 简单的冲突检测
-        conflicts = self._detect_simple_conflicts(responses)
+        with orchestrator_stage("mixed", "detect_disagreements"):
+            conflicts = self._detect_simple_conflicts(responses)
 
         # 3. 生成最终建议
-        final_recommendation = self._generate_collaboration_summary(responses, mode)
+        with orchestrator_stage("mixed", "consensus"):
+            final_recommendation = self._generate_collaboration_summary(responses, mode)
 
         return {
             "responses": responses,
@@ -1591,31 +1862,29 @@ class MixedCollaborationManager:
             "agents_participated": active_agents
         }
 
+    @staticmethod
+    def _conflict_masks(content: str):
+        """一次匹配得到 (前项位掩码, 后项位掩码)：第 k 位表示第 k 组冲突词的前项 / 后项出现"""
+        hits = CONFLICT_MATCHER.scan(content)
+        first = sum(1 << k for k, (word1, _) in enumerate(CONFLICT_PAIRS) if word1 in hits)
+        second = sum(1 << k for k, (_, word2) in enumerate(CONFLICT_PAIRS) if word2 in hits)
+        return first, second
+
     def _detect_simple_conflicts(self, responses: List[Dict]) -> List[Dict]:
-        """简单的冲突检测"""
+        """简单的冲突检测（每条回复扫描一次，两两比较只做位运算）"""
         conflicts = []
+        masks = [self._conflict_masks(resp.get('content', '')) for resp in responses]
 
-        # 检查是否有智能体给出明显不同的建议
+        # 检查是否有智能体给出明显不同的建议：前者含某组前项、后者含同组后项
         for i, resp1 in enumerate(responses):
             for j, resp2 in enumerate(responses[i + 1:], i + 1):
-                content1 = resp1.get('content', '').lower()
-                content2 = resp2.get('content', '').lower()
-
-                # 简单的冲突关键字检测
-                conflict_pairs = [
-                    ('正确', '错误'), ('对', '不对'), ('应该', '不应该'),
-                    ('建议', '不建议'), ('推荐', '不推荐')
-                ]
-
-                for word1, word2 in conflict_pairs:
-                    if word1 in content1 and word2 in content2:
-                        conflicts.append({
-                            "agent1": resp1.get('agent_id', ''),
-                            "agent2": resp2.get('agent_id', ''),
-                            "conflict_point": f"关于用户问题的不同观点",
-                            "conflict_id": f"conflict_{i}_{j}"
-                        })
-                        break
+                if masks[i][0] & masks[j][1]:
+                    conflicts.append({
+                        "agent1": resp1.get('agent_id', ''),
+                        "agent2": resp2.get('agent_id', ''),
+                        "conflict_point": f"关于用户问题的不同观点",
+                        "conflict_id": f"conflict_{i}_{j}"
+                    })
 
         return conflicts
 
@@ -1678,10 +1947,22 @@ async def health_check():
         "version": "1.0.0",
         "agents_available": AGENTS_AVAILABLE,
         "api_routes_available": API_ROUTES_AVAILABLE,
-        "websocket": "ready"
+        "websocket": "ready",
+        "learning_queue": get_learning_queue().get_stats()
     })
 
 
+# 智能体显示名 -> agent_id
+AGENT_NAME_TO_ID = {
+    "田中先生": "tanaka",
+    "小美": "koumi",
+    "アイ": "ai",
+    "山田先生": "yamada",
+    "佐藤教练": "sato",
+    "记忆管家": "membot"
+}
+
+
 # 新增: 聊天API端点
 @app.post("/api/v1/chat/send")
 async def send_chat_message(request: ChatRequest):
@@ -1690,16 +1971,7 @@ async def send_chat_message(request: ChatRequest):
         logger.info(f"收到聊天请求: 用户={request.user_id}, 智能体={request.agent_name}")
 
         # 将agent_name映射到agent_id
-        agent_mapping = {
-            "田中先生": "tanaka",
-            "小美": "koumi",
-            "アイ": "ai",
-            "山田先生": "yamada",
-            "佐藤教练": "sato",
-            "记忆管家": "membot"
-        }
-
-        agent_id = agent_mapping.get(request.agent_name, request.agent_name.lower())
+        agent_id = AGENT_NAME_TO_ID.get(request.agent_name, request.agent_name.lower())
 
         # 获取指定的智能体
         if agent_id in agents_system:
@@ -1759,6 +2031,50 @@ async def send_chat_message(request: ChatRequest):
         )
 
 
+# 新增: 流式聊天API端点（SSE）
+@app.post("/api/v1/chat/stream")
+async def stream_chat_message(request: ChatRequest):
+    """
+    流式发送聊天消息到指定智能体
+
+    以 text/event-stream 返回，每个事件的 data 为一个 JSON 帧：
+    - {"type": "agent_delta", ...}     增量文本
+    - {"type": "agent_response", ...}  完整回应（最后一条）
+    - {"type": "error", ...}           出错
+    """
+    agent_id = AGENT_NAME_TO_ID.get(request.agent_name, request.agent_name.lower())
+
+    async def event_stream():
+        if not agents_system or agent_id not in agents_system:
+            logger.warning(f"请求的智能体不存在: {request.agent_name}")
+            yield _sse({"type": "error", "content": f"智能体 {request.agent_name} 不存在"})
+            return
+
+        try:
+            async for event_agent_id, event in collaboration_manager.stream_user_input(
+                    session_id=request.session_id,
+                    user_input=request.message,
+                    active_agents=[agent_id],
+                    scene=request.scene_context or "general"
+            ):
+                if event["type"] == "delta":
+                    yield _sse(_agent_delta_frame(
+                        event_agent_id, agents_system[event_agent_id].name, event["content"]
+                    ))
+                else:
+                    yield _sse(_agent_response_frame(event["result"]))
+        except Exception as e:
+            logger.error(f"流式聊天请求处理出错: {str(e)}")
+            yield _sse({"type": "error", "content": "服务器内部错误，请稍后再试。"})
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+
+def _sse(payload: dict) -> str:
+    """格式化一条 SSE 事件"""
+    return f"data: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+
 # 新增: 多智能体协作API端点
 @app.post("/api/v1/chat/multi-agent-collaboration", response_model=MultiAgentChatResponse)
 async def multi_agent_collaboration(request: MultiAgentChatRequest):
@@ -1925,17 +2241,33 @@ async def health_check():
     }
 
 
+@app.get("/api/v1/traces")
+async def list_traces(limit: int = 50):
+    """最近完成的请求 trace 摘要（新的在前）"""
+    return {"traces": [trace.summary() for trace in get_trace_store().recent(limit)]}
+
+
+@app.get("/api/v1/traces/{trace_id}")
+async def get_trace(trace_id: str):
+    """导出单条 trace（含全部 span）"""
+    trace = get_trace_store().get(trace_id)
+    if trace is None:
+        raise HTTPException(status_code=404, detail="trace不存在或已过期")
+    return trace.to_dict()
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus 指标（文本格式）"""
+    return Response(get_metrics_registry().render(), media_type=CONTENT_TYPE_LATEST)
+
+
 # 添加到main.py末尾
 @app.get("/api/v1/progress/summary")
 async def get_progress_summary(user_id: str = "demo_user"):
     """获取学习进度摘要"""
     try:
-        import sys
-        sys.path.append('src')
-        from data.repositories.progress_tracker import ProgressTracker
-
-        tracker = ProgressTracker()
-        summary = tracker.get_user_progress_summary(user_id)
+        summary = await run_db(get_progress_summary_sync, user_id)
 
         return {
             "success": True,
@@ -1948,6 +2280,22 @@ async def get_progress_summary(user_id: str = "demo_user"):
         }
 
 
+async def enqueue_learning_event(
+        user_input: str,
+        agent_responses: dict,
+        session_id: str,
+        scene_context: str = "general"
+) -> tuple:
+    """提取学习数据（纯计算）并放入写后队列，返回 (learning_data, 是否入队)"""
+    from data.repositories.progress_tracker import collect_learning_data
+
+    learning_data = collect_learning_data(user_input, agent_responses)
+    queued = await get_learning_queue().put(
+        LearningEvent(user_input, agent_responses, session_id, scene_context)
+    )
+    return learning_data, queued
+
+
 @app.post("/api/v1/progress/track")
 async def track_learning_progress(
         user_input: str,
@@ -1955,19 +2303,15 @@ async def track_learning_progress(
         session_id: str,
         scene_context: str = "general"
 ):
-    """手动追踪学习进度"""
+    """手动追踪学习进度（写入由学习事件队列异步完成）"""
     try:
-        import sys
-        sys.path.append('src')
-        from data.repositories.progress_tracker import ProgressTracker
-
-        tracker = ProgressTracker()
-        learning_data = tracker.extract_learning_data(
+        learning_data, queued = await enqueue_learning_event(
             user_input, agent_responses, session_id, scene_context
         )
 
         return {
             "success": True,
+            "queued": queued,
             "learning_data": {
                 "grammar_points_count": len(learning_data.get('grammar_points', [])),
                 "vocabulary_count": len(learning_data.get('vocabulary', [])),
@@ -1982,6 +2326,22 @@ async def track_learning_progress(
         }
 
 
+@app.post("/api/v1/progress/reconcile")
+async def reconcile_progress_stats(user_id: str = "demo_user"):
+    """按需校正学习统计（全表重新计数）"""
+    try:
+        drift = await run_db(reconcile_user_stats, user_id)
+        return {
+            "success": True,
+            "drift": drift
+        }
+    except Exception as e:
+        return {
+            "success": False,
+            "error": str(e)
+        }
+
+
 # =================== WebSocket 路由 ===================
 
 @app.websocket("/ws/{session_id}")
@@ -2045,6 +2405,7 @@ async def handle_chat_message(session_id: str, data: dict):
     user_input = data.get("content", "")
     active_agents = data.get("active_agents", ["tanaka"])
     scene = data.get("scene", "grammar")
+    stream = data.get("stream", False)  # 客户端可选择接收 agent_delta 流式帧
 
     if not user_input.strip():
         return
@@ -2058,28 +2419,29 @@ async def handle_chat_message(session_id: str, data: dict):
     })
 
     try:
-        # 使用协作管理器处理消息
-        responses = await collaboration_manager.process_user_input(
-            session_id=session_id,
-            user_input=user_input,
-            active_agents=active_agents,
-            scene=scene
-        )
-
-        # 逐个发送智能体回应
-        for i, response in enumerate(responses):
-            # 添加延迟模拟真实对话
-            await asyncio.sleep(i * 0.5 + 0.5)
-
-            await websocket_manager.send_message(session_id, {
-                "type": "agent_response",
-                "agent_id": response["agent_id"],
-                "agent_name": response["agent_name"],
-                "content": response["content"],
-                "emotion": response.get("emotion", "😊"),
-                "is_mock": response.get("is_mock", False),
-                "timestamp": str(asyncio.get_event_loop().time())
-            })
+        if stream:
+            # 流式：边生成边发送 agent_delta，每个智能体结束后发送完整 agent_response
+            async for agent_id, event in collaboration_manager.stream_user_input(
+                    session_id=session_id,
+                    user_input=user_input,
+                    active_agents=active_agents,
+                    scene=scene
+            ):
+                if event["type"] == "delta":
+                    await websocket_manager.send_message(session_id, _agent_delta_frame(
+                        agent_id, agents_system[agent_id].name, event["content"]
+                    ))
+                else:
+                    await websocket_manager.send_message(session_id, _agent_response_frame(event["result"]))
+        else:
+            # 每个智能体完成后立即发送（按完成顺序，不做服务端延迟；打字节奏由客户端自行控制）
+            async for response in collaboration_manager.iter_user_input(
+                    session_id=session_id,
+                    user_input=user_input,
+                    active_agents=active_agents,
+                    scene=scene
+            ):
+                await websocket_manager.send_message(session_id, _agent_response_frame(response))
 
         # 发送学习进度更新（模拟）
         await websocket_manager.send_message(session_id, {
@@ -2097,6 +2459,31 @@ async def handle_chat_message(session_id: str, data: dict):
         })
 
 
+def _agent_delta_frame(agent_id: str, agent_name: str, delta: str) -> dict:
+    """构建 agent_delta 帧（流式增量文本）"""
+    return {
+        "type": "agent_delta",
+        "agent_id": agent_id,
+        "agent_name": agent_name,
+        "delta": delta,
+        "timestamp": str(asyncio.get_event_loop().time())
+    }
+
+
+def _agent_response_frame(response: dict) -> dict:
+    """构建 agent_response 帧（完整回应）"""
+    return {
+        "type": "agent_response",
+        "agent_id": response["agent_id"],
+        "agent_name": response["agent_name"],
+        "content": response["content"],
+        "emotion": response.get("emotion", "😊"),
+        "is_mock": response.get("is_mock", False),
+        "truncated": response.get("truncated", False),
+        "timestamp": str(asyncio.get_event_loop().time())
+    }
+
+
 async def handle_agent_toggle(session_id: str, data: dict):
     """处理智能体切换"""
     agent_id = data.get("agent_id")
@@ -2198,11 +2585,6 @@ async def track_simple(
     agent_content: str = ""
 ):
     try:
-        import sys
-        sys.path.append('src')
-        from data.repositories.progress_tracker import ProgressTracker
-        
-        tracker = ProgressTracker()
         agent_responses = {
             agent_name: {
                 'content': agent_content,
@@ -2210,12 +2592,13 @@ async def track_simple(
             }
         }
         
-        learning_data = tracker.extract_learning_data(
+        learning_data, queued = await enqueue_learning_event(
             user_input, agent_responses, session_id, 'general'
         )
         
         return {
             'success': True,
+            'queued': queued,
             'message': '学习数据追踪成功',
             'learning_data': {
                 'grammar_points': len(learning_data.get('grammar_points', [])),
@@ -2235,11 +2618,6 @@ async def track_progress_simple(
     session_id: str
 ):
     try:
-        import sys
-        sys.path.append('src')
-        from data.repositories.progress_tracker import ProgressTracker
-        
-        tracker = ProgressTracker()
         agent_responses = {
             agent_name: {
                 'content': agent_content,
@@ -2247,12 +2625,13 @@ async def track_progress_simple(
             }
         }
         
-        learning_data = tracker.extract_learning_data(
+        learning_data, queued = await enqueue_learning_event(
             user_input, agent_responses, session_id, 'general'
         )
         
         return {
             'success': True,
+            'queued': queued,
             'message': '学习数据追踪成功',
             'learning_data': {
                 'grammar_points': len(learning_data.get('grammar_points', [])),
@@ -0,0 +1,221 @@
+# 上游LLM替身服务：离线压测 / CI 用，兼容 OpenAI /chat/completions 协议
+#
+# 用法：
+#   python mock_llm_api.py --port 8001 --latency lognormal:-1.5,0.5 --tps 40 --rate-limit 0.05
+#   DEEPSEEK_API_BASE=http://127.0.0.1:8001/v1 python main.py
+#
+# 运行时可通过 POST /mock/profile 修改延迟 / 速率 / 错误注入配置。
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import random
+import time
+from dataclasses import asdict, dataclass, fields
+from typing import Any, Dict, List, Optional
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+
+@dataclass
+class MockProfile:
+    """替身服务行为配置"""
+    latency: str = "fixed:0.05"     # 首包延迟分布：fixed:s / uniform:a,b / normal:mean,std / lognormal:mu,sigma
+    tokens_per_second: float = 50.0  # 输出速率（<=0 表示不限速）
+    error_rate: float = 0.0          # 返回 500 的概率
+    rate_limit_rate: float = 0.0     # 返回 429 的概率
+    retry_after: float = 1.0         # 429 响应的 Retry-After（秒）
+    seed: Optional[int] = None       # 随机种子（延迟 / 错误注入可复现）
+
+    @classmethod
+    def from_env(cls) -> "MockProfile":
+        seed = os.getenv("MOCK_LLM_SEED")
+        return cls(
+            latency=os.getenv("MOCK_LLM_LATENCY", cls.latency),
+            tokens_per_second=float(os.getenv("MOCK_LLM_TPS", cls.tokens_per_second)),
+            error_rate=float(os.getenv("MOCK_LLM_ERROR_RATE", cls.error_rate)),
+            rate_limit_rate=float(os.getenv("MOCK_LLM_RATE_LIMIT_RATE", cls.rate_limit_rate)),
+            retry_after=float(os.getenv("MOCK_LLM_RETRY_AFTER", cls.retry_after)),
+            seed=int(seed) if seed else None
+        )
+
+
+def sample_latency(spec: str, rng: random.Random) -> float:
+    """按分布描述采样延迟（秒）"""
+    kind, _, args = spec.partition(":")
+    params = [float(x) for x in args.split(",") if x.strip()]
+    if kind == "fixed":
+        value = params[0]
+    elif kind == "uniform":
+        value = rng.uniform(params[0], params[1])
+    elif kind == "normal":
+        value = rng.gauss(params[0], params[1])
+    elif kind == "lognormal":
+        value = rng.lognormvariate(params[0], params[1])
+    else:
+        raise ValueError(f"不支持的延迟分布: {spec}")
+    return max(0.0, value)
+
+
+# 按系统提示词识别智能体，返回固定风格的回复（同一输入总是得到同一回复）
+CANNED_REPLIES = {
+    "田中先生": [
+        "はい、いい質問ですね。この文の文法を確認しましょう。\n\n**中文解释：** 这个句子的语法结构是正确的，注意助词的用法。",
+        "その表現は少し不自然です。「～ています」を使いましょう。\n\n**中文解释：** 表示持续状态时应使用「～ています」。",
+    ],
+    "小美": [
+        "やっほ〜！いい感じだよ😊 その言い方、すごく自然！\n\n**中文：** 这个说法很自然哦～",
+        "わかる〜！日本の若者もよくそう言うよね✨\n\n**中文：** 日本年轻人也经常这么说呢！",
+    ],
+    "山田先生": [
+        "なるほど、それには深い文化的背景がございます。\n\n**中文：** 这背后有着深厚的文化背景。",
+        "昔から日本では季節を大切にしてまいりました。\n\n**中文：** 日本自古以来就很重视季节。",
+    ],
+    "佐藤教练": [
+        "JLPT対策として、この文法はN3レベルです。毎日練習しましょう！\n\n**中文：** 这是N3级别语法，坚持每天练习！",
+        "目標を決めて、計画的に勉強しましょう。\n\n**中文：** 定好目标，有计划地学习吧。",
+    ],
+    "アイ": [
+        "分析結果：あなたの正答率は上昇傾向にあります。\n\n**中文：** 分析显示你的正确率呈上升趋势。",
+        "データによると、助詞の誤りが最も多いです。\n\n**中文：** 数据显示助词错误最多。",
+    ],
+    "MemBot": [
+        "記録しました。次の復習は明日です。\n\n**中文：** 已记录，下次复习在明天。",
+        "今日の学習内容を保存しました。\n\n**中文：** 今天的学习内容已保存。",
+    ],
+}
+DEFAULT_REPLIES = ["はい、承知しました。\n\n**中文：** 好的，明白了。"]
+
+
+def canned_reply(messages: List[Dict[str, str]]) -> str:
+    system_prompt = next((m.get("content") or "" for m in messages if m.get("role") == "system"), "")
+    replies = next((r for name, r in CANNED_REPLIES.items() if name in system_prompt[:50]), DEFAULT_REPLIES)
+    last_user = next((m.get("content") or "" for m in reversed(messages) if m.get("role") == "user"), "")
+    index = int(hashlib.md5(last_user.encode("utf-8")).hexdigest(), 16) % len(replies)
+    return replies[index]
+
+
+def _split_tokens(text: str) -> List[str]:
+    """按 2 个字符切分为“token”（中日文约 1~2 字 1 token）"""
+    return [text[i:i + 2] for i in range(0, len(text), 2)]
+
+
+def create_app(profile: Optional[MockProfile] = None) -> FastAPI:
+    app = FastAPI(title="Mock LLM API")
+    app.state.profile = profile or MockProfile.from_env()
+    app.state.rng = random.Random(app.state.profile.seed)
+    app.state.stats = {"requests": 0, "errors": 0, "rate_limited": 0, "streams": 0}
+
+    @app.get("/health")
+    async def health():
+        return {"status": "healthy"}
+
+    @app.get("/mock/profile")
+    async def get_profile():
+        return {"profile": asdict(app.state.profile), "stats": app.state.stats}
+
+    @app.post("/mock/profile")
+    async def update_profile(changes: Dict[str, Any]):
+        allowed = {f.name for f in fields(MockProfile)}
+        for key, value in changes.items():
+            if key in allowed:
+                setattr(app.state.profile, key, value)
+        if "seed" in changes:
+            app.state.rng = random.Random(app.state.profile.seed)
+        return {"profile": asdict(app.state.profile)}
+
+    @app.post("/chat/completions")
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        profile: MockProfile = app.state.profile
+        rng: random.Random = app.state.rng
+        stats = app.state.stats
+        stats["requests"] += 1
+
+        await asyncio.sleep(sample_latency(profile.latency, rng))
+
+        roll = rng.random()
+        if roll < profile.rate_limit_rate:
+            stats["rate_limited"] += 1
+            return JSONResponse(
+                status_code=429,
+                content={"error": {"message": "Rate limit exceeded", "type": "rate_limit_error"}},
+                headers={"Retry-After": str(profile.retry_after)}
+            )
+        if roll < profile.rate_limit_rate + profile.error_rate:
+            stats["errors"] += 1
+            return JSONResponse(status_code=500, content={"error": {"message": "Injected error", "type": "server_error"}})
+
+        messages = body.get("messages", [])
+        content = canned_reply(messages)
+        max_tokens = body.get("max_tokens")
+        tokens = _split_tokens(content)
+        if max_tokens:
+            tokens = tokens[:max_tokens]
+        completion_id = f"chatcmpl-mock-{stats['requests']}"
+        model = body.get("model") or "mock-model"
+        delay = 1.0 / profile.tokens_per_second if profile.tokens_per_second > 0 else 0.0
+        prompt_tokens = sum(len(m.get("content") or "") for m in messages) // 2
+
+        if body.get("stream"):
+            stats["streams"] += 1
+
+            async def event_stream():
+                for token in tokens:
+                    if delay:
+                        await asyncio.sleep(delay)
+                    chunk = {
+                        "id": completion_id, "object": "chat.completion.chunk", "created": int(time.time()),
+                        "model": model,
+                        "choices": [{"index": 0, "delta": {"content": token}, "finish_reason": None}]
+                    }
+                    yield f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n"
+                yield "data: [DONE]\n\n"
+
+            return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+        await asyncio.sleep(delay * len(tokens))
+        return {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": "".join(tokens)},
+                "finish_reason": "stop"
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": len(tokens),
+                "total_tokens": prompt_tokens + len(tokens)
+            }
+        }
+
+    return app
+
+
+app = create_app()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="OpenAI 兼容的上游LLM替身服务")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency", help="延迟分布，如 fixed:0.05 / lognormal:-1.5,0.5")
+    parser.add_argument("--tps", type=float, help="每秒输出 token 数")
+    parser.add_argument("--error-rate", type=float)
+    parser.add_argument("--rate-limit", type=float, help="429 注入概率")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    profile = MockProfile.from_env()
+    for attr, value in [("latency", args.latency), ("tokens_per_second", args.tps), ("error_rate", args.error_rate),
+                        ("rate_limit_rate", args.rate_limit), ("seed", args.seed)]:
+        if value is not None:
+            setattr(profile, attr, value)
+
+    uvicorn.run(create_app(profile), host=args.host, port=args.port)
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🎌 build_compression_dict - 日语学习Multi-Agent系统
+
+训练 utils.compression 使用的 zlib 预置字典：
+- 语料：已存储的对话记录（--db，学习进度库的 conversation_learning / 主库的 conversation_history），
+  以及对话回复样本文件（--replies，每行一个 {"user_input", "agent_responses"}，默认 tests/fixtures/conversation_replies.jsonl）；
+  每条对话按 ProgressTracker 实际写入的列内容序列化（agent_responses 与去重后的 learning_points）
+- 方法：按 8 字节片段（d-mer）统计在多少个样本中出现，贪心挑选覆盖高频片段最多的 64 字节段，
+  直到字典写满；越常用的段放在越靠后（zlib 优先匹配离当前位置更近的内容）
+- 评估：每隔 1/holdout 条对话留出一条不参与训练，报告留出样本在无字典 / 各已发布字典 / 新字典下的
+  压缩率与每条的压缩、解压耗时
+
+字典一经发布不可修改（已写入的数据用它解压），重新训练时写入新的编号并在 DICTIONARIES 中登记：
+
+    python scripts/build_compression_dict.py --output utils/compression_dicts/ja_zh_v3.dict
+    python scripts/build_compression_dict.py --db database/japanese_learning.db --output ...
+"""
+
+import argparse
+import heapq
+import json
+import sqlite3
+import sys
+import time
+import zlib
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from src.data.repositories.progress_tracker import collect_learning_data, compact_learning_points  # noqa: E402
+from utils.compression import (  # noqa: E402
+    DICTIONARIES, LEVEL, decompress_json, dumps_json, load_dictionary
+)
+
+DEFAULT_REPLIES = PROJECT_ROOT / 'tests' / 'fixtures' / 'conversation_replies.jsonl'
+
+DMER = 8
+SEGMENT = 64
+DICT_SIZE = 8 * 1024
+
+
+def _stored_columns(user_input: str, agent_responses: Dict) -> List[bytes]:
+    """一条对话写入 conversation_learning 时两个压缩列的原始 JSON"""
+    learning_points = compact_learning_points(collect_learning_data(user_input, agent_responses), agent_responses)
+    return [dumps_json(agent_responses), dumps_json(learning_points)]
+
+
+def _db_conversations(db_path: str) -> Iterable[List[bytes]]:
+    conn = sqlite3.connect(db_path)
+    try:
+        tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        if 'conversation_learning' in tables:
+            for row in conn.execute(
+                "SELECT agent_responses, learning_points FROM conversation_learning LIMIT 5000"
+            ):
+                yield [dumps_json(decompress_json(value)) for value in row if value]
+        if 'conversation_history' in tables:
+            for user_input, value in conn.execute(
+                "SELECT user_input, agent_responses FROM conversation_history "
+                "WHERE agent_responses IS NOT NULL LIMIT 5000"
+            ):
+                yield _stored_columns(user_input or '', json.loads(value))
+    finally:
+        conn.close()
+
+
+def collect_conversations(db_paths: Iterable[str] = (), replies_path: Optional[Path] = DEFAULT_REPLIES
+                          ) -> List[List[bytes]]:
+    """收集对话样本；每条对话是它在库中各列的序列化内容"""
+    conversations = []
+    for db_path in db_paths:
+        conversations.extend(_db_conversations(db_path))
+    if replies_path:
+        with open(replies_path, encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    item = json.loads(line)
+                    conversations.append(_stored_columns(item['user_input'], item['agent_responses']))
+    return conversations
+
+
+def split_holdout(conversations: List[List[bytes]], holdout: int) -> Tuple[List[bytes], List[bytes]]:
+    """每 holdout 条对话留出一条用于评估（holdout=0 时全部用于训练），返回 (训练样本, 评估样本)"""
+    train, test = [], []
+    for index, columns in enumerate(conversations):
+        (test if holdout and index % holdout == holdout - 1 else train).extend(columns)
+    return train, test
+
+
+def measure(samples: List[bytes], zdict: Optional[bytes], rounds: int = 50) -> Dict[str, float]:
+    """样本逐条压缩（与列存储一致）的总压缩率与每条的压缩 / 解压耗时（微秒，取 rounds 轮中最快的一轮）"""
+    def compress_all() -> List[bytes]:
+        blobs = []
+        for sample in samples:
+            compressor = zlib.compressobj(LEVEL, zdict=zdict) if zdict else zlib.compressobj(LEVEL)
+            blobs.append(compressor.compress(sample) + compressor.flush())
+        return blobs
+
+    def decompress_all() -> None:
+        for blob in blobs:
+            decompressor = zlib.decompressobj(zdict=zdict) if zdict else zlib.decompressobj()
+            decompressor.decompress(blob)
+
+    def per_sample_us(func) -> float:
+        best = min(_elapsed(func) for _ in range(rounds))
+        return best / len(samples) * 1e6
+
+    blobs = compress_all()
+    # 列中实际存的是 compress_bytes 的结果（含 2 字节头，压缩后不更小时存原文）
+    stored = sum(min(len(blob) + 2, len(sample) + 1) for blob, sample in zip(blobs, samples))
+    return {
+        'ratio': sum(len(sample) for sample in samples) / stored,
+        'compress_us': per_sample_us(compress_all),
+        'decompress_us': per_sample_us(decompress_all),
+    }
+
+
+def _elapsed(func) -> float:
+    started = time.perf_counter()
+    func()
+    return time.perf_counter() - started
+
+
+def train_dictionary(samples: List[bytes], size: int = DICT_SIZE,
+                     dmer: int = DMER, segment: int = SEGMENT) -> bytes:
+    """贪心选段：每段得分为其中尚未被覆盖的 d-mer 的出现样本数之和"""
+    frequency = Counter()
+    for sample in samples:
+        frequency.update({sample[i:i + dmer] for i in range(len(sample) - dmer + 1)})
+
+    def score(sample: bytes, start: int) -> int:
+        window = sample[start:start + segment]
+        return sum(frequency[d] for d in {window[i:i + dmer] for i in range(len(window) - dmer + 1)})
+
+    heap = []
+    for index, sample in enumerate(samples):
+        for start in range(0, max(1, len(sample) - segment + 1), dmer):
+            heap.append((-score(sample, start), index, start))
+    heapq.heapify(heap)
+
+    chosen, total = [], 0
+    while heap and total < size:
+        negative, index, start = heapq.heappop(heap)
+        current = score(samples[index], start)
+        if current <= 0:
+            continue
+        if heap and current < -heap[0][0]:
+            # 得分因已选段而下降，放回堆中重新排序
+            heapq.heappush(heap, (-current, index, start))
+            continue
+        window = samples[index][start:start + segment]
+        chosen.append(window)
+        total += len(window)
+        for i in range(len(window) - dmer + 1):
+            frequency[window[i:i + dmer]] = 0
+
+    # 先选中的（最常用的）放在最后
+    return b''.join(reversed(chosen))[-size:]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='训练 JSON 列压缩字典')
+    parser.add_argument('--output', required=True, help='新字典文件（已发布的字典文件不要覆盖）')
+    parser.add_argument('--db', action='append', default=[],
+                        help='已存储对话的 SQLite 库（可重复），其中的对话记录作为语料')
+    parser.add_argument('--replies', default=str(DEFAULT_REPLIES),
+                        help='对话回复样本 JSONL；传空字符串则只用 --db 中的对话')
+    parser.add_argument('--holdout', type=int, default=4, help='每 N 条对话留出一条评估（0 表示不评估）')
+    parser.add_argument('--size', type=int, default=DICT_SIZE)
+    args = parser.parse_args()
+
+    conversations = collect_conversations(args.db, Path(args.replies) if args.replies else None)
+    train, test = split_holdout(conversations, args.holdout)
+    dictionary = train_dictionary(train, args.size)
+    output = Path(args.output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_bytes(dictionary)
+    print(f'{len(conversations)} 条对话 / {len(train)} 个训练样本 -> {output} ({len(dictionary)} 字节)')
+
+    if test:
+        print(f'留出 {len(test)} 个样本（{sum(map(len, test))} 字节）逐条压缩：')
+        candidates = [('无字典', None)] + [(name, load_dictionary(i)) for i, name in DICTIONARIES.items()]
+        for name, zdict in candidates + [(output.name, dictionary)]:
+            result = measure(test, zdict)
+            print(f"  {name:<16} 压缩率 {result['ratio']:.2f}x  "
+                  f"压缩 {result['compress_us']:.1f}µs/条  解压 {result['decompress_us']:.1f}µs/条")
+
+
+if __name__ == '__main__':
+    main()
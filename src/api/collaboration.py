@@ -4,16 +4,9 @@ from pydantic import BaseModel, Field
 
 # 进度追踪
 def track_learning_async(user_input: str, agent_responses: dict, session_id: str):
-    try:
-        import requests
-        requests.post("http://localhost:8000/api/v1/progress/track",
-                     json={
-                         "user_input": user_input,
-                         "agent_responses": agent_responses,
-                         "session_id": session_id
-                     }, timeout=1)
-    except:
-        pass
+    """放入学习事件写后队列（不阻塞，不发 HTTP 请求）"""
+    from utils.learning_queue import LearningEvent, get_learning_queue
+    get_learning_queue().submit(LearningEvent(user_input, agent_responses, session_id))
 
 # === 修改现有的 multi_agent_chat 函数 ===
 @router.post("/multi-agent-chat", response_model=MultiAgentChatResponse)
@@ -1,10 +1,11 @@
 # src/api/routers/novel.py
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query
 from pydantic import BaseModel, Field
 from typing import List, Dict, Any, Optional
 from importlib import import_module
 
 from src.core.workflows import novel_collab as flow
+from utils.db_executor import run_db
 
 router = APIRouter()
 
@@ -160,17 +161,17 @@ class SaveIn(BaseModel):
 async def save(payload: SaveIn):
     try:
         from src.storage import novel_repo as repo
-        return repo.save_project(payload.session_id, payload.project, payload.outline, payload.manuscript)
+        return await run_db(repo.save_project, payload.session_id, payload.project, payload.outline, payload.manuscript)
     except HTTPException:
         raise
     except Exception as e:
         return {"error": f"{type(e).__name__}: {e}"}
 
 @router.get("/load")
-async def load(session_id: str, project: str):
+async def load(session_id: str, project: str, offset: int = Query(0, ge=0), limit: Optional[int] = Query(None, ge=1)):
     try:
         from src.storage import novel_repo as repo
-        data = repo.load_project(session_id, project)
+        data = await run_db(repo.load_project, session_id, project, offset, limit)
         return data or {"not_found": True}
     except HTTPException:
         raise
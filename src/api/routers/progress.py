@@ -7,33 +7,39 @@ import os
 # 添加src路径
 sys.path.append(os.path.join(os.path.dirname(__file__), '../..'))
 
+from utils.db_executor import run_db
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api/v1/progress", tags=["progress"])
 
-progress_tracker = None
 
+def get_progress_tracker(readonly: bool = False):
+    """每次调用新建追踪器（会话不能跨数据库线程池的线程共享），用完需 close() 或用 with"""
+    try:
+        from data.repositories.progress_tracker import ProgressTracker
+        return ProgressTracker(readonly=readonly)
+    except Exception as e:
+        logger.error(f"无法初始化进度追踪器: {e}")
+        return None
 
-def get_progress_tracker():
-    global progress_tracker
-    if progress_tracker is None:
-        try:
-            from data.repositories.progress_tracker import ProgressTracker
-            progress_tracker = ProgressTracker()
-        except Exception as e:
-            logger.error(f"无法初始化进度追踪器: {e}")
-            return None
-    return progress_tracker
+
+def _load_summary(user_id: str):
+    """读取进度摘要（同步，在数据库线程池中执行）；追踪器不可用时返回 None"""
+    tracker = get_progress_tracker(readonly=True)
+    if not tracker:
+        return None
+    with tracker:
+        return tracker.get_user_progress_summary(user_id)
 
 
 @router.get("/summary")
 async def get_progress_summary(user_id: str = "demo_user"):
     try:
-        tracker = get_progress_tracker()
-        if not tracker:
+        summary = await run_db(_load_summary, user_id)
+        if summary is None:
             raise HTTPException(status_code=500, detail="进度追踪器未初始化")
-        summary = tracker.get_user_progress_summary(user_id)
         return {"success": True, "data": summary}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"获取进度失败: {str(e)}")
@@ -52,16 +58,17 @@ async def track_learning(
         if not user_input or not session_id:
             return {"success": False, "error": "缺少必要参数"}
 
-        tracker = get_progress_tracker()
-        if not tracker:
-            return {"success": False, "error": "进度追踪器未初始化"}
-
-        learning_data = tracker.extract_learning_data(
-            user_input, agent_responses, session_id, scene_context
+        # 提取是纯计算，不需要追踪器或数据库会话；落库交给写后队列，不在事件循环上做同步数据库 I/O
+        from data.repositories.progress_tracker import collect_learning_data
+        from utils.learning_queue import LearningEvent, get_learning_queue
+        learning_data = collect_learning_data(user_input, agent_responses)
+        queued = await get_learning_queue().put(
+            LearningEvent(user_input, agent_responses, session_id, scene_context)
         )
 
         return {
             "success": True,
+            "queued": queued,
             "learning_data": {
                 "grammar_points_count": len(learning_data.get('grammar_points', [])),
                 "vocabulary_count": len(learning_data.get('vocabulary', [])),
@@ -76,10 +83,9 @@ async def track_learning(
 @router.get("/recommendations")
 async def get_learning_recommendations(user_id: str = "demo_user"):
     try:
-        tracker = get_progress_tracker()
-        if not tracker:
+        summary = await run_db(_load_summary, user_id)
+        if summary is None:
             raise HTTPException(status_code=500, detail="进度追踪器未初始化")
-        summary = tracker.get_user_progress_summary(user_id)
         return {
             "success": True,
             "recommendations": summary.get('recommendations', []),
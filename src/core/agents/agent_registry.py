@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+"""
+进程级智能体注册表
+
+全进程共享同一套真实智能体实例：main.py 启动时创建（或注册）一次，
+协作编排器、语法/小说工作流和路由都从这里取，不再在每次请求时重新实例化
+（MemBot 初始化会读取 data/memory_data.json，重复创建代价较高）。
+"""
+import logging
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+_shared_agents: Optional[Dict[str, Any]] = None
+
+
+def create_agents() -> Dict[str, Any]:
+    """实例化全部 6 个真实智能体"""
+    from .core_agents.tanaka_sensei import TanakaSensei
+    from .core_agents.koumi import KoumiAgent
+    from .core_agents.yamada_sensei import YamadaSensei
+    from .core_agents.sato_coach import SatoCoach
+    from .core_agents.mem_bot import MemBot
+    from .core_agents.ai_analyzer import AIAnalyzer
+
+    return {
+        'tanaka': TanakaSensei(),
+        'koumi': KoumiAgent(),
+        'yamada': YamadaSensei(),
+        'sato': SatoCoach(),
+        'membot': MemBot(),
+        'ai': AIAnalyzer(),
+    }
+
+
+def get_shared_agents() -> Dict[str, Any]:
+    """获取全局共享的智能体字典（首次调用时创建）"""
+    global _shared_agents
+    if _shared_agents is None:
+        _shared_agents = create_agents()
+        logger.info(f"🤖 共享智能体已创建: {list(_shared_agents)}")
+    return _shared_agents
+
+
+def register_shared_agents(agents: Dict[str, Any]) -> None:
+    """注册外部创建的智能体字典为全局共享实例"""
+    global _shared_agents
+    _shared_agents = agents
+
+
+def reset_shared_agents() -> None:
+    """清空共享实例（测试用）"""
+    global _shared_agents
+    _shared_agents = None
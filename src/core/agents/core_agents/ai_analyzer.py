@@ -5,19 +5,37 @@
 import logging
 from typing import Dict, Any, Optional, List
 from datetime import datetime
-from .base_agent import BaseAgent
+from .base_agent import BaseAgent, traced_agent_call
+from utils.keyword_matcher import KeywordMatcher
 from utils.llm_client import get_llm_client
 from dotenv import load_dotenv
 load_dotenv()
 
 logger = logging.getLogger(__name__)
 
+# 学习点：类别 -> 关键词
+LEARNING_POINT_MATCHER = KeywordMatcher({
+    "学习分析": ["分析", "データ", "進捗", "効率", "評価", "改善"],
+    "学习指标": ["正確率", "理解度", "習得", "復習", "練習"],
+})
+
+# 针对性建议：建议 -> 触发关键词
+SUGGESTION_MATCHER = KeywordMatcher({
+    "建议定期查看学习进度分析": ["進捗", "进度", "progress"],
+    "可以使用AI推荐的高效学习方法": ["効率", "效率", "efficiency"],
+    "建议重点攻克识别出的薄弱环节": ["弱点", "問題", "困难"],
+})
+
 
 class AIAnalyzer(BaseAgent):
     """
     アイ - AI数据分析师
     """
 
+    llm_temperature = 0.2  # 低温度保持分析的准确性
+    llm_max_tokens = 1200
+    response_emotion = "🔍"
+
     def __init__(self):
         super().__init__(
             agent_id="ai",
@@ -83,6 +101,7 @@ class AIAnalyzer(BaseAgent):
 - 建议要具体可行
 - 注重学习效率和效果的平衡"""
 
+    @traced_agent_call
     async def process_message(
             self,
             message: str,
@@ -91,28 +110,26 @@ class AIAnalyzer(BaseAgent):
     ) -> Dict[str, Any]:
         """处理用户消息"""
         try:
-            # 构建对话消息
-            messages = [
-                {"role": "user", "content": message}
-            ]
-
-            # 如果有上下文，添加历史对话
-            if context and "history" in context:
-                history_messages = context["history"][-4:]
-                messages = history_messages + messages
+            # 构建对话消息（最近4轮历史 + 当前消息）
+            messages = self._build_llm_messages(message, context)
 
             # 调用LLM获取回复
             response = await self.llm_client.chat_completion(
                 messages=messages,
-                temperature=0.2,  # 低温度保持分析的准确性
+                temperature=self.llm_temperature,
                 system_prompt=self.system_prompt,
-                max_tokens=1200
+                max_tokens=self.llm_max_tokens,
+                cache=self.llm_cache,
+                agent=self.agent_id
             )
 
             if response is None:
                 response = self._get_fallback_response(message)
                 logger.warning("LLM API调用失败，使用备用回复")
 
+            # 记录到本会话的对话记忆
+            self.add_to_memory(message, response, context)
+
             # 分析学习数据
             learning_points = self._extract_learning_points(message, response)
 
@@ -140,6 +157,7 @@ class AIAnalyzer(BaseAgent):
                 "timestamp": datetime.now().isoformat()
             }
 
+    @traced_agent_call
     async def process_user_input(self, user_input: str, session_context: dict, scene: str = "analysis"):
         """
         处理用户输入 - 实现抽象方法
@@ -272,19 +290,12 @@ AI分析系统已启动。
 
     def _extract_learning_points(self, user_message: str, response: str) -> List[str]:
         """从分析中提取学习要点"""
-        learning_points = []
-
-        # 检测分析相关内容
-        analysis_patterns = ["分析", "データ", "進捗", "効率", "評価", "改善"]
-        for pattern in analysis_patterns:
-            if pattern in user_message or pattern in response:
-                learning_points.append(f"学习分析: {pattern}")
-
-        # 检测学习指标
-        metrics_patterns = ["正確率", "理解度", "習得", "復習", "練習"]
-        for pattern in metrics_patterns:
-            if pattern in user_message or pattern in response:
-                learning_points.append(f"学习指标: {pattern}")
+        # 检测分析内容 / 学习指标（用户消息与回复一起匹配）
+        learning_points = [
+            f"{category}: {pattern}"
+            for category, patterns in LEARNING_POINT_MATCHER.match(user_message, response).items()
+            for pattern in patterns
+        ]
 
         # 通用分析点
         if not learning_points:
@@ -302,13 +313,6 @@ AI分析系统已启动。
         ]
 
         # 根据消息内容提供针对性建议
-        if any(word in message for word in ["進捗", "进度", "progress"]):
-            suggestions.append("建议定期查看学习进度分析")
-
-        if any(word in message for word in ["効率", "效率", "efficiency"]):
-            suggestions.append("可以使用AI推荐的高效学习方法")
-
-        if any(word in message for word in ["弱点", "問題", "困难"]):
-            suggestions.append("建议重点攻克识别出的薄弱环节")
+        suggestions.extend(SUGGESTION_MATCHER.categories(message))
 
         return suggestions[:2]
\ No newline at end of file
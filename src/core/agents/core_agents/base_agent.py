@@ -5,17 +5,38 @@
 """
 
 import asyncio
+import functools
+import inspect
 import json
 import random
 import re
 from abc import ABC, abstractmethod
 from datetime import datetime
-from typing import Dict, List, Any, Optional
+from typing import AsyncIterator, Dict, List, Any, Optional
 import logging
 
+from utils.session_store import get_session_store
+from utils.tracing import span
+
 logger = logging.getLogger(__name__)
 
 
+def traced_agent_call(func):
+    """
+    装饰智能体的 process_user_input / process_message：记为 agent.<方法名> span
+    上下文中没有进行中的 trace 时，按 session_context["trace_id"] 接回
+    """
+    @functools.wraps(func)
+    async def wrapper(self, *args, **kwargs):
+        context = kwargs.get("session_context", kwargs.get("context"))
+        if context is None and len(args) > 1:
+            context = args[1]
+        trace_id = context.get("trace_id") if isinstance(context, dict) else None
+        with span(f"agent.{func.__name__}", trace_id=trace_id, agent=self.agent_id):
+            return await func(self, *args, **kwargs)
+    return wrapper
+
+
 class BaseAgent(ABC):
     """
     智能体基类（与田中同构，支持直连 LLM）
@@ -49,10 +70,8 @@ class BaseAgent(ABC):
         self.current_emotion = self.emotions[0]
         self.emotional_state = "neutral"
 
-        # 记忆与上下文
-        self.short_term_memory: List[Dict[str, Any]] = []
-        self.conversation_context: List[Dict[str, str]] = []
-        self.user_profile: Dict[str, Any] = {}
+        # 记忆与上下文：智能体实例在所有会话间共享，按 session_id 存放在会话状态存储中
+        self.session_store = get_session_store()
 
         # 状态
         self.is_active = False
@@ -71,6 +90,100 @@ class BaseAgent(ABC):
     ) -> Dict[str, Any]:
         pass
 
+    # -------- 流式接口 --------
+    # LLM 调用参数（子类覆盖；process_message 与流式接口共用）
+    llm_temperature: float = 0.5
+    llm_max_tokens: int = 1000
+    # 是否使用 LLM 回复缓存（低温度、答案稳定的智能体开启）
+    llm_cache: bool = False
+    # 流式结果中的情绪（None 时使用 current_emotion）
+    response_emotion: Optional[str] = None
+
+    async def process_user_input_stream(
+        self,
+        user_input: str,
+        session_context: Dict[str, Any],
+        scene: str = "conversation"
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        process_user_input 的流式版本
+
+        依次产出：
+        - {"type": "delta", "content": "..."}   增量文本（可能多次）
+        - {"type": "done", "result": {...}}     与 process_user_input 同构的完整结果（最后一次）
+
+        没有 llm_client / system_prompt 的智能体（如模拟智能体）退化为一次性产出完整回复。
+        """
+        llm_client = getattr(self, "llm_client", None)
+        system_prompt = getattr(self, "system_prompt", None)
+
+        if llm_client is None or not hasattr(llm_client, "chat_completion_stream") or not system_prompt:
+            result = await self.process_user_input(user_input, session_context, scene)
+            if result.get("content"):
+                yield {"type": "delta", "content": result["content"]}
+            yield {"type": "done", "result": result}
+            return
+
+        chunks: List[str] = []
+        try:
+            message = self._prepare_message(user_input, session_context)
+            async for delta in llm_client.chat_completion_stream(
+                messages=self._build_llm_messages(message, session_context),
+                temperature=self.llm_temperature,
+                system_prompt=system_prompt,
+                max_tokens=self.llm_max_tokens,
+                cache=self.llm_cache,
+                agent=self.agent_id
+            ):
+                chunks.append(delta)
+                yield {"type": "delta", "content": delta}
+        except Exception as e:
+            logger.error(f"❌ {self.name} 流式生成失败: {e}")
+
+        response = "".join(chunks)
+        if not response:
+            # 流式调用未产出任何内容，使用备用回复（一次性产出）
+            # 基类的备用回复是协程，子类（小美、アイ等）覆盖为普通方法，两种都要支持
+            if inspect.iscoroutinefunction(self._get_fallback_response):
+                response = await self._get_fallback_response(user_input)
+            else:
+                response = self._get_fallback_response(user_input)
+            logger.warning(f"{self.name} 流式LLM调用失败，使用备用回复")
+            yield {"type": "delta", "content": response}
+
+        self.add_to_memory(user_input, response, session_context)
+        yield {"type": "done", "result": self._build_stream_result(user_input, response)}
+
+    def _prepare_message(self, message: str, context: Optional[Dict[str, Any]] = None) -> str:
+        """发送给 LLM 之前对用户消息的预处理（子类可覆盖）"""
+        return message
+
+    def _build_llm_messages(self, message: str, context: Optional[Dict[str, Any]] = None) -> List[Dict[str, str]]:
+        """构建 LLM 对话消息：最近4轮历史 + 当前消息（未显式传入 history 时取本会话的记忆，没有 session_id 则不带历史）"""
+        messages = [{"role": "user", "content": message}]
+        history = (context or {}).get("history")
+        if not history:
+            history = self.session_store.get_history_messages(self._session_id(context), self.agent_id, limit=2)
+        return history[-4:] + messages
+
+    @staticmethod
+    def _session_id(context: Optional[Dict[str, Any]] = None) -> Optional[str]:
+        return (context or {}).get("session_id")
+
+    def _build_stream_result(self, user_input: str, response: str) -> Dict[str, Any]:
+        """把流式拼接出的完整回复映射为 process_user_input 的统一返回结构"""
+        return {
+            "content": response,
+            "agent_id": self.agent_id,
+            "agent_name": self.name,
+            "emotion": self.response_emotion or self.current_emotion,
+            "is_mock": False,
+            "learning_points": self._extract_learning_points(user_input, response)
+            if hasattr(self, "_extract_learning_points") else [],
+            "suggestions": self._generate_suggestions(user_input)
+            if hasattr(self, "_generate_suggestions") else []
+        }
+
     # -------- 仍保留的公共生成接口（直连 LLM）--------
     async def generate_response(
         self,
@@ -107,8 +220,8 @@ class BaseAgent(ABC):
         if scene and scene != "conversation":
             role_prompt += f"\n## 场景\n{self._get_scene_info(scene)}\n"
 
-        if self.conversation_context:
-            recent = self.conversation_context[-3:]
+        recent = self.session_store.get_turns(self._session_id(context), self.agent_id, limit=3)
+        if recent:
             ctx = "\n".join([f"用户: {c['user']}\n{self.name}: {c['agent']}" for c in recent])
             role_prompt += f"\n## 最近对话\n{ctx}\n"
 
@@ -166,22 +279,21 @@ class BaseAgent(ABC):
             response = response.replace("だよ", "です").replace("だね", "ですね")
         return response
 
-    # 记忆系统
+    # 记忆系统（按会话隔离）
     def add_to_memory(self, user_input: str, agent_response: str, context: Dict = None):
-        entry = {
-            "timestamp": datetime.now().isoformat(),
-            "user": user_input, "agent": agent_response,
-            "context": context or {}, "emotion": self.current_emotion
-        }
-        self.short_term_memory.append(entry)
-        self.conversation_context.append({"user": user_input, "agent": agent_response})
-        if len(self.short_term_memory) > 50: self.short_term_memory.pop(0)
-        if len(self.conversation_context) > 10: self.conversation_context.pop(0)
+        # 编排器内部的提示（如交叉评论）不是用户说的话，不记入会话历史
+        if not (context or {}).get("internal_prompt"):
+            self.session_store.append_turn(
+                self._session_id(context), self.agent_id, user_input, agent_response, emotion=self.current_emotion
+            )
+        self.total_interactions += 1
+        self.last_interaction_time = datetime.now().isoformat()
 
-    def update_user_profile(self, observations: Dict[str, Any]):
-        for k, v in observations.items():
-            if k in ["level", "interests", "weak_points", "learning_style"]:
-                self.user_profile[k] = v
+    def update_user_profile(self, observations: Dict[str, Any], context: Dict = None):
+        self.session_store.update_user_profile(self._session_id(context), {
+            k: v for k, v in observations.items()
+            if k in ["level", "interests", "weak_points", "learning_style"]
+        })
 
     # 情绪系统
     async def update_emotion(self, trigger: str, context: Dict = None):
@@ -205,15 +317,15 @@ class BaseAgent(ABC):
             "current_emotion": self.current_emotion, "emotional_state": self.emotional_state,
             "is_active": self.is_active, "expertise": self.expertise, "personality": self.personality,
             "total_interactions": self.total_interactions,
-            "memory_count": len(self.short_term_memory),
+            "memory_count": self.session_store.count_turns(self.agent_id),
             "last_interaction": self.last_interaction_time,
-            "learning_topics_covered": [], "user_profile": self.user_profile
+            "learning_topics_covered": [], "user_profile": {}
         }
 
     def activate(self): self.is_active = True
     def deactivate(self): self.is_active = False
-    async def reset_session(self):
-        self.conversation_context.clear()
+    async def reset_session(self, session_id: Optional[str] = None):
+        self.session_store.clear(session_id, self.agent_id)
         self.current_emotion = self.emotions[0]; self.emotional_state = "neutral"; self.last_interaction_time = None
 
     def __str__(self): return f"{self.name}({self.role}) - {self.current_emotion}"
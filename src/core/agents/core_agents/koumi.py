@@ -5,19 +5,36 @@
 import logging
 from typing import Dict, Any, Optional, List
 from datetime import datetime
-from .base_agent import BaseAgent
+from .base_agent import BaseAgent, traced_agent_call
+from utils.keyword_matcher import KeywordMatcher
 from utils.llm_client import get_llm_client
 from dotenv import load_dotenv
 load_dotenv()
 
 logger = logging.getLogger(__name__)
 
+# 学习点：类别 -> 关键词
+LEARNING_POINT_MATCHER = KeywordMatcher({
+    "口语表达": ["だよ", "だね", "よね", "ちゃった", "じゃん", "っぽい"],
+    "年轻人用语": ["超", "やばい", "マジ", "すげー", "めっちゃ"],
+})
+
+# 针对性建议：建议 -> 触发关键词
+SUGGESTION_MATCHER = KeywordMatcher({
+    "通过动漫学习日语很有效哦": ["動漫", "アニメ", "漫画"],
+    "和朋友用日语聊天是最好的练习": ["友達", "朋友", "同学"],
+})
+
 
 class KoumiAgent(BaseAgent):
     """
     小美 - 活泼的日语对话伙伴
     """
 
+    llm_temperature = 0.7  # 较高温度保持活泼性
+    llm_max_tokens = 1000
+    response_emotion = "😊"
+
     def __init__(self):
         super().__init__(
             agent_id="koumi",
@@ -76,6 +93,7 @@ class KoumiAgent(BaseAgent):
 - 适时插入有趣的日本文化小知识
 - 让学习过程轻松有趣"""
 
+    @traced_agent_call
     async def process_message(
             self,
             message: str,
@@ -84,28 +102,26 @@ class KoumiAgent(BaseAgent):
     ) -> Dict[str, Any]:
         """处理用户消息"""
         try:
-            # 构建对话消息
-            messages = [
-                {"role": "user", "content": message}
-            ]
-
-            # 如果有上下文，添加历史对话
-            if context and "history" in context:
-                history_messages = context["history"][-4:]
-                messages = history_messages + messages
+            # 构建对话消息（最近4轮历史 + 当前消息）
+            messages = self._build_llm_messages(message, context)
 
             # 调用LLM获取回复
             response = await self.llm_client.chat_completion(
                 messages=messages,
-                temperature=0.7,  # 较高温度保持活泼性
+                temperature=self.llm_temperature,
                 system_prompt=self.system_prompt,
-                max_tokens=1000
+                max_tokens=self.llm_max_tokens,
+                cache=self.llm_cache,
+                agent=self.agent_id
             )
 
             if response is None:
                 response = self._get_fallback_response(message)
                 logger.warning("LLM API调用失败，使用备用回复")
 
+            # 记录到本会话的对话记忆
+            self.add_to_memory(message, response, context)
+
             # 分析对话中的学习点
             learning_points = self._extract_learning_points(message, response)
 
@@ -133,6 +149,7 @@ class KoumiAgent(BaseAgent):
                 "timestamp": datetime.now().isoformat()
             }
 
+    @traced_agent_call
     async def process_user_input(self, user_input: str, session_context: dict, scene: str = "conversation"):
         """
         处理用户输入 - 与田中先生保持同构：
@@ -229,19 +246,12 @@ class KoumiAgent(BaseAgent):
 
     def _extract_learning_points(self, user_message: str, response: str) -> List[str]:
         """从对话中提取学习要点"""
-        learning_points = []
-
-        # 检测口语化表达
-        casual_patterns = ["だよ", "だね", "よね", "ちゃった", "じゃん", "っぽい"]
-        for pattern in casual_patterns:
-            if pattern in user_message or pattern in response:
-                learning_points.append(f"口语表达: {pattern}")
-
-        # 检测年轻人用语
-        youth_patterns = ["超", "やばい", "マジ", "すげー", "めっちゃ"]
-        for pattern in youth_patterns:
-            if pattern in user_message or pattern in response:
-                learning_points.append(f"年轻人用语: {pattern}")
+        # 检测口语化表达 / 年轻人用语（用户消息与回复一起匹配）
+        learning_points = [
+            f"{category}: {pattern}"
+            for category, patterns in LEARNING_POINT_MATCHER.match(user_message, response).items()
+            for pattern in patterns
+        ]
 
         # 通用学习点
         if not learning_points:
@@ -258,10 +268,6 @@ class KoumiAgent(BaseAgent):
         ]
 
         # 根据消息内容提供针对性建议
-        if any(word in message for word in ["動漫", "アニメ", "漫画"]):
-            suggestions.append("通过动漫学习日语很有效哦")
-
-        if any(word in message for word in ["友達", "朋友", "同学"]):
-            suggestions.append("和朋友用日语聊天是最好的练习")
+        suggestions.extend(SUGGESTION_MATCHER.categories(message))
 
         return suggestions[:2]
\ No newline at end of file
@@ -442,7 +442,8 @@ import json
 import os
 from typing import Dict, Any, Optional, List
 from datetime import datetime, timedelta
-from .base_agent import BaseAgent
+from .base_agent import BaseAgent, traced_agent_call
+from utils.keyword_matcher import KeywordMatcher
 from utils.llm_client import get_llm_client
 from dotenv import load_dotenv
 
@@ -450,12 +451,43 @@ load_dotenv()
 
 logger = logging.getLogger(__name__)
 
+# 用户意图：意图 -> 关键词（按顺序取第一个命中的意图）
+INTENT_MATCHER = KeywordMatcher({
+    "add_memory": ["记住", "学会了", "掌握了", "添加"],
+    "check_progress": ["进度", "情况", "学了多少", "复习"],
+    "schedule_review": ["计划", "安排", "提醒"],
+}, lower=True)
+
+# 情绪：表情 -> 关键词（同上）
+EMOTION_MATCHER = KeywordMatcher({
+    "🤔": ["忘记", "忘了", "不记得"],
+    "📈": ["学会", "掌握", "明白"],
+    "⏰": ["复习", "计划", "安排"],
+    "💾": ["困难", "难", "不懂"],
+}, lower=True)
+
+# 学习点：类别 -> 关键词
+LEARNING_POINT_MATCHER = KeywordMatcher({
+    "记忆技巧": ["記憶", "復習", "忘れる", "覚える", "暗記", "思い出す"],
+    "学习管理": ["計画", "管理", "スケジュール", "進捗", "目標", "達成"],
+    "时间管理": ["時間", "頻度", "間隔", "期間", "タイミング"],
+})
+
+# 针对性建议：建议 -> 触发关键词
+SUGGESTION_MATCHER = KeywordMatcher({
+    "增加困难内容的复习频率": ["忘记", "忘れる", "forget"],
+})
+
 
 class MemBot(BaseAgent):
     """
     MemBot - 智能记忆管家 (增强版)
     """
 
+    llm_temperature = 0.1  # 极低温度保持精确性
+    llm_max_tokens = 1000
+    llm_cache = True  # 极低温度、回答确定，相同请求复用缓存
+
     def __init__(self):
         super().__init__(
             agent_id="membot",
@@ -561,6 +593,7 @@ class MemBot(BaseAgent):
         except Exception as e:
             logger.error(f"保存记忆数据失败: {e}")
 
+    @traced_agent_call
     async def process_message(
             self,
             message: str,
@@ -571,39 +604,29 @@ class MemBot(BaseAgent):
         try:
             # 新增：分析用户意图并更新记忆数据
             user_id = context.get('user_id', 'default_user') if context else 'default_user'
-            intent = self._analyze_intent(message)
-
-            # 根据意图更新数据
-            if intent == "add_memory":
-                self._add_memory_item(user_id, message)
-            elif intent == "check_progress":
-                progress_info = self._get_progress_info(user_id)
-                # 将进度信息添加到上下文中，让LLM生成更个性化的回复
-                enhanced_message = f"{message}\n\n[系统数据]: {progress_info}"
-                message = enhanced_message
-
-            # 构建对话消息
-            messages = [
-                {"role": "user", "content": message}
-            ]
+            user_message = message
+            message = self._prepare_message(message, context)
 
-            # 如果有上下文，添加历史对话
-            if context and "history" in context:
-                history_messages = context["history"][-4:]
-                messages = history_messages + messages
+            # 构建对话消息（最近4轮历史 + 当前消息）
+            messages = self._build_llm_messages(message, context)
 
             # 调用LLM获取回复
             response = await self.llm_client.chat_completion(
                 messages=messages,
-                temperature=0.1,  # 极低温度保持精确性
+                temperature=self.llm_temperature,
                 system_prompt=self.system_prompt,
-                max_tokens=1000
+                max_tokens=self.llm_max_tokens,
+                cache=self.llm_cache,
+                agent=self.agent_id
             )
 
             if response is None:
                 response = self._get_fallback_response(message, user_id)  # 增强备用回复
                 logger.warning("LLM API调用失败，使用备用回复")
 
+            # 记录到本会话的对话记忆（保存用户原话，不含附加的系统数据）
+            self.add_to_memory(user_message, response, context)
+
             # 分析记忆相关学习点
             learning_points = self._extract_learning_points(message, response)
 
@@ -634,6 +657,7 @@ class MemBot(BaseAgent):
                 "timestamp": datetime.now().isoformat()
             }
 
+    @traced_agent_call
     async def process_user_input(self, user_input: str, session_context: dict, scene: str = "memory"):
         """
         与现有接口保持一致
@@ -666,18 +690,31 @@ class MemBot(BaseAgent):
 
     # === 新增智能分析功能 ===
 
+    def _prepare_message(self, message: str, context: Optional[Dict[str, Any]] = None) -> str:
+        """根据用户意图更新记忆数据，必要时把进度信息附加到消息中"""
+        user_id = context.get('user_id', 'default_user') if context else 'default_user'
+        intent = self._analyze_intent(message)
+
+        # 根据意图更新数据
+        if intent == "add_memory":
+            self._add_memory_item(user_id, message)
+        elif intent == "check_progress":
+            progress_info = self._get_progress_info(user_id)
+            # 将进度信息添加到上下文中，让LLM生成更个性化的回复
+            message = f"{message}\n\n[系统数据]: {progress_info}"
+
+        return message
+
+    def _build_stream_result(self, user_input: str, response: str) -> Dict[str, Any]:
+        """流式结果：智能情绪选择 + 保存记忆数据"""
+        result = super()._build_stream_result(user_input, response)
+        result["emotion"] = self._select_emotion(user_input)
+        self._save_memory_data()
+        return result
+
     def _analyze_intent(self, message: str) -> str:
         """分析用户意图"""
-        message_lower = message.lower()
-
-        if any(word in message_lower for word in ["记住", "学会了", "掌握了", "添加"]):
-            return "add_memory"
-        elif any(word in message_lower for word in ["进度", "情况", "学了多少", "复习"]):
-            return "check_progress"
-        elif any(word in message_lower for word in ["计划", "安排", "提醒"]):
-            return "schedule_review"
-        else:
-            return "general_chat"
+        return INTENT_MATCHER.first_category(message, default="general_chat")
 
     def _add_memory_item(self, user_id: str, content: str):
         """添加记忆项目"""
@@ -720,18 +757,7 @@ class MemBot(BaseAgent):
 
     def _select_emotion(self, message: str) -> str:
         """根据消息内容智能选择情绪"""
-        message_lower = message.lower()
-
-        if any(word in message_lower for word in ["忘记", "忘了", "不记得"]):
-            return "🤔"
-        elif any(word in message_lower for word in ["学会", "掌握", "明白"]):
-            return "📈"
-        elif any(word in message_lower for word in ["复习", "计划", "安排"]):
-            return "⏰"
-        elif any(word in message_lower for word in ["困难", "难", "不懂"]):
-            return "💾"
-        else:
-            return "🧠"
+        return EMOTION_MATCHER.first_category(message, default="🧠")
 
     def _get_fallback_response(self, message: str, user_id: str = "default") -> str:
         """增强的备用回复 (基于用户数据)"""
@@ -835,8 +861,7 @@ MemBot系统启动完成。
             base_suggestions.append("考虑进行综合性复习")
 
         # 根据消息内容添加针对性建议
-        if any(word in message for word in ["忘记", "忘れる", "forget"]):
-            base_suggestions.append("增加困难内容的复习频率")
+        base_suggestions.extend(SUGGESTION_MATCHER.categories(message))
 
         return base_suggestions[:3]
 
@@ -866,25 +891,12 @@ MemBot系统启动完成。
 
     def _extract_learning_points(self, user_message: str, response: str) -> List[str]:
         """从记忆管理中提取学习要点 (保持原样)"""
-        learning_points = []
-
-        # 检测记忆相关词汇
-        memory_patterns = ["記憶", "復習", "忘れる", "覚える", "暗記", "思い出す"]
-        for pattern in memory_patterns:
-            if pattern in user_message or pattern in response:
-                learning_points.append(f"记忆技巧: {pattern}")
-
-        # 检测学习管理
-        management_patterns = ["計画", "管理", "スケジュール", "進捗", "目標", "達成"]
-        for pattern in management_patterns:
-            if pattern in user_message or pattern in response:
-                learning_points.append(f"学习管理: {pattern}")
-
-        # 检测时间相关
-        time_patterns = ["時間", "頻度", "間隔", "期間", "タイミング"]
-        for pattern in time_patterns:
-            if pattern in user_message or pattern in response:
-                learning_points.append(f"时间管理: {pattern}")
+        # 检测记忆技巧 / 学习管理 / 时间管理（用户消息与回复一起匹配）
+        learning_points = [
+            f"{category}: {pattern}"
+            for category, patterns in LEARNING_POINT_MATCHER.match(user_message, response).items()
+            for pattern in patterns
+        ]
 
         # 通用记忆学习点
         if not learning_points:
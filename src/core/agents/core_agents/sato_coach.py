@@ -5,19 +5,39 @@
 import logging
 from typing import Dict, Any, Optional, List
 from datetime import datetime
-from .base_agent import BaseAgent
+from .base_agent import BaseAgent, traced_agent_call
+from utils.keyword_matcher import KeywordMatcher
 from utils.llm_client import get_llm_client
 from dotenv import load_dotenv
 load_dotenv()
 
 logger = logging.getLogger(__name__)
 
+# 学习点：类别 -> 关键词
+LEARNING_POINT_MATCHER = KeywordMatcher({
+    "JLPT考点": ["N1", "N2", "N3", "N4", "N5", "文字", "語彙", "文法", "読解", "聴解"],
+    "学习策略": ["計画", "戦略", "練習", "復習", "模擬", "対策"],
+    "应试技巧": ["時間管理", "解答技巧", "心態", "準備", "効率"],
+})
+
+# 针对性建议：建议 -> 触发关键词
+SUGGESTION_MATCHER = KeywordMatcher({
+    "重点攻克高难度语法和词汇": ["N1", "N2", "高级"],
+    "优化时间分配和答题节奏": ["時間", "时间", "效率"],
+    "加强听力训练，多听真题音频": ["聴解", "听力", "listening"],
+    "调整心态，建立考试信心": ["不安", "紧张", "worried"],
+})
+
 
 class SatoCoach(BaseAgent):
     """
     佐藤教练 - JLPT考试专家
     """
 
+    llm_temperature = 0.4  # 中低温度保持策略性和准确性
+    llm_max_tokens = 1000
+    response_emotion = "💪"
+
     def __init__(self):
         super().__init__(
             agent_id="sato",
@@ -92,6 +112,7 @@ class SatoCoach(BaseAgent):
 - 关注学习效果和时间效率
 - 适时给予鼓励和动力支持"""
 
+    @traced_agent_call
     async def process_message(
             self,
             message: str,
@@ -100,28 +121,26 @@ class SatoCoach(BaseAgent):
     ) -> Dict[str, Any]:
         """处理用户消息"""
         try:
-            # 构建对话消息
-            messages = [
-                {"role": "user", "content": message}
-            ]
-
-            # 如果有上下文，添加历史对话
-            if context and "history" in context:
-                history_messages = context["history"][-4:]
-                messages = history_messages + messages
+            # 构建对话消息（最近4轮历史 + 当前消息）
+            messages = self._build_llm_messages(message, context)
 
             # 调用LLM获取回复
             response = await self.llm_client.chat_completion(
                 messages=messages,
-                temperature=0.4,  # 中低温度保持策略性和准确性
+                temperature=self.llm_temperature,
                 system_prompt=self.system_prompt,
-                max_tokens=1000
+                max_tokens=self.llm_max_tokens,
+                cache=self.llm_cache,
+                agent=self.agent_id
             )
 
             if response is None:
                 response = self._get_fallback_response(message)
                 logger.warning("LLM API调用失败，使用备用回复")
 
+            # 记录到本会话的对话记忆
+            self.add_to_memory(message, response, context)
+
             # 分析考试相关学习点
             learning_points = self._extract_learning_points(message, response)
 
@@ -149,6 +168,7 @@ class SatoCoach(BaseAgent):
                 "timestamp": datetime.now().isoformat()
             }
 
+    @traced_agent_call
     async def process_user_input(self, user_input: str, session_context: dict, scene: str = "exam"):
         """
         与田中同构：走 process_message + 统一映射
@@ -302,25 +322,12 @@ Never give up! 絶対に諦めるな！
 
     def _extract_learning_points(self, user_message: str, response: str) -> List[str]:
         """从考试指导中提取学习要点"""
-        learning_points = []
-
-        # 检测JLPT相关词汇
-        jlpt_patterns = ["N1", "N2", "N3", "N4", "N5", "文字", "語彙", "文法", "読解", "聴解"]
-        for pattern in jlpt_patterns:
-            if pattern in user_message or pattern in response:
-                learning_points.append(f"JLPT考点: {pattern}")
-
-        # 检测学习策略
-        strategy_patterns = ["計画", "戦略", "練習", "復習", "模擬", "対策"]
-        for pattern in strategy_patterns:
-            if pattern in user_message or pattern in response:
-                learning_points.append(f"学习策略: {pattern}")
-
-        # 检测考试技巧
-        skill_patterns = ["時間管理", "解答技巧", "心態", "準備", "効率"]
-        for pattern in skill_patterns:
-            if pattern in user_message or pattern in response:
-                learning_points.append(f"应试技巧: {pattern}")
+        # 检测JLPT考点 / 学习策略 / 考试技巧（用户消息与回复一起匹配）
+        learning_points = [
+            f"{category}: {pattern}"
+            for category, patterns in LEARNING_POINT_MATCHER.match(user_message, response).items()
+            for pattern in patterns
+        ]
 
         # 通用考试学习点
         if not learning_points:
@@ -338,16 +345,6 @@ Never give up! 絶対に諦めるな！
         ]
 
         # 根据消息内容提供针对性建议
-        if any(word in message for word in ["N1", "N2", "高级"]):
-            suggestions.append("重点攻克高难度语法和词汇")
-
-        if any(word in message for word in ["時間", "时间", "效率"]):
-            suggestions.append("优化时间分配和答题节奏")
-
-        if any(word in message for word in ["聴解", "听力", "listening"]):
-            suggestions.append("加强听力训练，多听真题音频")
-
-        if any(word in message for word in ["不安", "紧张", "worried"]):
-            suggestions.append("调整心态，建立考试信心")
+        suggestions.extend(SUGGESTION_MATCHER.categories(message))
 
         return suggestions[:2]
\ No newline at end of file
@@ -5,19 +5,36 @@
 import logging
 from typing import Dict, Any, Optional, List
 from datetime import datetime
-from .base_agent import BaseAgent
+from .base_agent import BaseAgent, traced_agent_call
+from utils.keyword_matcher import KeywordMatcher
 from utils.llm_client import get_llm_client
 from dotenv import load_dotenv
 load_dotenv()
 
 logger = logging.getLogger(__name__)
 
+# 学习点：类别 -> 关键词
+LEARNING_POINT_MATCHER = KeywordMatcher({
+    "语法点": ["は", "が", "を", "に", "で", "から", "まで", "です", "である", "敬语"],
+})
+
+# 针对性建议：建议 -> 触发关键词
+SUGGESTION_MATCHER = KeywordMatcher({
+    "关注敬语和正式语的使用场合": ["です", "である"],
+    "重点练习助词的区别和用法": ["は", "が", "を"],
+})
+
 
 class TanakaSensei(BaseAgent):
     """
     田中先生 - 严格的日语语法专家
     """
 
+    llm_temperature = 0.3  # 较低温度保持严谨性
+    llm_max_tokens = 1000
+    llm_cache = True  # 低温度语法回答稳定，相同问题复用缓存
+    response_emotion = "😊"
+
     def __init__(self):
         super().__init__(
             agent_id="tanaka",  # 添加这个必需参数
@@ -70,6 +87,7 @@ class TanakaSensei(BaseAgent):
 - 鼓励学生继续学习
 - 适时插入一些学习方法建议"""
 
+    @traced_agent_call
     async def process_message(
             self,
             message: str,
@@ -78,22 +96,17 @@ class TanakaSensei(BaseAgent):
     ) -> Dict[str, Any]:
         """处理用户消息"""
         try:
-            # 构建对话消息
-            messages = [
-                {"role": "user", "content": message}
-            ]
-
-            # 如果有上下文，可以添加历史对话
-            if context and "history" in context:
-                history_messages = context["history"][-4:]  # 只保留最近4轮对话
-                messages = history_messages + messages
+            # 构建对话消息（最近4轮历史 + 当前消息）
+            messages = self._build_llm_messages(message, context)
 
             # 调用LLM获取回复
             response = await self.llm_client.chat_completion(
                 messages=messages,
-                temperature=0.3,  # 较低温度保持严谨性
+                temperature=self.llm_temperature,
                 system_prompt=self.system_prompt,
-                max_tokens=1000
+                max_tokens=self.llm_max_tokens,
+                cache=self.llm_cache,
+                agent=self.agent_id
             )
 
             if response is None:
@@ -101,6 +114,9 @@ class TanakaSensei(BaseAgent):
                 response = self._get_fallback_response(message)
                 logger.warning("LLM API调用失败，使用备用回复")
 
+            # 记录到本会话的对话记忆
+            self.add_to_memory(message, response, context)
+
             # 分析用户消息中的学习点
             learning_points = self._extract_learning_points(message, response)
 
@@ -130,6 +146,7 @@ class TanakaSensei(BaseAgent):
 
     # 在你现有的 tanaka_sensei.py 文件的 TanakaSensei 类中添加这个方法
 
+    @traced_agent_call
     async def process_user_input(self, user_input: str, session_context: dict, scene: str = "grammar"):
         """
         处理用户输入 - 实现抽象方法
@@ -222,14 +239,12 @@ class TanakaSensei(BaseAgent):
 
     def _extract_learning_points(self, user_message: str, response: str) -> List[str]:
         """从对话中提取学习要点"""
-        learning_points = []
-
-        # 简单的关键词匹配来识别学习点
-        grammar_patterns = ["は", "が", "を", "に", "で", "から", "まで", "です", "である", "敬语"]
-
-        for pattern in grammar_patterns:
-            if pattern in user_message or pattern in response:
-                learning_points.append(f"语法点: {pattern}")
+        # 简单的关键词匹配来识别学习点（用户消息与回复一起匹配）
+        learning_points = [
+            f"{category}: {pattern}"
+            for category, patterns in LEARNING_POINT_MATCHER.match(user_message, response).items()
+            for pattern in patterns
+        ]
 
         # 如果没有识别到具体语法点，添加通用学习点
         if not learning_points:
@@ -246,10 +261,6 @@ class TanakaSensei(BaseAgent):
         ]
 
         # 根据消息内容提供针对性建议
-        if "です" in message or "である" in message:
-            suggestions.append("关注敬语和正式语的使用场合")
-
-        if any(particle in message for particle in ["は", "が", "を"]):
-            suggestions.append("重点练习助词的区别和用法")
+        suggestions.extend(SUGGESTION_MATCHER.categories(message))
 
         return suggestions[:2]  # 返回最多2个建议
\ No newline at end of file
@@ -5,19 +5,38 @@
 import logging
 from typing import Dict, Any, Optional, List
 from datetime import datetime
-from .base_agent import BaseAgent
+from .base_agent import BaseAgent, traced_agent_call
+from utils.keyword_matcher import KeywordMatcher
 from utils.llm_client import get_llm_client
 from dotenv import load_dotenv
 load_dotenv()
 
 logger = logging.getLogger(__name__)
 
+# 学习点：类别 -> 关键词
+LEARNING_POINT_MATCHER = KeywordMatcher({
+    "文化知识": ["文化", "伝統", "歴史", "習慣", "礼儀", "作法"],
+    "节庆文化": ["祭り", "正月", "お盆", "桜", "紅葉", "雪"],
+    "传统艺术": ["茶道", "花道", "書道", "着物", "能", "歌舞伎"],
+})
+
+# 针对性建议：建议 -> 触发关键词
+SUGGESTION_MATCHER = KeywordMatcher({
+    "可以参加茶道体验课程": ["茶道", "tea ceremony"],
+    "了解日本传统节日的历史背景": ["祭り", "festival", "节日"],
+    "学习日本社会礼仪和商务文化": ["礼儀", "manners", "礼貌"],
+})
+
 
 class YamadaSensei(BaseAgent):
     """
     山田先生 - 日本文化专家
     """
 
+    llm_temperature = 0.6  # 中等温度保持文化表达的丰富性
+    llm_max_tokens = 1200
+    response_emotion = "🎎"
+
     def __init__(self):
         super().__init__(
             agent_id="yamada",
@@ -85,6 +104,7 @@ class YamadaSensei(BaseAgent):
 - 鼓励文化交流和理解
 - 适当分享个人文化感悟"""
 
+    @traced_agent_call
     async def process_message(
             self,
             message: str,
@@ -93,28 +113,26 @@ class YamadaSensei(BaseAgent):
     ) -> Dict[str, Any]:
         """处理用户消息"""
         try:
-            # 构建对话消息
-            messages = [
-                {"role": "user", "content": message}
-            ]
-
-            # 如果有上下文，添加历史对话
-            if context and "history" in context:
-                history_messages = context["history"][-4:]
-                messages = history_messages + messages
+            # 构建对话消息（最近4轮历史 + 当前消息）
+            messages = self._build_llm_messages(message, context)
 
             # 调用LLM获取回复
             response = await self.llm_client.chat_completion(
                 messages=messages,
-                temperature=0.6,  # 中等温度保持文化表达的丰富性
+                temperature=self.llm_temperature,
                 system_prompt=self.system_prompt,
-                max_tokens=1200
+                max_tokens=self.llm_max_tokens,
+                cache=self.llm_cache,
+                agent=self.agent_id
             )
 
             if response is None:
                 response = self._get_fallback_response(message)
                 logger.warning("LLM API调用失败，使用备用回复")
 
+            # 记录到本会话的对话记忆
+            self.add_to_memory(message, response, context)
+
             # 分析文化学习点
             learning_points = self._extract_learning_points(message, response)
 
@@ -142,6 +160,7 @@ class YamadaSensei(BaseAgent):
                 "timestamp": datetime.now().isoformat()
             }
 
+    @traced_agent_call
     async def process_user_input(self, user_input: str, session_context: dict, scene: str = "culture"):
         """
         与田中同构：
@@ -279,25 +298,12 @@ When in Rome, do as the Romans do.
 
     def _extract_learning_points(self, user_message: str, response: str) -> List[str]:
         """从文化对话中提取学习要点"""
-        learning_points = []
-
-        # 检测文化相关词汇
-        culture_patterns = ["文化", "伝統", "歴史", "習慣", "礼儀", "作法"]
-        for pattern in culture_patterns:
-            if pattern in user_message or pattern in response:
-                learning_points.append(f"文化知识: {pattern}")
-
-        # 检测节日庆典
-        festival_patterns = ["祭り", "正月", "お盆", "桜", "紅葉", "雪"]
-        for pattern in festival_patterns:
-            if pattern in user_message or pattern in response:
-                learning_points.append(f"节庆文化: {pattern}")
-
-        # 检测传统艺术
-        art_patterns = ["茶道", "花道", "書道", "着物", "能", "歌舞伎"]
-        for pattern in art_patterns:
-            if pattern in user_message or pattern in response:
-                learning_points.append(f"传统艺术: {pattern}")
+        # 检测文化词汇 / 节日庆典 / 传统艺术（用户消息与回复一起匹配）
+        learning_points = [
+            f"{category}: {pattern}"
+            for category, patterns in LEARNING_POINT_MATCHER.match(user_message, response).items()
+            for pattern in patterns
+        ]
 
         # 通用文化学习点
         if not learning_points:
@@ -315,13 +321,6 @@ When in Rome, do as the Romans do.
         ]
 
         # 根据消息内容提供针对性建议
-        if any(word in message for word in ["茶道", "tea ceremony"]):
-            suggestions.append("可以参加茶道体验课程")
-
-        if any(word in message for word in ["祭り", "festival", "节日"]):
-            suggestions.append("了解日本传统节日的历史背景")
-
-        if any(word in message for word in ["礼儀", "manners", "礼貌"]):
-            suggestions.append("学习日本社会礼仪和商务文化")
+        suggestions.extend(SUGGESTION_MATCHER.categories(message))
 
         return suggestions[:2]
\ No newline at end of file
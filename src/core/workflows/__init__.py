@@ -15,6 +15,7 @@ from .grammar_workflows import (
 from .collaboration import (
     MultiAgentOrchestrator,
     CollaborationMode,
+    get_shared_orchestrator,
 )
 # 让 main.py 能用： from src.core.workflows import novel_collab as flow
 from . import novel_collab  # noqa: F401
@@ -23,5 +24,6 @@ __all__ = [
     "CollaborationWorkflow",
     "MultiAgentOrchestrator",
     "CollaborationMode",
+    "get_shared_orchestrator",
     "novel_collab",
 ]
@@ -145,19 +145,17 @@
 import asyncio
 import logging
 import re
-from typing import Dict, List, Any, Optional, Tuple
-from dataclasses import dataclass
+from typing import Dict, FrozenSet, List, Any, Optional, Tuple
+from dataclasses import dataclass, field
 from enum import Enum
 from datetime import datetime
 from collections import Counter
 
+from utils.keyword_matcher import KeywordMatcher
+from utils.tracing import current_trace_id, orchestrator_stage
+
 # 导入现有的智能体
-from ..agents.core_agents.tanaka_sensei import TanakaSensei
-from ..agents.core_agents.koumi import KoumiAgent
-from ..agents.core_agents.ai_analyzer import AIAnalyzer
-from ..agents.core_agents.yamada_sensei import YamadaSensei
-from ..agents.core_agents.sato_coach import SatoCoach
-from ..agents.core_agents.mem_bot import MemBot
+from ..agents.agent_registry import get_shared_agents
 
 
 class CollaborationMode(Enum):
@@ -167,6 +165,34 @@ class CollaborationMode(Enum):
     ANALYSIS = "analysis"
 
 
+# 置信度关键词
+CERTAINTY_WORDS = ["确实", "肯定", "绝对", "明确", "显然"]
+UNCERTAINTY_WORDS = ["可能", "也许", "大概", "似乎", "或许"]
+
+# 按智能体性格判断立场的关键词
+FORMAL_STANCE_WORDS = ["正式", "规范", "标准"]
+CASUAL_STANCE_WORDS = ["随意", "自然", "轻松"]
+
+# 特定场景分歧检测用到的关键词
+SCENARIO_WORDS = ["です", "である", "敬语", "つもり", "自然", "问题", "不自然", "奇怪"]
+
+
+@dataclass(frozen=True)
+class ResponseFeatures:
+    """单条回复的特征向量：只提取一次，立场 / 置信度 / 各分歧检测器都只读它"""
+    length: int
+    polarity: Dict[str, Dict[str, Tuple[str, ...]]]  # 对立模式族 -> 极性 -> 命中关键词（按表中顺序）
+    certainty: int
+    uncertainty: int
+    keywords: FrozenSet[str]  # 命中的全部关键词
+
+    def side(self, family: str, polarity: str) -> Tuple[str, ...]:
+        return self.polarity.get(family, {}).get(polarity, ())
+
+    def has(self, keyword: str) -> bool:
+        return keyword in self.keywords
+
+
 @dataclass
 class AgentResponse:
     agent_id: str
@@ -180,6 +206,7 @@ class AgentResponse:
     agrees_with: Optional[List[str]] = None
     disagrees_with: Optional[List[str]] = None
     stance: Optional[str] = None  # 新增：观点立场
+    features: Optional[ResponseFeatures] = field(default=None, repr=False, compare=False)  # 内容特征（缓存）
 
 
 @dataclass
@@ -206,16 +233,10 @@ class CollaborationResult:
 class EnhancedMultiAgentOrchestrator:
     """增强的多智能体协作编排器，专门解决分歧检测问题"""
 
-    def __init__(self):
+    def __init__(self, agents: Optional[Dict[str, Any]] = None):
         self.logger = logging.getLogger(__name__)
-        self.agents = {
-            "tanaka": TanakaSensei(),
-            "koumi": KoumiAgent(),
-            "ai": AIAnalyzer(),
-            "yamada": YamadaSensei(),
-            "sato": SatoCoach(),
-            "membot": MemBot(),
-        }
+        # 默认复用进程级共享智能体，避免每次构造编排器都重新实例化 6 个智能体
+        self.agents = agents if agents is not None else get_shared_agents()
 
         # 智能体专业倾向和性格特征
         self.agent_profiles = {
@@ -276,6 +297,7 @@ class EnhancedMultiAgentOrchestrator:
                 "casual": ["随意", "口语", "非正式", "自然"]
             }
         }
+        self._build_feature_matcher()
 
     async def orchestrate_collaboration(
             self,
@@ -288,26 +310,30 @@ class EnhancedMultiAgentOrchestrator:
         session_id = session_context.get("session_id", f"session_{datetime.now().timestamp()}")
 
         self.logger.info(f"开始协作: 模式={mode.value}, 智能体={active_agents}")
+        if current_trace_id():
+            session_context.setdefault("trace_id", current_trace_id())
 
         # 1. 获取所有智能体的初始响应
-        responses = await self._collect_agent_responses(user_input, active_agents, session_context)
+        with orchestrator_stage("enhanced", "collect"):
+            responses = await self._collect_agent_responses(user_input, active_agents, session_context)
 
         # 2. 增强的分歧检测
-        disagreements = await self._detect_enhanced_disagreements(responses, user_input)
+        with orchestrator_stage("enhanced", "detect_disagreements"):
+            disagreements = await self._detect_enhanced_disagreements(responses, user_input)
 
         # 3. 如果有分歧，进行第二轮交叉评论
         if disagreements:
-            cross_responses = await self._conduct_cross_evaluation(responses, disagreements, session_context)
+            with orchestrator_stage("enhanced", "cross_evaluation"):
+                cross_responses = await self._conduct_cross_evaluation(responses, disagreements, session_context)
             responses.extend(cross_responses)
 
         # 4. 生成冲突列表 (向后兼容)
         conflicts = self._convert_disagreements_to_conflicts(disagreements)
 
-        # 5. 尝试建立共识
-        consensus = await self._build_consensus(responses, disagreements)
-
-        # 6. 生成最终建议
-        final_recommendation = await self._generate_final_recommendation(responses, disagreements, mode)
+        # 5. 尝试建立共识 / 6. 生成最终建议
+        with orchestrator_stage("enhanced", "consensus"):
+            consensus = await self._build_consensus(responses, disagreements)
+            final_recommendation = await self._generate_final_recommendation(responses, disagreements, mode)
 
         # 7. 判断是否需要用户仲裁
         needs_arbitration = any(d.severity in ["medium", "high"] for d in disagreements)
@@ -359,11 +385,14 @@ class EnhancedMultiAgentOrchestrator:
             learning_points = ret.get("learning_points", [])
             suggestions = ret.get("suggestions", [])
 
+            # 只提取一次特征，立场和置信度都基于它
+            features = self.extract_features(content)
+
             # 分析立场
-            stance = self._analyze_agent_stance(agent_id, content)
+            stance = self._analyze_agent_stance(agent_id, content, features)
 
             # 计算置信度 (基于内容长度和关键词)
-            confidence = self._calculate_confidence(content, agent_id)
+            confidence = self._calculate_confidence(content, agent_id, features)
 
             return AgentResponse(
                 agent_id=agent_id,
@@ -374,7 +403,8 @@ class EnhancedMultiAgentOrchestrator:
                 learning_points=learning_points,
                 suggestions=suggestions,
                 timestamp=datetime.now(),
-                stance=stance
+                stance=stance,
+                features=features
             )
 
         except Exception as e:
@@ -391,51 +421,91 @@ class EnhancedMultiAgentOrchestrator:
                 stance="error"
             )
 
-    def _analyze_agent_stance(self, agent_id: str, content: str) -> str:
+    def _build_feature_matcher(self):
+        """把对立模式、置信度、立场和场景关键词编译成一个匹配器（修改 opposing_patterns 后需重新调用）"""
+        tables = {
+            f"{pattern_type}/{stance_type}": keywords
+            for pattern_type, patterns in self.opposing_patterns.items()
+            for stance_type, keywords in patterns.items()
+        }
+        tables.update({
+            "certainty": CERTAINTY_WORDS,
+            "uncertainty": UNCERTAINTY_WORDS,
+            "formal_stance": FORMAL_STANCE_WORDS,
+            "casual_stance": CASUAL_STANCE_WORDS,
+            "scenario": SCENARIO_WORDS,
+        })
+        self._feature_matcher = KeywordMatcher(tables, lower=True)
+
+    def extract_features(self, content: str) -> ResponseFeatures:
+        """对回复内容做一次关键词匹配，得到特征向量"""
+        hits = self._feature_matcher.match(content)
+        return ResponseFeatures(
+            length=len(content),
+            polarity={
+                pattern_type: {
+                    stance_type: tuple(hits.get(f"{pattern_type}/{stance_type}", ()))
+                    for stance_type in patterns
+                }
+                for pattern_type, patterns in self.opposing_patterns.items()
+            },
+            certainty=len(hits.get("certainty", ())),
+            uncertainty=len(hits.get("uncertainty", ())),
+            keywords=frozenset(keyword for found in hits.values() for keyword in found),
+        )
+
+    def _features(self, response: AgentResponse) -> ResponseFeatures:
+        """取回复的特征（没有时提取并缓存）"""
+        if response.features is None:
+            response.features = self.extract_features(response.content)
+        return response.features
+
+    def _analyze_agent_stance(self, agent_id: str, content: str,
+                              features: Optional[ResponseFeatures] = None) -> str:
         """分析智能体在内容中的立场"""
-        content_lower = content.lower()
+        features = features or self.extract_features(content)
         profile = self.agent_profiles.get(agent_id, {})
 
         # 基于对立模式检测立场
         for pattern_type, patterns in self.opposing_patterns.items():
-            for stance_type, keywords in patterns.items():
-                if any(keyword in content_lower for keyword in keywords):
+            for stance_type in patterns:
+                if features.side(pattern_type, stance_type):
                     return f"{pattern_type}_{stance_type}"
 
         # 基于智能体性格特征
         if profile.get("formality_preference") == "formal" and any(
-                word in content_lower for word in ["正式", "规范", "标准"]):
+                features.has(word) for word in FORMAL_STANCE_WORDS):
             return "formal_strict"
         elif profile.get("formality_preference") == "casual" and any(
-                word in content_lower for word in ["随意", "自然", "轻松"]):
+                features.has(word) for word in CASUAL_STANCE_WORDS):
             return "casual_flexible"
 
         return "neutral"
 
-    def _calculate_confidence(self, content: str, agent_id: str) -> float:
+    def _calculate_confidence(self, content: str, agent_id: str,
+                              features: Optional[ResponseFeatures] = None) -> float:
         """计算响应的置信度"""
+        features = features or self.extract_features(content)
         base_confidence = 0.7
 
         # 内容长度因子
-        length_factor = min(len(content) / 100, 1.0) * 0.2
+        length_factor = min(features.length / 100, 1.0) * 0.2
 
         # 确定性关键词
-        certainty_words = ["确实", "肯定", "绝对", "明确", "显然"]
-        uncertainty_words = ["可能", "也许", "大概", "似乎", "或许"]
-
-        certainty_bonus = sum(0.05 for word in certainty_words if word in content)
-        uncertainty_penalty = sum(0.05 for word in uncertainty_words if word in content)
+        certainty_bonus = 0.05 * features.certainty
+        uncertainty_penalty = 0.05 * features.uncertainty
 
         final_confidence = base_confidence + length_factor + certainty_bonus - uncertainty_penalty
         return max(0.1, min(1.0, final_confidence))
 
     async def _detect_enhanced_disagreements(self, responses: List[AgentResponse],
                                              user_input: str) -> List[DisagreementInfo]:
-        """增强的分歧检测算法"""
+        """增强的分歧检测算法（每条回复只提取一次特征，各检测器都基于特征向量）"""
         disagreements = []
+        features = [self._features(r) for r in responses]
 
         # 1. 语义对立检测
-        semantic_disagreements = self._detect_semantic_disagreements(responses)
+        semantic_disagreements = self._detect_semantic_disagreements(responses, features)
         disagreements.extend(semantic_disagreements)
 
         # 2. 立场冲突检测
@@ -447,26 +517,28 @@ class EnhancedMultiAgentOrchestrator:
         disagreements.extend(confidence_disagreements)
 
         # 4. 特定场景分歧检测（针对测试用例）
-        scenario_disagreements = self._detect_scenario_specific_disagreements(responses, user_input)
+        scenario_disagreements = self._detect_scenario_specific_disagreements(responses, user_input, features)
         disagreements.extend(scenario_disagreements)
 
         return disagreements
 
-    def _detect_semantic_disagreements(self, responses: List[AgentResponse]) -> List[DisagreementInfo]:
+    def _detect_semantic_disagreements(self, responses: List[AgentResponse],
+                                       features: Optional[List[ResponseFeatures]] = None
+                                       ) -> List[DisagreementInfo]:
         """检测语义层面的对立观点"""
         disagreements = []
+        features = features or [self._features(r) for r in responses]
 
-        for pattern_type, patterns in self.opposing_patterns.items():
+        for pattern_type in self.opposing_patterns:
             agent_positions = {}
             evidence = {}
 
-            for response in responses:
-                content = response.content.lower()
+            for response, feature in zip(responses, features):
                 agent_name = response.agent_name
 
-                # 检测正面和负面关键词
-                positive_matches = [kw for kw in patterns.get("positive", []) if kw in content]
-                negative_matches = [kw for kw in patterns.get("negative", []) if kw in content]
+                # 正面和负面关键词的命中
+                positive_matches = list(feature.side(pattern_type, "positive"))
+                negative_matches = list(feature.side(pattern_type, "negative"))
 
                 if positive_matches and not negative_matches:
                     agent_positions[agent_name] = "positive"
@@ -551,20 +623,22 @@ class EnhancedMultiAgentOrchestrator:
 
         return []
 
-    def _detect_scenario_specific_disagreements(self, responses: List[AgentResponse],
-                                                user_input: str) -> List[DisagreementInfo]:
+    def _detect_scenario_specific_disagreements(self, responses: List[AgentResponse], user_input: str,
+                                                features: Optional[List[ResponseFeatures]] = None
+                                                ) -> List[DisagreementInfo]:
         """检测特定场景的分歧（针对测试用例设计）"""
         disagreements = []
+        features = features or [self._features(r) for r in responses]
 
         # 针对测试用例：敬语使用分歧
-        if "つもり" in user_input and any("です" in r.content or "である" in r.content for r in responses):
+        if "つもり" in user_input and any(f.has("です") or f.has("である") for f in features):
             formal_agents = []
             casual_agents = []
 
-            for response in responses:
-                if "です" in response.content or "敬语" in response.content:
+            for response, feature in zip(responses, features):
+                if feature.has("です") or feature.has("敬语"):
                     formal_agents.append(response.agent_name)
-                elif "つもり" in response.content and "です" not in response.content:
+                elif feature.has("つもり") and not feature.has("です"):
                     casual_agents.append(response.agent_name)
 
             if formal_agents and casual_agents:
@@ -585,10 +659,10 @@ class EnhancedMultiAgentOrchestrator:
             natural_agents = []
             unnatural_agents = []
 
-            for response in responses:
-                if "自然" in response.content or "问题" not in response.content:
+            for response, feature in zip(responses, features):
+                if feature.has("自然") or not feature.has("问题"):
                     natural_agents.append(response.agent_name)
-                elif "不自然" in response.content or "奇怪" in response.content:
+                elif feature.has("不自然") or feature.has("奇怪"):
                     unnatural_agents.append(response.agent_name)
 
             if natural_agents and unnatural_agents:
@@ -661,8 +735,9 @@ class EnhancedMultiAgentOrchestrator:
                     cross_prompt = f"其他智能体认为：{'; '.join(other_views)}。请对这些观点进行回应。"
 
                     try:
+                        # 交叉评论提示由编排器生成，标记为内部提示，不作为用户发言记入会话
                         cross_response = await self._get_enhanced_agent_response(
-                            agent_id, cross_prompt, session_context
+                            agent_id, cross_prompt, {**session_context, "internal_prompt": True}
                         )
                         cross_response.content = f"[回应] {cross_response.content}"
                         cross_responses.append(cross_response)
@@ -739,4 +814,16 @@ class EnhancedMultiAgentOrchestrator:
 # 保持向后兼容的原始类
 class MultiAgentOrchestrator(EnhancedMultiAgentOrchestrator):
     """向后兼容的原始协作编排器"""
-    pass
\ No newline at end of file
+    pass
+
+
+_shared_orchestrator: Optional[MultiAgentOrchestrator] = None
+
+
+def get_shared_orchestrator() -> MultiAgentOrchestrator:
+    """获取进程级共享编排器（共享智能体被重新注册时自动重建）"""
+    global _shared_orchestrator
+    agents = get_shared_agents()
+    if _shared_orchestrator is None or _shared_orchestrator.agents is not agents:
+        _shared_orchestrator = MultiAgentOrchestrator(agents)
+    return _shared_orchestrator
@@ -4,12 +4,12 @@
 """
 import logging
 from typing import Dict, Any, List
-from .collaboration import MultiAgentOrchestrator, CollaborationMode
+from .collaboration import get_shared_orchestrator, CollaborationMode
 
 class GrammarCollaborationWorkflows:
     def __init__(self):
         self.logger = logging.getLogger(__name__)
-        self.orch = MultiAgentOrchestrator()
+        self.orch = get_shared_orchestrator()
 
     async def collaborative_grammar_correction(self, user_input: str, session_context: Dict[str, Any]) -> Dict[str, Any]:
         agents = ["tanaka", "yamada", "koumi", "ai"]
@@ -0,0 +1,148 @@
+# src/data/migrations.py
+"""
+学习进度库的轻量级迁移
+create_all 只会创建缺失的表，不会给已有表补索引；已有的 SQLite 文件由这里按版本升级。
+已执行的版本记录在 schema_migrations 表中，每个迁移只执行一次。
+"""
+
+import logging
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, List, Optional
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection, Engine
+
+from utils.compression import compress_json, decompress_json
+from .models.base import Base
+from .models import learning  # noqa: F401  注册学习进度模型
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Migration:
+    """一个迁移版本"""
+    version: int
+    name: str
+    upgrade: Callable[[Connection], None]
+
+
+PROGRESS_TABLES = (
+    'learning_progress', 'vocabulary_progress', 'conversation_learning', 'user_stats', 'cultural_knowledge'
+)
+
+# 建唯一索引前去重：每组保留进度最高的一条
+DEDUP_ORDER = {
+    'learning_progress': 'practice_count DESC, mastery_level DESC',
+    'vocabulary_progress': 'times_reviewed DESC, mastery_score DESC',
+    'cultural_knowledge': 'understanding_level DESC',
+    'user_stats': 'total_conversations DESC',
+}
+
+
+def _deduplicate(conn: Connection, table_name: str, columns: List[str]) -> int:
+    """删除唯一键重复的记录，返回删除条数"""
+    keys = ', '.join(columns)
+    not_null = ' AND '.join(f'{c} IS NOT NULL' for c in columns)
+    result = conn.execute(text(
+        f"DELETE FROM {table_name} WHERE rowid IN ("
+        f"SELECT rowid FROM (SELECT rowid, ROW_NUMBER() OVER ("
+        f"PARTITION BY {keys} ORDER BY {DEDUP_ORDER[table_name]}, rowid) AS rn "
+        f"FROM {table_name} WHERE {not_null}) WHERE rn > 1)"
+    ))
+    return result.rowcount
+
+
+def _add_progress_indexes(conn: Connection) -> None:
+    """
+    给学习进度表补上复合索引与唯一索引；
+    ProgressTracker 的 INSERT ... ON CONFLICT (user_id, <键>) DO UPDATE 依赖这些唯一索引作为冲突目标
+    """
+    existing_tables = set(inspect(conn).get_table_names())
+    for table_name in PROGRESS_TABLES:
+        if table_name not in existing_tables:
+            continue  # 之后由 create_all 创建，届时自带索引
+        table = Base.metadata.tables[table_name]
+        for index in sorted(table.indexes, key=lambda i: i.name):
+            if index.unique:
+                removed = _deduplicate(conn, table_name, [c.name for c in index.columns])
+                if removed:
+                    logger.warning(f"{table_name}: 建立 {index.name} 前删除了 {removed} 条重复记录")
+            index.create(conn, checkfirst=True)
+
+
+COMPRESS_BATCH_SIZE = 500
+
+
+def _compress_conversation_json(conn: Connection) -> None:
+    """把对话记录中旧的 JSON 文本改写为压缩 BLOB，学习点中的回复原文改为引用（分批进行）"""
+    from .repositories.progress_tracker import compact_learning_points
+
+    if 'conversation_learning' not in inspect(conn).get_table_names():
+        return
+    last_rowid, converted = 0, 0
+    while True:
+        rows = conn.execute(text(
+            "SELECT rowid, agent_responses, learning_points, corrections_made FROM conversation_learning "
+            "WHERE rowid > :last AND (typeof(agent_responses) = 'text' OR typeof(learning_points) = 'text' "
+            "OR typeof(corrections_made) = 'text') ORDER BY rowid LIMIT :limit"
+        ), {'last': last_rowid, 'limit': COMPRESS_BATCH_SIZE}).all()
+        if not rows:
+            break
+        updates = []
+        for rowid, agent_responses, learning_points, corrections_made in rows:
+            responses = decompress_json(agent_responses) if agent_responses is not None else {}
+            points = decompress_json(learning_points) if learning_points is not None else None
+            corrections = decompress_json(corrections_made) if corrections_made is not None else None
+            if isinstance(points, dict) and isinstance(responses, dict):
+                points = compact_learning_points(points, responses)
+            if isinstance(corrections, list) and isinstance(responses, dict):
+                corrections = compact_learning_points({'corrections': corrections}, responses)['corrections']
+            updates.append({
+                'rowid': rowid,
+                'agent_responses': None if agent_responses is None else compress_json(responses),
+                'learning_points': None if points is None else compress_json(points),
+                'corrections_made': None if corrections is None else compress_json(corrections),
+            })
+        conn.execute(text(
+            "UPDATE conversation_learning SET agent_responses = :agent_responses, "
+            "learning_points = :learning_points, corrections_made = :corrections_made WHERE rowid = :rowid"
+        ), updates)
+        converted += len(rows)
+        last_rowid = rows[-1][0]
+    if converted:
+        logger.info(f"conversation_learning: 已压缩 {converted} 条对话记录（执行 VACUUM 后库文件才会变小）")
+
+
+MIGRATIONS: List[Migration] = [
+    Migration(1, 'progress_indexes', _add_progress_indexes),
+    Migration(2, 'compress_conversation_json', _compress_conversation_json),
+]
+
+
+def run_migrations(engine: Engine, migrations: Optional[List[Migration]] = None) -> List[int]:
+    """执行尚未执行的迁移（每个版本一个事务），返回本次执行的版本号"""
+    migrations = MIGRATIONS if migrations is None else migrations
+
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE IF NOT EXISTS schema_migrations ("
+            "version INTEGER PRIMARY KEY, name TEXT NOT NULL, applied_at TIMESTAMP NOT NULL)"
+        ))
+        applied = {row[0] for row in conn.execute(text("SELECT version FROM schema_migrations"))}
+
+    executed = []
+    for migration in sorted(migrations, key=lambda m: m.version):
+        if migration.version in applied:
+            continue
+        with engine.begin() as conn:
+            migration.upgrade(conn)
+            conn.execute(
+                text("INSERT INTO schema_migrations (version, name, applied_at) VALUES (:version, :name, :applied_at)"),
+                {'version': migration.version, 'name': migration.name, 'applied_at': datetime.now()}
+            )
+        logger.info(f"✅ 已执行数据库迁移 {migration.version:03d}_{migration.name}")
+        executed.append(migration.version)
+
+    return executed
@@ -5,11 +5,13 @@ from datetime import datetime
 from typing import Optional
 import uuid
 import os
-from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy.orm import Session
 from contextlib import contextmanager
 
+from utils.config import settings
+from utils.db_engine import get_engine, get_sessionmaker
+
 
 # 保持原有的dataclass模型
 @dataclass
@@ -41,26 +43,24 @@ class MessageMetadata:
 
 # === 新增 SQLAlchemy 支持 ===
 
-# 数据库配置
-DATABASE_URL = "sqlite:///C:/Users/1/Desktop/日语学习智能体/japanese-learning-agents/database/japanese_learning.db"
+# 数据库配置（PROGRESS_DATABASE_URL）
+DATABASE_URL = settings.PROGRESS_DATABASE_URL
 
-# 创建数据库引擎
-engine = create_engine(
-    DATABASE_URL,
-    connect_args={"check_same_thread": False} if "sqlite" in DATABASE_URL else {},
-    echo=False  # 设置为True可以看到SQL语句
-)
+# 共享的写引擎 / 只读引擎（WAL 等设置见 utils.db_engine）
+engine = get_engine(DATABASE_URL)
+read_engine = get_engine(DATABASE_URL, readonly=True)
 
 # 创建会话工厂
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+SessionLocal = get_sessionmaker(DATABASE_URL)
+ReadSessionLocal = get_sessionmaker(DATABASE_URL, readonly=True)
 
 # SQLAlchemy声明基类
 Base = declarative_base()
 
 
-def get_db_session() -> Session:
-    """获取数据库会话"""
-    return SessionLocal()
+def get_db_session(readonly: bool = False) -> Session:
+    """获取数据库会话；只读查询传 readonly=True，走只读连接池，不占用写连接"""
+    return ReadSessionLocal() if readonly else SessionLocal()
 
 
 @contextmanager
@@ -94,6 +94,10 @@ def init_database():
         
         # 创建所有表
         Base.metadata.create_all(bind=engine)
+
+        # 已有库补索引等（create_all 不会修改已存在的表）
+        from ..migrations import run_migrations
+        run_migrations(engine)
         
         print("✅ 数据库初始化完成")
         print(f"📍 数据库位置: {DATABASE_URL}")
@@ -4,14 +4,19 @@
 实现学习进度追踪的核心数据结构
 """
 
-from sqlalchemy import Column, String, Float, Integer, DateTime, Text, JSON
+from sqlalchemy import Column, String, Float, Integer, DateTime, Text, JSON, Index
 from sqlalchemy.sql import func
+from utils.compression import CompressedJSON
 from .base import Base
 
 
 class LearningProgress(Base):
     """学习进度记录表"""
     __tablename__ = 'learning_progress'
+    __table_args__ = (
+        Index('uq_learning_progress_user_point', 'user_id', 'grammar_point', unique=True),
+        Index('ix_learning_progress_user_next_review', 'user_id', 'next_review'),
+    )
 
     id = Column(String, primary_key=True)
     user_id = Column(String, default='demo_user')
@@ -32,6 +37,10 @@ class LearningProgress(Base):
 class VocabularyProgress(Base):
     """词汇学习进度表"""
     __tablename__ = 'vocabulary_progress'
+    __table_args__ = (
+        Index('uq_vocabulary_progress_user_word', 'user_id', 'word', unique=True),
+        Index('ix_vocabulary_progress_user_next_review', 'user_id', 'next_review'),
+    )
 
     id = Column(String, primary_key=True)
     user_id = Column(String, default='demo_user')
@@ -56,14 +65,17 @@ class VocabularyProgress(Base):
 class ConversationLearning(Base):
     """对话学习记录表"""
     __tablename__ = 'conversation_learning'
+    __table_args__ = (
+        Index('ix_conversation_learning_user_timestamp', 'user_id', 'timestamp'),
+    )
 
     id = Column(String, primary_key=True)
     user_id = Column(String, default='demo_user')
     session_id = Column(String, nullable=False)
     user_input = Column(Text)
-    agent_responses = Column(JSON)  # 智能体回复JSON
-    learning_points = Column(JSON)  # 提取的学习点
-    corrections_made = Column(JSON)  # 语法纠正记录
+    agent_responses = Column(CompressedJSON)  # 智能体回复JSON（压缩存储）
+    learning_points = Column(CompressedJSON)  # 提取的学习点（回复原文以 *_ref 引用 agent_responses）
+    corrections_made = Column(CompressedJSON)  # 语法纠正记录（同上）
     participating_agents = Column(JSON)  # 参与的智能体
     scene_context = Column(String, default='general')
     timestamp = Column(DateTime, default=func.now())
@@ -75,6 +87,9 @@ class ConversationLearning(Base):
 class UserStats(Base):
     """用户学习统计表"""
     __tablename__ = 'user_stats'
+    __table_args__ = (
+        Index('uq_user_stats_user', 'user_id', unique=True),
+    )
 
     id = Column(String, primary_key=True)
     user_id = Column(String, default='demo_user')
@@ -97,6 +112,9 @@ class UserStats(Base):
 class CulturalKnowledge(Base):
     """文化知识学习记录"""
     __tablename__ = 'cultural_knowledge'
+    __table_args__ = (
+        Index('uq_cultural_knowledge_user_topic', 'user_id', 'topic', unique=True),
+    )
 
     id = Column(String, primary_key=True)
     user_id = Column(String, default='demo_user')
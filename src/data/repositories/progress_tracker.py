@@ -4,13 +4,25 @@
 负责收集、计算和存储学习进度数据
 """
 
+import copy
 import uuid
 import json
+import logging
+import math
 import re
+import threading
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Any
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, desc, func
+from sqlalchemy import and_, bindparam, case, desc, func
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from utils.cache import LRUCache
+from utils.config import settings
+from utils.db_engine import begin_immediate
+from utils.keyword_matcher import KeywordMatcher
+from utils.metrics import count_db_queries
+from utils.tracing import traced
 
 from ..models.learning import (
     LearningProgress, VocabularyProgress, ConversationLearning,
@@ -18,326 +30,564 @@ from ..models.learning import (
 )
 from ..models.base import get_db_session
 
+logger = logging.getLogger(__name__)
+
+# 掌握度低于该值视为薄弱
+WEAK_MASTERY_THRESHOLD = 0.3
+
+# 常见的语法指示词；回复中同时出现“语法 / 文法”才算语法解释
+GRAMMAR_MATCHER = KeywordMatcher({
+    'indicator': [
+        'を', 'が', 'に', 'で', 'から', 'まで', 'と', 'や',
+        'です', 'ます', 'た', 'だ', 'である',
+        '〜て', '〜た', '〜ない', '〜る',
+        '敬语', '谦让语', '丁宁语'
+    ],
+    'grammar_context': ['语法', '文法'],
+})
+
+# 纠正指示词
+CORRECTION_MATCHER = KeywordMatcher({
+    'indicator': ['应该是', '正确的是', '改为', '错误', '不对', '修正'],
+})
+
+# 文化关键词
+CULTURAL_MATCHER = KeywordMatcher({
+    'topic': [
+        '传统', '文化', '历史', '节日', '仪式', '茶道', '武士道',
+        '和服', '寺庙', '神社', '祭り', '桜', '新年', '盂兰盆节'
+    ],
+})
+
+# 进度摘要缓存（按用户，短 TTL；写入学习数据后失效）
+_summary_cache = LRUCache(max_entries=1024, ttl_seconds=settings.PROGRESS_SUMMARY_CACHE_TTL)
+_summary_cache_lock = threading.Lock()
+
+
+def invalidate_progress_summary(user_id: str = 'demo_user') -> None:
+    """使该用户的进度摘要缓存失效"""
+    with _summary_cache_lock:
+        _summary_cache.delete(user_id)
+
+
+def compact_learning_points(learning_data: Dict, agent_responses: Dict) -> Dict:
+    """
+    存储前去重：学习点中与某条智能体回复原文相同的字段（explanation / corrected / context 等）
+    改为 <字段>_ref = 智能体键名，原文只在 agent_responses 中存一份
+    """
+    by_content = {}
+    for agent_key, response in agent_responses.items():
+        if isinstance(response, dict) and response.get('content'):
+            by_content.setdefault(response['content'], agent_key)
+
+    compacted = {}
+    for key, value in learning_data.items():
+        if not isinstance(value, list):
+            compacted[key] = value
+            continue
+        items = []
+        for item in value:
+            if isinstance(item, dict):
+                compact_item = {}
+                for field, text in item.items():
+                    if isinstance(text, str) and text in by_content:
+                        compact_item[f'{field}_ref'] = by_content[text]
+                    else:
+                        compact_item[field] = text
+                item = compact_item
+            items.append(item)
+        compacted[key] = items
+    return compacted
+
+
+def expand_learning_points(stored: Dict, agent_responses: Dict) -> Dict:
+    """compact_learning_points 的逆操作：把 *_ref 还原为对应智能体回复的原文"""
+    expanded = {}
+    for key, value in stored.items():
+        if not isinstance(value, list):
+            expanded[key] = value
+            continue
+        items = []
+        for item in value:
+            if isinstance(item, dict):
+                restored = {}
+                for field, text in item.items():
+                    if field.endswith('_ref') and text in agent_responses:
+                        restored[field[:-4]] = agent_responses[text].get('content', '')
+                    else:
+                        restored[field] = text
+                item = restored
+            items.append(item)
+        expanded[key] = items
+    return expanded
+
+
+def collect_learning_data(user_input: str, agent_responses: Dict) -> Dict:
+    """从智能体回复中提取学习数据（纯计算，不需要追踪器或数据库会话）"""
+    learning_data = {
+        'grammar_points': [],
+        'vocabulary': [],
+        'cultural_topics': [],
+        'corrections': [],
+        'conversation_id': str(uuid.uuid4())
+    }
+
+    # 分析每个智能体的回复
+    for agent_name, response in agent_responses.items():
+        if isinstance(response, dict):
+            content = response.get('content', '')
+            agent_id = response.get('agent_name', agent_name)
+
+            # 根据智能体类型提取不同的学习数据
+            if '田中先生' in agent_id or 'tanaka' in agent_id.lower():
+                learning_data['grammar_points'].extend(
+                    _extract_grammar_points(content, user_input)
+                )
+                learning_data['corrections'].extend(
+                    _extract_corrections(content, user_input)
+                )
+
+            elif '小美' in agent_id or 'koumi' in agent_id.lower():
+                learning_data['vocabulary'].extend(
+                    _extract_casual_vocabulary(content)
+                )
+
+            elif '山田先生' in agent_id or 'yamada' in agent_id.lower():
+                learning_data['cultural_topics'].extend(
+                    _extract_cultural_topics(content)
+                )
+
+            elif 'アイ' in agent_id or 'ai' in agent_id.lower():
+                # AI分析师可能提供学习建议和难度评估
+                pass
+
+    return learning_data
+
+
+def _extract_grammar_points(agent_content: str, user_input: str) -> List[Dict]:
+    """提取语法点（田中先生的专长）"""
+    grammar_points = []
+
+    # 在智能体回复中查找语法解释（一次匹配同时得到语法指示词与“语法/文法”）
+    hits = GRAMMAR_MATCHER.match(agent_content)
+    if 'grammar_context' not in hits:
+        return grammar_points
+
+    for indicator in hits.get('indicator', []):
+        grammar_points.append({
+            'point': indicator,
+            'explanation': agent_content,
+            'user_example': user_input,
+            'difficulty': _estimate_grammar_difficulty(indicator),
+            'source_agent': 'tanaka'
+        })
+
+    return grammar_points
+
+
+def _extract_corrections(agent_content: str, user_input: str) -> List[Dict]:
+    """提取语法纠正"""
+    corrections = []
+
+    # 查找纠正指示词（每个命中的指示词记一条）
+    for _ in CORRECTION_MATCHER.match(agent_content).get('indicator', []):
+        corrections.append({
+            'original': user_input,
+            'corrected': agent_content,
+            'error_type': 'grammar',
+            'explanation': agent_content,
+            'source_agent': 'tanaka'
+        })
+
+    return corrections
+
+
+def _extract_casual_vocabulary(agent_content: str) -> List[Dict]:
+    """提取口语词汇（小美的专长）"""
+    vocabulary = []
+
+    # 日语词汇模式匹配
+    japanese_pattern = r'[ひらがなカタカナ一-龯]+'
+    words = re.findall(japanese_pattern, agent_content)
+
+    for word in words:
+        if len(word) >= 2:  # 过滤单字符
+            vocabulary.append({
+                'word': word,
+                'context': agent_content,
+                'type': 'casual',
+                'source_agent': 'koumi'
+            })
+
+    return vocabulary
+
+
+def _extract_cultural_topics(agent_content: str) -> List[Dict]:
+    """提取文化话题（山田先生的专长）"""
+    cultural_topics = []
+
+    # 文化关键词
+    for keyword in CULTURAL_MATCHER.match(agent_content).get('topic', []):
+        cultural_topics.append({
+            'topic': keyword,
+            'content': agent_content,
+            'category': 'traditional_culture',
+            'source_agent': 'yamada'
+        })
+
+    return cultural_topics
+
+
+def _estimate_grammar_difficulty(grammar_point: str) -> float:
+    """估算语法点难度"""
+    difficulty_map = {
+        'を': 0.2, 'が': 0.3, 'に': 0.4, 'で': 0.3,
+        'です': 0.1, 'ます': 0.2,
+        '敬语': 0.8, '谦让语': 0.9,
+        '〜て': 0.5, '〜た': 0.4
+    }
+    return difficulty_map.get(grammar_point, 0.5)
+
 
 class ProgressTracker:
-    """学习进度追踪器"""
+    """
+    学习进度追踪器（可用作上下文管理器，退出时关闭自己创建的会话）
+
+    并发写入：进度表只有 track_batch 与 reconcile_user_stats 两条写路径，都以 BEGIN IMMEDIATE 开始，
+    学习事件队列、API 线程与定期校正各自持有会话时，写者在 SQLite 写锁上按 busy_timeout 排队；
+    进度行用 ON CONFLICT 合并、用户统计用 SET x = x + :n 累加，不依赖会话里已加载的旧值
+    """
+
+    def __init__(self, session: Optional[Session] = None, readonly: bool = False):
+        # readonly=True 时使用只读连接池（只用于读取摘要等查询）
+        self._owns_session = session is None
+        self.session = session or get_db_session(readonly)
 
-    def __init__(self):
-        self.session = get_db_session()
+    def close(self):
+        """关闭追踪器创建的会话，归还连接；外部传入的会话由调用方负责"""
+        if self._owns_session:
+            self.session.close()
 
+    def __enter__(self) -> 'ProgressTracker':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    @count_db_queries("progress_tracker.extract_learning_data")
+    @traced("progress_tracker.extract_learning_data")
     def extract_learning_data(self, user_input: str, agent_responses: Dict,
                               session_id: str, scene_context: str = 'general') -> Dict:
         """
         从对话中提取学习数据
         不改变现有API的输入输出，只是额外收集数据
         """
-        learning_data = {
-            'grammar_points': [],
-            'vocabulary': [],
-            'cultural_topics': [],
-            'corrections': [],
-            'conversation_id': str(uuid.uuid4())
-        }
+        return self.track_batch([{
+            'user_input': user_input,
+            'agent_responses': agent_responses,
+            'session_id': session_id,
+            'scene_context': scene_context
+        }], isolate_failures=False)[0]
+
+    @count_db_queries("progress_tracker.track_batch")
+    @traced("progress_tracker.track_batch")
+    def track_batch(self, events: List[Dict], isolate_failures: bool = True) -> List[Optional[Dict]]:
+        """
+        批量追踪多条对话（每条含 user_input / agent_responses / session_id / scene_context），
+        全部在同一事务中写入，只提交一次；返回每条对话的学习数据
 
-        # 分析每个智能体的回复
-        for agent_name, response in agent_responses.items():
-            if isinstance(response, dict):
-                content = response.get('content', '')
-                agent_id = response.get('agent_name', agent_name)
-
-                # 根据智能体类型提取不同的学习数据
-                if '田中先生' in agent_id or 'tanaka' in agent_id.lower():
-                    learning_data['grammar_points'].extend(
-                        self._extract_grammar_points(content, user_input)
-                    )
-                    learning_data['corrections'].extend(
-                        self._extract_corrections(content, user_input)
-                    )
-
-                elif '小美' in agent_id or 'koumi' in agent_id.lower():
-                    learning_data['vocabulary'].extend(
-                        self._extract_casual_vocabulary(content)
-                    )
-
-                elif '山田先生' in agent_id or 'yamada' in agent_id.lower():
-                    learning_data['cultural_topics'].extend(
-                        self._extract_cultural_topics(content)
-                    )
-
-                elif 'アイ' in agent_id or 'ai' in agent_id.lower():
-                    # AI分析师可能提供学习建议和难度评估
-                    pass
+        每条对话在自己的保存点（SAVEPOINT）中写入：isolate_failures=True 时某条出错只回滚这一条，
+        结果中对应位置为 None，其余照常提交；为 False 时回滚整批并抛出异常
+        """
+        results = []
+        try:
+            begin_immediate(self.session)
+            for event in events:
+                try:
+                    with self.session.begin_nested():
+                        learning_data = self._track_event(event)
+                except Exception as e:
+                    if not isolate_failures:
+                        raise
+                    logger.error(f"学习事件写入失败，已跳过（session={event.get('session_id')}）: {e}")
+                    learning_data = None
+                results.append(learning_data)
+
+            self.session.commit()
+        except Exception:
+            self.session.rollback()
+            raise
+
+        invalidate_progress_summary('demo_user')
+        return results
+
+    def _track_event(self, event: Dict) -> Dict:
+        """写入一条对话的学习记录与进度（不提交）"""
+        learning_data = collect_learning_data(event['user_input'], event['agent_responses'])
 
         # 存储对话学习记录
         self._save_conversation_learning(
-            user_input, agent_responses, learning_data, session_id, scene_context
+            event['user_input'], event['agent_responses'], learning_data,
+            event['session_id'], event.get('scene_context', 'general')
         )
 
         # 更新各种进度
         self._update_progress_from_learning_data(learning_data)
-
         return learning_data
 
-    def _extract_grammar_points(self, agent_content: str, user_input: str) -> List[Dict]:
-        """提取语法点（田中先生的专长）"""
-        grammar_points = []
-
-        # 常见的语法指示词
-        grammar_indicators = [
-            'を', 'が', 'に', 'で', 'から', 'まで', 'と', 'や',
-            'です', 'ます', 'た', 'だ', 'である',
-            '〜て', '〜た', '〜ない', '〜る',
-            '敬语', '谦让语', '丁宁语'
-        ]
-
-        # 在智能体回复中查找语法解释
-        for indicator in grammar_indicators:
-            if indicator in agent_content and ('语法' in agent_content or '文法' in agent_content):
-                grammar_points.append({
-                    'point': indicator,
-                    'explanation': agent_content,
-                    'user_example': user_input,
-                    'difficulty': self._estimate_grammar_difficulty(indicator),
-                    'source_agent': 'tanaka'
-                })
-
-        return grammar_points
-
-    def _extract_corrections(self, agent_content: str, user_input: str) -> List[Dict]:
-        """提取语法纠正"""
-        corrections = []
-
-        # 查找纠正指示词
-        correction_indicators = ['应该是', '正确的是', '改为', '错误', '不对', '修正']
-
-        for indicator in correction_indicators:
-            if indicator in agent_content:
-                corrections.append({
-                    'original': user_input,
-                    'corrected': agent_content,
-                    'error_type': 'grammar',
-                    'explanation': agent_content,
-                    'source_agent': 'tanaka'
-                })
-
-        return corrections
-
-    def _extract_casual_vocabulary(self, agent_content: str) -> List[Dict]:
-        """提取口语词汇（小美的专长）"""
-        vocabulary = []
-
-        # 日语词汇模式匹配
-        japanese_pattern = r'[ひらがなカタカナ一-龯]+'
-        words = re.findall(japanese_pattern, agent_content)
-
-        for word in words:
-            if len(word) >= 2:  # 过滤单字符
-                vocabulary.append({
-                    'word': word,
-                    'context': agent_content,
-                    'type': 'casual',
-                    'source_agent': 'koumi'
-                })
-
-        return vocabulary
-
-    def _extract_cultural_topics(self, agent_content: str) -> List[Dict]:
-        """提取文化话题（山田先生的专长）"""
-        cultural_topics = []
-
-        # 文化关键词
-        cultural_keywords = [
-            '传统', '文化', '历史', '节日', '仪式', '茶道', '武士道',
-            '和服', '寺庙', '神社', '祭り', '桜', '新年', '盂兰盆节'
-        ]
-
-        for keyword in cultural_keywords:
-            if keyword in agent_content:
-                cultural_topics.append({
-                    'topic': keyword,
-                    'content': agent_content,
-                    'category': 'traditional_culture',
-                    'source_agent': 'yamada'
-                })
-
-        return cultural_topics
-
-    def _estimate_grammar_difficulty(self, grammar_point: str) -> float:
-        """估算语法点难度"""
-        difficulty_map = {
-            'を': 0.2, 'が': 0.3, 'に': 0.4, 'で': 0.3,
-            'です': 0.1, 'ます': 0.2,
-            '敬语': 0.8, '谦让语': 0.9,
-            '〜て': 0.5, '〜た': 0.4
-        }
-        return difficulty_map.get(grammar_point, 0.5)
-
     def _save_conversation_learning(self, user_input: str, agent_responses: Dict,
                                     learning_data: Dict, session_id: str, scene_context: str):
-        """保存对话学习记录"""
+        """保存对话学习记录（由 extract_learning_data 统一提交）"""
+        # 学习点里重复的回复原文改为引用，只在 agent_responses 中保存一份
+        learning_points = compact_learning_points(learning_data, agent_responses)
         conversation = ConversationLearning(
             id=learning_data['conversation_id'],
             session_id=session_id,
             user_input=user_input,
             agent_responses=agent_responses,
-            learning_points=learning_data,
-            corrections_made=learning_data['corrections'],
+            learning_points=learning_points,
+            corrections_made=learning_points['corrections'],
             participating_agents=list(agent_responses.keys()),
             scene_context=scene_context
         )
 
         self.session.add(conversation)
-        self.session.commit()
 
     def _update_progress_from_learning_data(self, learning_data: Dict):
-        """根据学习数据更新进度"""
-        # 更新语法进度
-        for grammar in learning_data['grammar_points']:
-            self._update_grammar_progress(grammar)
+        """根据学习数据更新进度（每张表一条 INSERT ... ON CONFLICT DO UPDATE）"""
+        # 更新语法进度（记录新增条数，用于增量更新统计）
+        new_grammar_points = self._update_grammar_progress(learning_data['grammar_points'])
 
         # 更新词汇进度
-        for vocab in learning_data['vocabulary']:
-            self._update_vocabulary_progress(vocab)
+        new_vocabulary = self._update_vocabulary_progress(learning_data['vocabulary'])
 
         # 更新文化知识
-        for cultural in learning_data['cultural_topics']:
-            self._update_cultural_knowledge(cultural)
-
-        # 更新用户统计
-        self._update_user_stats()
+        self._update_cultural_knowledge(learning_data['cultural_topics'])
 
-    def _update_grammar_progress(self, grammar_data: Dict):
-        """更新语法学习进度"""
-        point = grammar_data['point']
-
-        # 查找现有记录
-        existing = self.session.query(LearningProgress).filter(
-            and_(
-                LearningProgress.user_id == 'demo_user',
-                LearningProgress.grammar_point == point
-            )
-        ).first()
+        # 更新用户统计（本条对话 + 新增的词汇 / 语法点）
+        self._update_user_stats(
+            new_conversations=1,
+            new_vocabulary=new_vocabulary,
+            new_grammar_points=new_grammar_points
+        )
 
-        if existing:
-            # 更新现有记录
-            existing.practice_count += 1
-            existing.last_reviewed = datetime.now()
-            # 简单的掌握度计算：practice_count的对数函数
-            import math
-            existing.mastery_level = min(1.0, math.log(existing.practice_count + 1) / 5)
-            existing.difficulty_rating = grammar_data['difficulty']
-        else:
-            # 创建新记录
-            new_progress = LearningProgress(
-                id=str(uuid.uuid4()),
-                grammar_point=point,
-                practice_count=1,
-                mastery_level=0.1,
-                difficulty_rating=grammar_data['difficulty'],
-                agent_source=grammar_data['source_agent']
+    @staticmethod
+    def _group(items: List[Dict], key: str) -> Dict[str, List[Dict]]:
+        """按键分组（保持首次出现的顺序）；同一条消息中重复出现的次数即本次的练习 / 复习次数"""
+        groups: Dict[str, List[Dict]] = {}
+        for item in items:
+            groups.setdefault(item[key], []).append(item)
+        return groups
+
+    def _upsert(self, model, key: str, rows: List[Dict], set_: Dict, returning=()) -> list:
+        """按 (user_id, key) 唯一索引批量 upsert，返回 RETURNING 的行"""
+        if not rows:
+            return []
+        stmt = sqlite_insert(model).values(rows)
+        stmt = stmt.on_conflict_do_update(index_elements=[model.user_id, getattr(model, key)], set_=set_(stmt.excluded))
+        if returning:
+            return self.session.execute(stmt.returning(*returning)).all()
+        self.session.execute(stmt)
+        return []
+
+    @staticmethod
+    def _grammar_mastery(practice_count: int) -> float:
+        """语法掌握度：第一次练习 0.1，之后为练习次数的对数函数"""
+        if practice_count <= 1:
+            return 0.1
+        return min(1.0, math.log(practice_count + 1) / 5)
+
+    def _update_grammar_progress(self, grammar_points: List[Dict]) -> int:
+        """更新语法学习进度，返回新增记录数"""
+        now = datetime.now()
+        rows = []
+        for point, items in self._group(grammar_points, 'point').items():
+            rows.append({
+                'id': str(uuid.uuid4()),
+                'user_id': 'demo_user',
+                'grammar_point': point,
+                'practice_count': len(items),
+                'mastery_level': self._grammar_mastery(len(items)),
+                'difficulty_rating': items[-1]['difficulty'],
+                'agent_source': items[0]['source_agent'],
+                'last_reviewed': now
+            })
+        table = LearningProgress.__table__
+        returned = self._upsert(LearningProgress, 'grammar_point', rows, lambda excluded: {
+            'practice_count': table.c.practice_count + excluded.practice_count,
+            'last_reviewed': excluded.last_reviewed,
+            'difficulty_rating': excluded.difficulty_rating,
+        }, returning=(table.c.id, table.c.grammar_point, table.c.practice_count))
+
+        # 掌握度是练习次数的对数，已有记录按累加后的次数补写（一次 executemany）
+        inserted_ids = {row['id'] for row in rows}
+        created = sum(1 for row in returned if row.id in inserted_ids)
+        mastery = [
+            {'row_id': row.id, 'mastery': self._grammar_mastery(row.practice_count)}
+            for row in returned if row.id not in inserted_ids
+        ]
+        if mastery:
+            self.session.execute(
+                table.update().where(table.c.id == bindparam('row_id')).values(mastery_level=bindparam('mastery')),
+                mastery
             )
-            self.session.add(new_progress)
-
-        self.session.commit()
+        return created
+
+    def _update_vocabulary_progress(self, vocabulary: List[Dict]) -> int:
+        """更新词汇学习进度，返回新增记录数"""
+        rows = []
+        for word, items in self._group(vocabulary, 'word').items():
+            rows.append({
+                'id': str(uuid.uuid4()),
+                'user_id': 'demo_user',
+                'word': word,
+                'meaning': '',  # 可以后续补充
+                'times_reviewed': len(items),
+                # 简单的记忆强度计算
+                'mastery_score': min(1.0, len(items) * 0.1),
+                'agent_source': items[0]['source_agent']
+            })
+        table = VocabularyProgress.__table__
+        returned = self._upsert(VocabularyProgress, 'word', rows, lambda excluded: {
+            'times_reviewed': table.c.times_reviewed + excluded.times_reviewed,
+            'mastery_score': func.min(1.0, (table.c.times_reviewed + excluded.times_reviewed) * 0.1),
+        }, returning=(table.c.id,))
 
-    def _update_vocabulary_progress(self, vocab_data: Dict):
-        """更新词汇学习进度"""
-        word = vocab_data['word']
+        inserted_ids = {row['id'] for row in rows}
+        return sum(1 for row in returned if row.id in inserted_ids)
 
-        # 查找现有记录
-        existing = self.session.query(VocabularyProgress).filter(
-            and_(
-                VocabularyProgress.user_id == 'demo_user',
-                VocabularyProgress.word == word
-            )
-        ).first()
+    def _update_cultural_knowledge(self, cultural_topics: List[Dict]):
+        """更新文化知识"""
+        rows = []
+        for topic, items in self._group(cultural_topics, 'topic').items():
+            rows.append({
+                'id': str(uuid.uuid4()),
+                'user_id': 'demo_user',
+                'topic': topic,
+                'content_summary': items[0]['content'],
+                'learned_from_agent': items[0]['source_agent'],
+                'understanding_level': min(1.0, 0.1 * len(items))
+            })
+        table = CulturalKnowledge.__table__
+        self._upsert(CulturalKnowledge, 'topic', rows, lambda excluded: {
+            'understanding_level': func.min(1.0, table.c.understanding_level + excluded.understanding_level),
+        })
 
-        if existing:
-            existing.times_reviewed += 1
-            # 简单的记忆强度计算
-            existing.mastery_score = min(1.0, existing.times_reviewed * 0.1)
-        else:
-            # 创建新词汇记录
-            new_vocab = VocabularyProgress(
-                id=str(uuid.uuid4()),
-                word=word,
-                meaning='',  # 可以后续补充
-                times_reviewed=1,
-                mastery_score=0.1,
-                agent_source=vocab_data['source_agent']
+    def _update_user_stats(self, new_conversations: int = 0, new_vocabulary: int = 0,
+                           new_grammar_points: int = 0):
+        """
+        按增量更新用户统计数据（开销与本条消息的学习点数相关，与历史数据量无关）
+        用一条 UPDATE ... SET x = x + :n 在库内原子累加，不做读-改-写，不会覆盖其他写者的累加；
+        统计记录不存在时按全表重新计数创建；累计误差由 reconcile_user_stats 校正
+        """
+        table = UserStats.__table__
+        conversations = func.coalesce(table.c.total_conversations, 0) + new_conversations
+        vocabulary = func.coalesce(table.c.total_vocabulary, 0) + new_vocabulary
+        grammar_points = func.coalesce(table.c.total_grammar_points, 0) + new_grammar_points
+        total_xp = conversations * 10 + vocabulary * 5 + grammar_points * 15
+        result = self.session.execute(
+            table.update().where(table.c.user_id == 'demo_user').values(
+                total_conversations=conversations,
+                total_vocabulary=vocabulary,
+                total_grammar_points=grammar_points,
+                total_xp=total_xp,
+                level=func.max(1, total_xp // 500 + 1),  # 与 _apply_xp 一致
+                last_active=datetime.now()
             )
-            self.session.add(new_vocab)
+        )
 
-        self.session.commit()
+        if result.rowcount == 0:
+            # 先写出本事务中待插入的记录，再全表计数
+            self.session.flush()
+            self._recount_user_stats('demo_user')
 
-    def _update_cultural_knowledge(self, cultural_data: Dict):
-        """更新文化知识"""
-        topic = cultural_data['topic']
-
-        existing = self.session.query(CulturalKnowledge).filter(
-            and_(
-                CulturalKnowledge.user_id == 'demo_user',
-                CulturalKnowledge.topic == topic
-            )
-        ).first()
+    @staticmethod
+    def _apply_xp(user_stats: UserStats):
+        """根据计数计算经验值与等级"""
+        # 计算经验值（简单算法）
+        user_stats.total_xp = (
+                user_stats.total_conversations * 10 +
+                user_stats.total_vocabulary * 5 +
+                user_stats.total_grammar_points * 15
+        )
 
-        if existing:
-            existing.understanding_level = min(1.0, existing.understanding_level + 0.1)
-        else:
-            new_cultural = CulturalKnowledge(
-                id=str(uuid.uuid4()),
-                topic=topic,
-                content_summary=cultural_data['content'],
-                learned_from_agent=cultural_data['source_agent'],
-                understanding_level=0.1
-            )
-            self.session.add(new_cultural)
+        # 计算等级（每500XP升一级）
+        user_stats.level = max(1, user_stats.total_xp // 500 + 1)
 
-        self.session.commit()
+    @count_db_queries("progress_tracker.reconcile_user_stats")
+    @traced("progress_tracker.reconcile_user_stats")
+    def reconcile_user_stats(self, user_id: str = 'demo_user') -> Dict[str, int]:
+        """
+        全表重新计数校正用户统计（定期 / 按需运行），返回各计数的修正量
 
-    def _update_user_stats(self):
-        """更新用户统计数据"""
+        计数与写回在同一个 BEGIN IMMEDIATE 事务中：期间其他写者（学习事件队列）在写锁上等待，
+        不会有增量在“计数之后、写回之前”提交而被覆盖
+        """
+        try:
+            begin_immediate(self.session)
+            drift = self._recount_user_stats(user_id)
+            self.session.commit()
+        except Exception:
+            self.session.rollback()
+            raise
+        invalidate_progress_summary(user_id)
+        return drift
+
+    def _recount_user_stats(self, user_id: str) -> Dict[str, int]:
+        """全表重新计数（不提交），返回各计数的修正量"""
         # 获取或创建用户统计记录
-        user_stats = self.session.query(UserStats).filter(
-            UserStats.user_id == 'demo_user'
+        user_stats = self.session.query(UserStats).populate_existing().filter(
+            UserStats.user_id == user_id
         ).first()
 
         if not user_stats:
             user_stats = UserStats(
                 id=str(uuid.uuid4()),
-                user_id='demo_user'
+                user_id=user_id,
+                total_conversations=0,
+                total_vocabulary=0,
+                total_grammar_points=0
             )
             self.session.add(user_stats)
 
-        # 更新统计数据
-        user_stats.total_conversations = self.session.query(ConversationLearning).filter(
-            ConversationLearning.user_id == 'demo_user'
-        ).count()
-
-        user_stats.total_vocabulary = self.session.query(VocabularyProgress).filter(
-            VocabularyProgress.user_id == 'demo_user'
-        ).count()
-
-        user_stats.total_grammar_points = self.session.query(LearningProgress).filter(
-            LearningProgress.user_id == 'demo_user'
-        ).count()
-
-        # 计算经验值（简单算法）
-        user_stats.total_xp = (
-                user_stats.total_conversations * 10 +
-                user_stats.total_vocabulary * 5 +
-                user_stats.total_grammar_points * 15
-        )
-
-        # 计算等级（每500XP升一级）
-        user_stats.level = max(1, user_stats.total_xp // 500 + 1)
-
-        user_stats.last_active = datetime.now()
+        counts = {
+            'total_conversations': self.session.query(ConversationLearning).filter(
+                ConversationLearning.user_id == user_id
+            ).count(),
+            'total_vocabulary': self.session.query(VocabularyProgress).filter(
+                VocabularyProgress.user_id == user_id
+            ).count(),
+            'total_grammar_points': self.session.query(LearningProgress).filter(
+                LearningProgress.user_id == user_id
+            ).count()
+        }
 
-        self.session.commit()
+        drift = {}
+        for field_name, count in counts.items():
+            drift[field_name] = count - (getattr(user_stats, field_name) or 0)
+            setattr(user_stats, field_name, count)
+        self._apply_xp(user_stats)
+        return drift
 
+    @count_db_queries("progress_tracker.get_user_progress_summary")
+    @traced("progress_tracker.get_user_progress_summary")
     def get_user_progress_summary(self, user_id: str = 'demo_user') -> Dict:
-        """获取用户学习进度摘要"""
+        """获取用户学习进度摘要（短时间内重复请求直接返回缓存）"""
+        if settings.PROGRESS_SUMMARY_CACHE_TTL > 0:
+            with _summary_cache_lock:
+                cached = _summary_cache.get(user_id)
+            if cached is not None:
+                return copy.deepcopy(cached)
+
+        summary = self._build_progress_summary(user_id)
+
+        if settings.PROGRESS_SUMMARY_CACHE_TTL > 0:
+            with _summary_cache_lock:
+                _summary_cache.set(user_id, copy.deepcopy(summary))
+        return summary
+
+    def _build_progress_summary(self, user_id: str) -> Dict:
+        """在数据库中聚合计算进度摘要（查询数固定，不随学习记录数增长）"""
         # 用户统计
         user_stats = self.session.query(UserStats).filter(
             UserStats.user_id == user_id
@@ -346,27 +596,26 @@ class ProgressTracker:
         if not user_stats:
             return self._get_empty_progress()
 
-        # 语法进度
-        grammar_progress = self.session.query(LearningProgress).filter(
-            LearningProgress.user_id == user_id
-        ).all()
-
-        # 词汇进度
-        vocab_progress = self.session.query(VocabularyProgress).filter(
-            VocabularyProgress.user_id == user_id
-        ).all()
-
-        # 文化知识
-        cultural_progress = self.session.query(CulturalKnowledge).filter(
-            CulturalKnowledge.user_id == user_id
-        ).all()
+        # 语法 / 词汇 / 文化：条数、平均掌握度、薄弱条数
+        grammar_count, avg_grammar_mastery, weak_grammar_count = self._aggregate(
+            LearningProgress, LearningProgress.mastery_level, user_id
+        )
+        vocab_count, avg_vocab_mastery, weak_vocab_count = self._aggregate(
+            VocabularyProgress, VocabularyProgress.mastery_score, user_id
+        )
+        cultural_count, avg_cultural_understanding, _ = self._aggregate(
+            CulturalKnowledge, CulturalKnowledge.understanding_level, user_id
+        )
 
-        # 计算平均掌握度
-        avg_grammar_mastery = sum(g.mastery_level for g in grammar_progress) / len(
-            grammar_progress) if grammar_progress else 0
-        avg_vocab_mastery = sum(v.mastery_score for v in vocab_progress) / len(vocab_progress) if vocab_progress else 0
-        avg_cultural_understanding = sum(c.understanding_level for c in cultural_progress) / len(
-            cultural_progress) if cultural_progress else 0
+        # 最多显示3个薄弱语法点
+        weak_grammar = []
+        if weak_grammar_count:
+            weak_grammar = [row.grammar_point for row in self.session.query(LearningProgress.grammar_point).filter(
+                and_(
+                    LearningProgress.user_id == user_id,
+                    LearningProgress.mastery_level < WEAK_MASTERY_THRESHOLD
+                )
+            ).limit(3)]
 
         return {
             'user_stats': {
@@ -377,17 +626,17 @@ class ProgressTracker:
             },
             'skills': {
                 'vocabulary': {
-                    'count': len(vocab_progress),
+                    'count': vocab_count,
                     'mastery': avg_vocab_mastery,
                     'percentage': int(avg_vocab_mastery * 100)
                 },
                 'grammar': {
-                    'count': len(grammar_progress),
+                    'count': grammar_count,
                     'mastery': avg_grammar_mastery,
                     'percentage': int(avg_grammar_mastery * 100)
                 },
                 'cultural': {
-                    'count': len(cultural_progress),
+                    'count': cultural_count,
                     'understanding': avg_cultural_understanding,
                     'percentage': int(avg_cultural_understanding * 100)
                 },
@@ -396,10 +645,19 @@ class ProgressTracker:
                     'percentage': min(100, user_stats.total_conversations * 2)  # 简单计算
                 }
             },
-            'weak_points': self._identify_weak_points(grammar_progress, vocab_progress),
-            'recommendations': self._generate_recommendations(user_stats, grammar_progress, vocab_progress)
+            'weak_points': self._identify_weak_points(weak_grammar, weak_vocab_count),
+            'recommendations': self._generate_recommendations(user_stats, grammar_count, vocab_count)
         }
 
+    def _aggregate(self, model, score_column, user_id: str) -> tuple:
+        """一次查询得到 (条数, 平均分, 低于薄弱阈值的条数)"""
+        count, average, weak = self.session.query(
+            func.count(model.id),
+            func.avg(score_column),
+            func.sum(case((score_column < WEAK_MASTERY_THRESHOLD, 1), else_=0))
+        ).filter(model.user_id == user_id).one()
+        return count, float(average or 0), int(weak or 0)
+
     def _get_empty_progress(self) -> Dict:
         """返回空的进度数据"""
         return {
@@ -414,39 +672,37 @@ class ProgressTracker:
             'recommendations': [{'priority': 'high', 'title': '开始学习', 'description': '开始你的日语学习之旅吧！'}]
         }
 
-    def _identify_weak_points(self, grammar_progress: List, vocab_progress: List) -> List[str]:
+    def _identify_weak_points(self, weak_grammar: List[str], weak_vocab_count: int) -> List[str]:
         """识别薄弱环节"""
         weak_points = []
 
         # 掌握度低于0.3的语法点
-        weak_grammar = [g.grammar_point for g in grammar_progress if g.mastery_level < 0.3]
         if weak_grammar:
             weak_points.extend(weak_grammar[:3])  # 最多显示3个
 
         # 记忆强度低的词汇
-        weak_vocab = len([v for v in vocab_progress if v.mastery_score < 0.3])
-        if weak_vocab > 10:
+        if weak_vocab_count > 10:
             weak_points.append('词汇记忆')
 
         return weak_points
 
-    def _generate_recommendations(self, user_stats, grammar_progress: List, vocab_progress: List) -> List[Dict]:
+    def _generate_recommendations(self, user_stats, grammar_count: int, vocab_count: int) -> List[Dict]:
         """生成学习建议"""
         recommendations = []
 
         # 基于数据生成建议
-        if len(vocab_progress) < 50:
+        if vocab_count < 50:
             recommendations.append({
                 'priority': 'high',
                 'title': '扩展词汇量',
-                'description': f'你目前掌握了{len(vocab_progress)}个词汇，建议增加到50个以上。'
+                'description': f'你目前掌握了{vocab_count}个词汇，建议增加到50个以上。'
             })
 
-        if len(grammar_progress) < 20:
+        if grammar_count < 20:
             recommendations.append({
                 'priority': 'medium',
                 'title': '加强语法学习',
-                'description': f'你已学习{len(grammar_progress)}个语法点，继续保持！'
+                'description': f'你已学习{grammar_count}个语法点，继续保持！'
             })
 
         if user_stats.total_conversations < 10:
@@ -1,63 +1,150 @@
 # src/storage/novel_repo.py
 from __future__ import annotations
-import os, json, datetime as dt
-from typing import Any, Dict, List, Optional
+import os, json, hashlib, threading, datetime as dt
+from typing import Any, Dict, List, Optional, Tuple
 
-from sqlalchemy import create_engine, Column, String, Text, DateTime
-from sqlalchemy.orm import declarative_base, sessionmaker
+from sqlalchemy import Column, String, Text, DateTime, Integer, select, insert, update, delete, func
+from sqlalchemy.orm import declarative_base
+
+from utils.compression import CompressedJSON
+from utils.db_engine import get_engine, get_sessionmaker
 
 # 优先使用你的环境变量/统一数据库；否则退回到本地 sqlite
 DB_URL = os.getenv("NOVEL_DB_URL") or os.getenv("DATABASE_URL") or "sqlite:///./data/novel.db"
 
-engine = create_engine(DB_URL, future=True, echo=False)
-SessionLocal = sessionmaker(engine, autoflush=False, autocommit=False, future=True)
+# 共享引擎（同一 URL 与其他数据模块共用连接池，WAL 等设置见 utils.db_engine）
+engine = get_engine(DB_URL)
+SessionLocal = get_sessionmaker(DB_URL)
+ReadSessionLocal = get_sessionmaker(DB_URL, readonly=True)
 Base = declarative_base()
 
+OUTLINE, MANUSCRIPT = "outline", "manuscript"
+
 class NovelProject(Base):
     __tablename__ = "novel_projects"
     id = Column(String(256), primary_key=True)   # session_id:project
     session_id = Column(String(128), index=True, nullable=False)
     project = Column(String(256), index=True, nullable=False)
-    outline = Column(Text)       # JSON
-    manuscript = Column(Text)    # JSON
+    outline = Column(Text)       # 旧版整体 JSON（保存后迁移到 novel_items 并清空）
+    manuscript = Column(Text)    # 旧版整体 JSON（同上）
+    updated_at = Column(DateTime, default=dt.datetime.utcnow)
+
+class NovelItem(Base):
+    """大纲 / 正文的单条（章节或段落），按位置存储，内容哈希用于判断是否需要重写"""
+    __tablename__ = "novel_items"
+    project_id = Column(String(256), primary_key=True)
+    kind = Column(String(16), primary_key=True)      # outline | manuscript
+    position = Column(Integer, primary_key=True)
+    content_hash = Column(String(40), nullable=False)
+    content = Column(CompressedJSON, nullable=False) # 压缩 JSON（旧行为 JSON 文本，可照常读取）
     updated_at = Column(DateTime, default=dt.datetime.utcnow)
 
+_schema_ready = False
+_schema_lock = threading.Lock()
+
 def init_db():
-    os.makedirs("./data", exist_ok=True)
-    Base.metadata.create_all(engine)
+    """建表；应用启动时调用一次，之后的 save/load 不再执行 create_all"""
+    global _schema_ready
+    with _schema_lock:
+        if _schema_ready:
+            return
+        os.makedirs("./data", exist_ok=True)
+        Base.metadata.create_all(engine)
+        _schema_ready = True
+
+def _dumps(item: Any) -> str:
+    return json.dumps(item, ensure_ascii=False, sort_keys=True)
+
+def _sync_items(db, pid: str, kind: str, items: List[Dict[str, Any]], now: dt.datetime) -> Tuple[int, int]:
+    """只写入内容有变化的位置，删除多出来的位置；返回 (写入条数, 删除条数)"""
+    existing = dict(db.execute(
+        select(NovelItem.position, NovelItem.content_hash)
+        .where(NovelItem.project_id == pid, NovelItem.kind == kind)
+    ).all())
+    new_rows, written = [], 0
+    for position, item in enumerate(items):
+        digest = hashlib.sha1(_dumps(item).encode("utf-8")).hexdigest()
+        old = existing.get(position)
+        if old == digest:
+            continue
+        written += 1
+        if old is None:
+            new_rows.append({"project_id": pid, "kind": kind, "position": position,
+                             "content_hash": digest, "content": item, "updated_at": now})
+        else:
+            db.execute(
+                update(NovelItem)
+                .where(NovelItem.project_id == pid, NovelItem.kind == kind, NovelItem.position == position)
+                .values(content_hash=digest, content=item, updated_at=now)
+            )
+    if new_rows:
+        db.execute(insert(NovelItem), new_rows)
+    deleted = sum(1 for position in existing if position >= len(items))
+    if deleted:
+        db.execute(delete(NovelItem).where(
+            NovelItem.project_id == pid, NovelItem.kind == kind, NovelItem.position >= len(items)
+        ))
+    return written, deleted
 
 def save_project(session_id: str, project: str, outline: List[Dict[str, Any]], manuscript: List[Dict[str, Any]]):
     init_db()
     pid = f"{session_id}:{project}"
     now = dt.datetime.utcnow()
+    written = deleted = 0
     with SessionLocal() as db:
         obj = db.get(NovelProject, pid)
         if obj is None:
-            obj = NovelProject(
-                id=pid, session_id=session_id, project=project,
-                outline=json.dumps(outline, ensure_ascii=False),
-                manuscript=json.dumps(manuscript, ensure_ascii=False),
-                updated_at=now
-            )
+            obj = NovelProject(id=pid, session_id=session_id, project=project, updated_at=now)
             db.add(obj)
         else:
-            obj.outline = json.dumps(outline, ensure_ascii=False)
-            obj.manuscript = json.dumps(manuscript, ensure_ascii=False)
+            # 旧版整体 JSON 由本次完整内容取代
+            obj.outline = obj.manuscript = None
             obj.updated_at = now
+        for kind, items in ((OUTLINE, outline), (MANUSCRIPT, manuscript)):
+            w, d = _sync_items(db, pid, kind, items, now)
+            written, deleted = written + w, deleted + d
         db.commit()
-    return {"ok": True, "id": pid, "updated_at": now.isoformat()+"Z"}
+    return {"ok": True, "id": pid, "updated_at": now.isoformat()+"Z", "written": written, "deleted": deleted}
 
-def load_project(session_id: str, project: str) -> Optional[Dict[str, Any]]:
+def load_project(session_id: str, project: str, offset: int = 0, limit: Optional[int] = None) -> Optional[Dict[str, Any]]:
+    """读取项目；正文可按 [offset, offset+limit) 分段读取，manuscript_total 为正文总条数"""
+    if offset < 0:
+        raise ValueError(f"offset 不能为负数: {offset}")
+    if limit is not None and limit < 1:
+        raise ValueError(f"limit 必须为正整数: {limit}")
     init_db()
     pid = f"{session_id}:{project}"
-    with SessionLocal() as db:
+    with ReadSessionLocal() as db:
         obj = db.get(NovelProject, pid)
         if not obj:
             return None
+        if obj.outline is not None or obj.manuscript is not None:
+            # 旧版数据：整体 JSON，下一次保存时迁移
+            outline = json.loads(obj.outline) if obj.outline else []
+            full = json.loads(obj.manuscript) if obj.manuscript else []
+            total = len(full)
+            manuscript = full[offset:] if limit is None else full[offset:offset + limit]
+        else:
+            outline = list(db.scalars(
+                select(NovelItem.content)
+                .where(NovelItem.project_id == pid, NovelItem.kind == OUTLINE)
+                .order_by(NovelItem.position)
+            ))
+            total = db.scalar(select(func.count()).select_from(NovelItem).where(
+                NovelItem.project_id == pid, NovelItem.kind == MANUSCRIPT
+            ))
+            query = select(NovelItem.content).where(
+                NovelItem.project_id == pid, NovelItem.kind == MANUSCRIPT, NovelItem.position >= offset
+            ).order_by(NovelItem.position)
+            if limit is not None:
+                query = query.where(NovelItem.position < offset + limit)
+            manuscript = list(db.scalars(query))
         return {
             "session_id": obj.session_id,
             "project": obj.project,
-            "outline": json.loads(obj.outline) if obj.outline else [],
-            "manuscript": json.loads(obj.manuscript) if obj.manuscript else [],
+            "outline": outline,
+            "manuscript": manuscript,
+            "manuscript_total": total,
+            "offset": offset,
             "updated_at": (obj.updated_at or dt.datetime.utcnow()).isoformat()+"Z"
         }
@@ -7,8 +7,8 @@ from data.repositories.progress_tracker import ProgressTracker
 def test_database():
     print("测试数据库连接...")
     try:
-        tracker = ProgressTracker()
-        summary = tracker.get_user_progress_summary()
+        with ProgressTracker(readonly=True) as tracker:
+            summary = tracker.get_user_progress_summary()
         print(f"✅ 数据库连接成功")
         print(f"当前进度: 等级{summary['user_stats']['level']}, "
               f"经验值{summary['user_stats']['total_xp']}")
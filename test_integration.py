@@ -9,8 +9,6 @@ from data.repositories.progress_tracker import ProgressTracker
 def test_chat_integration():
     print("测试聊天集成...")
 
-    tracker = ProgressTracker()
-
     # 模拟多轮对话
     conversations = [
         {
@@ -46,12 +44,13 @@ def test_chat_integration():
         print(f"\n对话 {i}:")
         print(f"用户: {conv['user']}")
 
-        learning_data = tracker.extract_learning_data(
-            user_input=conv['user'],
-            agent_responses=conv['agents'],
-            session_id=f"integration_test_{i}",
-            scene_context="test_conversation"
-        )
+        with ProgressTracker() as tracker:
+            learning_data = tracker.extract_learning_data(
+                user_input=conv['user'],
+                agent_responses=conv['agents'],
+                session_id=f"integration_test_{i}",
+                scene_context="test_conversation"
+            )
 
         for agent_name in conv['agents']:
             print(f"{agent_name}: {conv['agents'][agent_name]['content']}")
@@ -60,7 +59,8 @@ def test_chat_integration():
               f"词汇{len(learning_data.get('vocabulary', []))}个")
 
     # 查看最终进度
-    summary = tracker.get_user_progress_summary()
+    with ProgressTracker(readonly=True) as tracker:
+        summary = tracker.get_user_progress_summary()
     print(f"\n最终进度统计:")
     print(f"等级: {summary['user_stats']['level']}")
     print(f"总经验值: {summary['user_stats']['total_xp']}")
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+JSON 列压缩基准测试
+
+用 ProgressTracker 写入同一批对话，比较 conversation_learning 的库文件大小与读取耗时：
+
+- legacy：JSON 文本列，学习点中每条都带完整的回复原文（改造前的存储方式）
+- compressed：CompressedJSON（zlib + 预置字典），学习点以 *_ref 引用回复原文
+
+    python tests/performance/bench_json_compression.py --conversations 2000
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from src.data.models.base import Base  # noqa: E402
+from src.data.models.learning import ConversationLearning  # noqa: E402
+from src.data.repositories.progress_tracker import ProgressTracker  # noqa: E402
+
+TANAKA = ("「{word}を食べます」の「を」は目的語を表す助詞です。语法说明：を 表示动作的对象，"
+          "が 表示主语。敬语的场合应该是「召し上がります」。**中文：** 我吃{word}。")
+KOUMI = "えー、{word}いいじゃん！今度一緒に食べに行こうよ～ **中文：** {word}不错呀！下次一起去吃吧～"
+YAMADA = "{word}は日本の伝統的な食文化の一つです。传统的节日料理和茶道都与此相关，历史悠久。"
+WORDS = ["寿司", "天ぷら", "ラーメン", "お好み焼き", "うどん", "そば", "刺身", "味噌汁"]
+
+
+def _responses(i: int) -> Dict[str, Any]:
+    word = WORDS[i % len(WORDS)]
+    return {
+        "tanaka": {"content": TANAKA.format(word=word) + f"（第{i}回）", "agent_name": "田中先生"},
+        "koumi": {"content": KOUMI.format(word=word), "agent_name": "小美"},
+        "yamada": {"content": YAMADA.format(word=word), "agent_name": "山田先生"},
+    }
+
+
+def run(mode: str, conversations: int) -> Dict[str, Any]:
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "bench.db"
+        engine = create_engine(f"sqlite:///{path}")
+        Base.metadata.create_all(engine)
+        session = sessionmaker(bind=engine)()
+        tracker = ProgressTracker(session=session)
+
+        for i in range(conversations):
+            responses = _responses(i)
+            learning_data = tracker.extract_learning_data(f"{WORDS[i % len(WORDS)]}を食べる", responses, "s1")
+            if mode == "legacy":
+                session.execute(text(
+                    "UPDATE conversation_learning SET agent_responses = :responses, learning_points = :points, "
+                    "corrections_made = :corrections WHERE id = :id"
+                ), {
+                    "id": learning_data["conversation_id"],
+                    "responses": json.dumps(responses, ensure_ascii=False),
+                    "points": json.dumps(learning_data, ensure_ascii=False),
+                    "corrections": json.dumps(learning_data["corrections"], ensure_ascii=False),
+                })
+                session.commit()
+
+        with engine.connect() as conn:
+            conn.exec_driver_sql("VACUUM")
+            column_bytes = conn.execute(text(
+                "SELECT SUM(LENGTH(CAST(agent_responses AS BLOB)) + LENGTH(CAST(learning_points AS BLOB)) "
+                "+ LENGTH(CAST(corrections_made AS BLOB))) "
+                "FROM conversation_learning"
+            )).scalar()
+        session.expire_all()  # 让读取真正走一遍解码
+        started = time.perf_counter()
+        rows = session.query(ConversationLearning).all()
+        loaded = sum(len(row.agent_responses) for row in rows)
+        read_seconds = time.perf_counter() - started
+        session.close()
+        engine.dispose()
+
+        return {
+            "mode": mode,
+            "conversations": conversations,
+            "db_file_kb": round(os.path.getsize(path) / 1024, 1),
+            "json_columns_kb": round(column_bytes / 1024, 1),
+            "read_all_ms": round(read_seconds * 1000, 1),
+            "responses_loaded": loaded,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="JSON 列压缩基准测试")
+    parser.add_argument("--conversations", type=int, default=2000)
+    parser.add_argument("--mode", choices=["legacy", "compressed", "both"], default="both")
+    args = parser.parse_args()
+
+    modes = ["legacy", "compressed"] if args.mode == "both" else [args.mode]
+    results = [run(mode, args.conversations) for mode in modes]
+    print(json.dumps(results, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+关键词匹配微基准
+
+对各智能体 / ProgressTracker 的关键词表，在 1k、2k 字的长回复上比较：
+
+- loops：改造前的写法，逐个关键词 `pattern in user_message or pattern in response`
+- matcher：utils.keyword_matcher.KeywordMatcher（同样是逐个 `in`，文本拼接一次）
+- regex：一个编译好的交替式 `(?=(长|…|短))` 重叠扫描整段文本，再补上被最长命中包含的关键词
+  （结果与 loops 一致）；Python 的 re 逐位置尝试各分支，不是 Aho-Corasick，在这些表上明显更慢，
+  所以 KeywordMatcher 没有采用
+
+    python tests/performance/bench_keyword_matcher.py --lengths 1000 2000 --number 2000
+"""
+
+import argparse
+import json
+import re
+import sys
+import timeit
+from pathlib import Path
+from typing import Any, Dict, List
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from utils.keyword_matcher import KeywordMatcher  # noqa: E402
+
+MODULES = [
+    "src.core.agents.core_agents.tanaka_sensei",
+    "src.core.agents.core_agents.koumi",
+    "src.core.agents.core_agents.yamada_sensei",
+    "src.core.agents.core_agents.sato_coach",
+    "src.core.agents.core_agents.ai_analyzer",
+    "src.core.agents.core_agents.mem_bot",
+    "src.data.repositories.progress_tracker",
+]
+
+# 日中混排的长回复素材（含各表的部分关键词，命中率接近真实回复）
+PARAGRAPH = (
+    "「私は毎日日本語を勉強しています」という文は文法的に正しいです。ここでの「を」は目的語を、"
+    "「は」は主題を表します。语法说明：敬语的场合应该是「勉強しております」。日本の伝統文化、"
+    "例えば茶道や祭りについて学ぶことも、言葉の背景を理解するのに役立ちます。JLPTのN2を目指すなら、"
+    "計画的に復習して、時間管理も意識しましょう。你的学习进度很不错，继续加油！"
+)
+USER_MESSAGE = "我想提高日语语法水平，准备参加N2考试，最近复习效率不高。"
+
+
+def _loops(tables: Dict[str, List[str]], user_message: str, response: str,
+           lower: bool = False) -> Dict[str, List[str]]:
+    if lower:
+        # 原写法：message_lower = message.lower()
+        user_message, response = user_message.lower(), response.lower()
+    result = {}
+    for category, patterns in tables.items():
+        found = [p for p in patterns if p in user_message or p in response]
+        if found:
+            result[category] = found
+    return result
+
+
+class _RegexMatcher:
+    """对照实现：整张表一个重叠交替式，一次扫描"""
+
+    def __init__(self, matcher: KeywordMatcher):
+        self.matcher = matcher
+        patterns = sorted({p for table in matcher.tables.values() for p in table},
+                          key=lambda p: (-len(p), p))
+        self.regex = re.compile("(?=(" + "|".join(re.escape(p) for p in patterns) + "))")
+        # 某位置上最长的命中包含了从该位置开始的所有较短命中
+        self.contained = {p: [q for q in patterns if q in p] for p in patterns}
+
+    def match(self, *texts: str) -> Dict[str, List[str]]:
+        text = "\x00".join(texts)
+        text = text.lower() if self.matcher.lower else text
+        hits = set()
+        for found in set(self.regex.findall(text)):
+            hits.update(self.contained[found])
+        result = {}
+        for category, patterns in self.matcher.tables.items():
+            found = [p for p in patterns if p in hits]
+            if found:
+                result[category] = found
+        return result
+
+
+def _matchers() -> Dict[str, KeywordMatcher]:
+    import importlib
+
+    found = {}
+    for module_name in MODULES:
+        module = importlib.import_module(module_name)
+        for name, value in vars(module).items():
+            if isinstance(value, KeywordMatcher):
+                found[f"{module_name.rsplit('.', 1)[-1]}.{name}"] = value
+    return found
+
+
+def _measure(name: str, matcher: KeywordMatcher, response: str, number: int) -> Dict[str, Any]:
+    regex = _RegexMatcher(matcher)
+    expected = _loops(matcher.tables, USER_MESSAGE, response, matcher.lower)
+    assert matcher.match(USER_MESSAGE, response) == expected, name
+    assert regex.match(USER_MESSAGE, response) == expected, name
+    loops_us = timeit.timeit(
+        lambda: _loops(matcher.tables, USER_MESSAGE, response, matcher.lower), number=number) / number * 1e6
+    matcher_us = timeit.timeit(
+        lambda: matcher.match(USER_MESSAGE, response), number=number) / number * 1e6
+    regex_us = timeit.timeit(
+        lambda: regex.match(USER_MESSAGE, response), number=number) / number * 1e6
+    return {
+        "table": name,
+        "reply_chars": len(response),
+        "patterns": sum(len(p) for p in matcher.tables.values()),
+        "loops_us": round(loops_us, 1),
+        "matcher_us": round(matcher_us, 1),
+        "regex_us": round(regex_us, 1),
+    }
+
+
+def run(lengths: List[int], number: int) -> List[Dict[str, Any]]:
+    matchers = _matchers()
+    # 所有表合并成一张大表（约 170 个关键词），看关键词更多时一次扫描能否追上
+    combined = KeywordMatcher({
+        f"{name}/{category}": patterns
+        for name, matcher in matchers.items() if not matcher.lower
+        for category, patterns in matcher.tables.items()
+    })
+    results = []
+    for length in lengths:
+        response = (PARAGRAPH * (length // len(PARAGRAPH) + 1))[:length]
+        rows = [_measure(name, matcher, response, number) for name, matcher in matchers.items()]
+        totals = {key: sum(r[key] for r in rows) for key in ("loops_us", "matcher_us", "regex_us")}
+        rows.append({
+            "table": "TOTAL",
+            "reply_chars": length,
+            **{key: round(value, 1) for key, value in totals.items()},
+            "matcher_speedup": round(totals["loops_us"] / totals["matcher_us"], 2),
+            "regex_speedup": round(totals["loops_us"] / totals["regex_us"], 2),
+        })
+        rows.append(_measure("ALL_TABLES_COMBINED", combined, response, number))
+        results.extend(rows)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="关键词匹配微基准")
+    parser.add_argument("--lengths", type=int, nargs="+", default=[1000, 2000])
+    parser.add_argument("--number", type=int, default=2000)
+    args = parser.parse_args()
+    print(json.dumps(run(args.lengths, args.number), ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ProgressTracker 写入路径基准测试
+
+在临时 SQLite 文件库上连续追踪若干条对话，统计每条消息的耗时、SQL 条数和提交次数：
+
+    python tests/performance/bench_progress_tracker.py --messages 200 --words 40
+
+--words 控制每条小美回复中的词汇数（词汇会在消息间部分重复，模拟复习）。
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from src.data.models.base import Base  # noqa: E402
+from src.data.repositories.progress_tracker import ProgressTracker  # noqa: E402
+
+KANJI = "日本語勉強学校先生友達電車時間天気料理映画音楽旅行写真会社仕事休憩週末買物散歩読書"
+
+
+def build_reply(index: int, words: int) -> Dict[str, Any]:
+    """构造一条含 words 个词汇的小美回复 + 一条田中语法回复 + 一条山田文化回复"""
+    vocab = [KANJI[(index * 7 + i) % len(KANJI)] + KANJI[(index + i * 3) % len(KANJI)] for i in range(words)]
+    return {
+        "koumi": {"agent_name": "小美", "content": "、".join(vocab)},
+        "tanaka": {"agent_name": "田中先生", "content": "这个语法：を と が 的用法，应该是です"},
+        "yamada": {"agent_name": "山田先生", "content": "茶道和神社是日本传统文化"},
+    }
+
+
+def run(messages: int, words: int) -> Dict[str, Any]:
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{Path(tmp) / 'bench.db'}")
+        Base.metadata.create_all(engine)
+
+        counters = {"queries": 0, "commits": 0}
+
+        @event.listens_for(engine, "before_cursor_execute")
+        def _count_query(*_):
+            counters["queries"] += 1
+
+        @event.listens_for(engine, "commit")
+        def _count_commit(*_):
+            counters["commits"] += 1
+
+        session = sessionmaker(bind=engine)()
+        tracker = ProgressTracker(session=session)
+
+        latencies: List[float] = []
+        for i in range(messages):
+            started = time.perf_counter()
+            tracker.extract_learning_data("今日は日本語を勉強しました", build_reply(i, words), "bench")
+            latencies.append((time.perf_counter() - started) * 1000)
+
+        session.close()
+        engine.dispose()
+
+    return {
+        "messages": messages,
+        "words_per_message": words,
+        "mean_ms": round(statistics.mean(latencies), 3),
+        "p95_ms": round(sorted(latencies)[int(len(latencies) * 0.95) - 1], 3),
+        "queries_per_message": round(counters["queries"] / messages, 2),
+        "commits_per_message": round(counters["commits"] / messages, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ProgressTracker 写入路径基准测试")
+    parser.add_argument("--messages", type=int, default=200)
+    parser.add_argument("--words", type=int, default=40)
+    args = parser.parse_args()
+    print(json.dumps(run(args.messages, args.words), ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+SQLite 并发读写基准测试
+
+同一个临时库上，若干写线程不断插入 + 更新，若干读线程不断做聚合查询，比较两种连接方式：
+
+- legacy：create_engine 默认设置（回滚日志模式、每线程各自的连接，写者之间在库文件上抢锁）
+- shared：utils.db_engine 的共享引擎（WAL + synchronous=NORMAL、单写连接排队、只读连接池）
+
+    python tests/performance/bench_sqlite_concurrency.py --writers 4 --readers 8 --seconds 5
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+from sqlalchemy import create_engine, exc, text
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from utils.db_engine import create_db_engine  # noqa: E402
+
+SCHEMA = [
+    "CREATE TABLE vocabulary (id INTEGER PRIMARY KEY, user_id TEXT, word TEXT, mastery REAL)",
+    "CREATE INDEX ix_vocabulary_user ON vocabulary (user_id)",
+]
+
+
+def _engines(mode: str, url: str):
+    if mode == "legacy":
+        engine = create_engine(url, connect_args={"check_same_thread": False})
+        return engine, engine
+    return create_db_engine(url), create_db_engine(url, readonly=True)
+
+
+def run(mode: str, writers: int, readers: int, seconds: float) -> Dict[str, Any]:
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{Path(tmp) / 'bench.db'}"
+        write_engine, read_engine = _engines(mode, url)
+        with write_engine.begin() as conn:
+            for statement in SCHEMA:
+                conn.execute(text(statement))
+
+        deadline = time.perf_counter() + seconds
+        counts = {"writes": 0, "reads": 0, "errors": 0}
+        read_latencies: List[float] = []
+        lock = threading.Lock()
+
+        def writer(index: int):
+            i = 0
+            while time.perf_counter() < deadline:
+                try:
+                    with write_engine.begin() as conn:
+                        conn.execute(text(
+                            "INSERT INTO vocabulary (user_id, word, mastery) VALUES (:user, :word, 0.1)"
+                        ), {"user": f"u{index % 4}", "word": f"w{index}-{i}"})
+                        conn.execute(text(
+                            "UPDATE vocabulary SET mastery = mastery + 0.01 WHERE user_id = :user AND id % 50 = 0"
+                        ), {"user": f"u{index % 4}"})
+                    with lock:
+                        counts["writes"] += 1
+                except exc.OperationalError:
+                    with lock:
+                        counts["errors"] += 1
+                i += 1
+
+        def reader(index: int):
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                try:
+                    with read_engine.connect() as conn:
+                        conn.execute(text(
+                            "SELECT COUNT(*), AVG(mastery) FROM vocabulary WHERE user_id = :user"
+                        ), {"user": f"u{index % 4}"}).one()
+                    with lock:
+                        counts["reads"] += 1
+                        read_latencies.append((time.perf_counter() - started) * 1000)
+                except exc.OperationalError:
+                    with lock:
+                        counts["errors"] += 1
+
+        threads = [threading.Thread(target=writer, args=(i,)) for i in range(writers)]
+        threads += [threading.Thread(target=reader, args=(i,)) for i in range(readers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        write_engine.dispose()
+        read_engine.dispose()
+
+    return {
+        "mode": mode,
+        "writes_per_sec": round(counts["writes"] / seconds, 1),
+        "reads_per_sec": round(counts["reads"] / seconds, 1),
+        "errors": counts["errors"],
+        "read_p50_ms": round(statistics.median(read_latencies), 3) if read_latencies else None,
+        "read_p95_ms": round(sorted(read_latencies)[int(len(read_latencies) * 0.95) - 1], 3)
+        if read_latencies else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SQLite 并发读写基准测试")
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--mode", choices=["legacy", "shared", "both"], default="both")
+    args = parser.parse_args()
+
+    modes = ["legacy", "shared"] if args.mode == "both" else [args.mode]
+    results = [run(mode, args.writers, args.readers, args.seconds) for mode in modes]
+    print(json.dumps(results, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
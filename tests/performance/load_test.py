@@ -0,0 +1,336 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+日语学习Multi-Agent系统 - 端到端压测工具
+
+按配置的并发度压测以下接口，输出吞吐量、p50/p95/p99 延迟、错误率，
+WebSocket 额外统计首个智能体帧时间（time-to-first-agent-frame）：
+- POST /api/v1/chat/send
+- POST /api/v1/chat/multi-agent-collaboration
+- WS   /ws/{session_id}
+
+上游 LLM 使用离线替身服务（mock_llm_api.py），无需网络：
+
+    # 自动启动替身服务 + 应用，压测后关闭
+    python tests/performance/load_test.py --spawn --concurrency 20 --requests 200
+
+    # 压测已启动的服务，并与上次结果比较（p95 / 错误率退化超过阈值时退出码为 1）
+    python tests/performance/load_test.py --base-url http://localhost:8000 --baseline test_reports/last.json
+
+结果以 JSON 写入 test_reports/（见 --output），便于跨版本追踪回归。
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import subprocess
+import sys
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import aiohttp
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+SCENARIOS = ("chat", "multi_agent", "websocket")
+MESSAGES = [
+    "「は」と「が」の違いを教えてください",
+    "今日は学校に行きました",
+    "日本の茶道について知りたいです",
+    "JLPT N3の文法を復習したい",
+]
+
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    """最近秩法百分位数"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(q * len(ordered)) - 1))]
+
+
+@dataclass
+class ScenarioResult:
+    """单个场景的原始测量结果"""
+    name: str
+    latencies: List[float] = field(default_factory=list)        # 成功请求的完整耗时（秒）
+    first_frame_latencies: List[float] = field(default_factory=list)  # WebSocket 首个智能体帧耗时（秒）
+    errors: List[str] = field(default_factory=list)
+    duration: float = 0.0
+
+    def summarize(self) -> Dict[str, Any]:
+        total = len(self.latencies) + len(self.errors)
+
+        def ms(value: Optional[float]) -> Optional[float]:
+            return round(value * 1000, 2) if value is not None else None
+
+        summary = {
+            "requests": total,
+            "successes": len(self.latencies),
+            "errors": len(self.errors),
+            "error_rate": round(len(self.errors) / total, 4) if total else 0.0,
+            "duration_s": round(self.duration, 3),
+            "throughput_rps": round(total / self.duration, 2) if self.duration else 0.0,
+            "latency_ms": {
+                "p50": ms(percentile(self.latencies, 0.50)),
+                "p95": ms(percentile(self.latencies, 0.95)),
+                "p99": ms(percentile(self.latencies, 0.99)),
+                "max": ms(max(self.latencies)) if self.latencies else None,
+            },
+            "sample_errors": sorted(set(self.errors))[:5],
+        }
+        if self.first_frame_latencies:
+            summary["first_agent_frame_ms"] = {
+                "p50": ms(percentile(self.first_frame_latencies, 0.50)),
+                "p95": ms(percentile(self.first_frame_latencies, 0.95)),
+                "p99": ms(percentile(self.first_frame_latencies, 0.99)),
+            }
+        return summary
+
+
+class LoadTester:
+    """并发压测执行器"""
+
+    def __init__(self, base_url: str, concurrency: int, requests: int, timeout: float,
+                 agents: List[str]):
+        self.base_url = base_url.rstrip("/")
+        self.concurrency = concurrency
+        self.requests = requests
+        self.timeout = timeout
+        self.agents = agents
+
+    async def run(self, scenarios: List[str]) -> Dict[str, ScenarioResult]:
+        results = {}
+        connector = aiohttp.TCPConnector(limit=self.concurrency * 2)
+        timeout = aiohttp.ClientTimeout(total=self.timeout)
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+            for name in scenarios:
+                print(f"🚀 场景 {name}: {self.requests} 次请求，并发 {self.concurrency}")
+                results[name] = await self._run_scenario(session, name)
+        return results
+
+    async def _run_scenario(self, session: aiohttp.ClientSession, name: str) -> ScenarioResult:
+        result = ScenarioResult(name)
+        operation = getattr(self, f"_{name}")
+        queue: asyncio.Queue = asyncio.Queue()
+        for i in range(self.requests):
+            queue.put_nowait(i)
+
+        async def worker():
+            while True:
+                try:
+                    i = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                started = time.perf_counter()
+                try:
+                    first_frame = await operation(session, i, started)
+                    result.latencies.append(time.perf_counter() - started)
+                    if first_frame is not None:
+                        result.first_frame_latencies.append(first_frame)
+                except Exception as e:
+                    result.errors.append(f"{type(e).__name__}: {e}"[:200])
+
+        started = time.perf_counter()
+        await asyncio.gather(*[worker() for _ in range(self.concurrency)])
+        result.duration = time.perf_counter() - started
+        return result
+
+    async def _chat(self, session: aiohttp.ClientSession, i: int, started: float) -> None:
+        payload = {
+            "message": MESSAGES[i % len(MESSAGES)],
+            "user_id": f"load_user_{i % 50}",
+            "session_id": f"load_chat_{i}",
+            "agent_name": "田中先生",
+        }
+        async with session.post(f"{self.base_url}/api/v1/chat/send", json=payload) as response:
+            response.raise_for_status()
+            body = await response.json()
+            if not body.get("success"):
+                raise RuntimeError(body.get("error") or "success=false")
+
+    async def _multi_agent(self, session: aiohttp.ClientSession, i: int, started: float) -> None:
+        payload = {
+            "message": MESSAGES[i % len(MESSAGES)],
+            "user_id": f"load_user_{i % 50}",
+            "session_id": f"load_multi_{i}",
+            "active_agents": self.agents,
+            "collaboration_mode": "discussion",
+        }
+        async with session.post(f"{self.base_url}/api/v1/chat/multi-agent-collaboration", json=payload) as response:
+            response.raise_for_status()
+            body = await response.json()
+            if not body.get("responses"):
+                raise RuntimeError("no agent responses")
+
+    async def _websocket(self, session: aiohttp.ClientSession, i: int, started: float) -> float:
+        """发送一条聊天消息，直到收到全部智能体回应；返回首个智能体帧耗时"""
+        ws_url = self.base_url.replace("http", "ws", 1) + f"/ws/load_ws_{i}_{uuid.uuid4().hex[:6]}"
+        async with session.ws_connect(ws_url) as ws:
+            # 连接建立后再开始计时（欢迎消息 / 智能体状态不计入）
+            sent_at = time.perf_counter()
+            await ws.send_json({
+                "type": "chat_message",
+                "content": MESSAGES[i % len(MESSAGES)],
+                "active_agents": self.agents,
+                "scene": "grammar",
+            })
+            first_frame = None
+            received = 0
+            while received < len(self.agents):
+                frame = await ws.receive_json(timeout=self.timeout)
+                if frame.get("type") == "agent_response":
+                    if first_frame is None:
+                        first_frame = time.perf_counter() - sent_at
+                    received += 1
+                elif frame.get("type") == "error":
+                    raise RuntimeError(frame.get("content"))
+            return first_frame
+
+
+def compare_with_baseline(current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """比较 p95 延迟与错误率，返回退化项"""
+    regressions = []
+    for name, summary in current["scenarios"].items():
+        base = baseline.get("scenarios", {}).get(name)
+        if not base:
+            continue
+        cur_p95, base_p95 = summary["latency_ms"]["p95"], base["latency_ms"]["p95"]
+        if cur_p95 and base_p95 and cur_p95 > base_p95 * (1 + tolerance):
+            regressions.append(f"{name}: p95 {base_p95}ms → {cur_p95}ms")
+        if summary["error_rate"] > base["error_rate"] + 0.01:
+            regressions.append(f"{name}: error_rate {base['error_rate']} → {summary['error_rate']}")
+    return regressions
+
+
+def load_performance_config(config_file: str) -> Dict[str, Any]:
+    """读取 test_config.json 中的 performance 段"""
+    path = Path(config_file)
+    if not path.exists():
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f).get("performance", {})
+
+
+async def wait_for_health(url: str, timeout: float = 60.0) -> None:
+    deadline = time.monotonic() + timeout
+    async with aiohttp.ClientSession() as session:
+        while time.monotonic() < deadline:
+            try:
+                async with session.get(url) as response:
+                    if response.status == 200:
+                        return
+            except aiohttp.ClientError:
+                pass
+            await asyncio.sleep(0.5)
+    raise RuntimeError(f"服务未在 {timeout}s 内就绪: {url}")
+
+
+def spawn_services(app_port: int, llm_port: int, llm_args: List[str]) -> List[subprocess.Popen]:
+    """启动上游LLM替身服务和应用（应用的 DEEPSEEK_API_BASE 指向替身服务）"""
+    env = dict(os.environ)
+    env.update({
+        "LLM_PROVIDER": "deepseek",
+        "DEEPSEEK_API_BASE": f"http://127.0.0.1:{llm_port}/v1",
+        "DEEPSEEK_API_KEY": env.get("DEEPSEEK_API_KEY", "load-test"),
+    })
+    stand_in = subprocess.Popen(
+        [sys.executable, "mock_llm_api.py", "--port", str(llm_port), *llm_args], cwd=PROJECT_ROOT, env=env
+    )
+    app = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(app_port), "--log-level", "warning"],
+        cwd=PROJECT_ROOT, env=env
+    )
+    return [stand_in, app]
+
+
+def print_summary(report: Dict[str, Any]) -> None:
+    print("\n📊 压测结果")
+    def fmt(value):
+        return f"{value}ms" if value is not None else "-"
+
+    for name, s in report["scenarios"].items():
+        lat = s["latency_ms"]
+        line = (f"  {name:<12} {s['requests']:>5} req  {s['throughput_rps']:>8} req/s  "
+                f"p50 {fmt(lat['p50'])}  p95 {fmt(lat['p95'])}  p99 {fmt(lat['p99'])}  错误率 {s['error_rate']:.2%}")
+        if "first_agent_frame_ms" in s:
+            line += f"  首帧 p50 {fmt(s['first_agent_frame_ms']['p50'])}"
+        print(line)
+        for error in s["sample_errors"]:
+            print(f"      ⚠️ {error}")
+
+
+async def main_async(args) -> int:
+    processes = []
+    if args.spawn:
+        llm_args = ["--latency", args.llm_latency, "--tps", str(args.llm_tps)]
+        processes = spawn_services(args.app_port, args.llm_port, llm_args)
+        args.base_url = f"http://127.0.0.1:{args.app_port}"
+
+    try:
+        if args.spawn:
+            await wait_for_health(f"{args.base_url}/health")
+
+        tester = LoadTester(args.base_url, args.concurrency, args.requests, args.timeout, args.agents.split(","))
+        results = await tester.run(args.scenarios.split(","))
+    finally:
+        for process in processes:
+            process.terminate()
+
+    report = {
+        "timestamp": datetime.now().isoformat(),
+        "base_url": args.base_url,
+        "concurrency": args.concurrency,
+        "requests_per_scenario": args.requests,
+        "agents": args.agents.split(","),
+        "scenarios": {name: result.summarize() for name, result in results.items()},
+    }
+    print_summary(report)
+
+    output = Path(args.output or f"test_reports/load_test_{datetime.now():%Y%m%d_%H%M%S}.json")
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"\n💾 结果已保存: {output}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            regressions = compare_with_baseline(report, json.load(f), args.tolerance)
+        if regressions:
+            print("❌ 性能退化:")
+            for item in regressions:
+                print(f"  - {item}")
+            return 1
+        print("✅ 未发现性能退化")
+    return 0
+
+
+def parse_args(argv=None):
+    perf = load_performance_config(str(PROJECT_ROOT / "test_config.json"))
+    parser = argparse.ArgumentParser(description="日语学习Multi-Agent系统压测工具")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--concurrency", type=int, default=perf.get("concurrent_requests", 5))
+    parser.add_argument("--requests", type=int, default=perf.get("requests_per_scenario", 50),
+                        help="每个场景的请求数")
+    parser.add_argument("--timeout", type=float, default=perf.get("max_response_time", 10) * 6,
+                        help="单次请求超时（秒）")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--agents", default="tanaka,koumi,yamada", help="多智能体 / WebSocket 场景参与的智能体")
+    parser.add_argument("--output", help="结果 JSON 路径（默认 test_reports/load_test_<时间>.json）")
+    parser.add_argument("--baseline", help="对比的历史结果 JSON")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="p95 允许的退化比例")
+    parser.add_argument("--spawn", action="store_true", help="自动启动替身服务和应用")
+    parser.add_argument("--app-port", type=int, default=8100)
+    parser.add_argument("--llm-port", type=int, default=8101)
+    parser.add_argument("--llm-latency", default="lognormal:-2.5,0.5", help="替身服务延迟分布")
+    parser.add_argument("--llm-tps", type=float, default=80.0, help="替身服务每秒输出 token 数")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main_async(parse_args())))
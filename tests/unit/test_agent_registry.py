@@ -0,0 +1,48 @@
+"""进程级共享智能体 / 编排器测试"""
+import pytest
+
+from src.core.agents import agent_registry
+from src.core.workflows.collaboration import get_shared_orchestrator
+from src.core.workflows.grammar_workflows import GrammarCollaborationWorkflows
+
+
+@pytest.fixture(autouse=True)
+def _reset_registry():
+    agent_registry.reset_shared_agents()
+    yield
+    agent_registry.reset_shared_agents()
+
+
+def test_shared_agents_created_once(monkeypatch):
+    calls = []
+
+    def fake_create():
+        calls.append(1)
+        return {"koumi": object()}
+
+    monkeypatch.setattr(agent_registry, "create_agents", fake_create)
+
+    first = agent_registry.get_shared_agents()
+    assert agent_registry.get_shared_agents() is first
+    assert len(calls) == 1
+
+
+def test_workflows_reuse_shared_orchestrator():
+    agents = {"koumi": object()}
+    agent_registry.register_shared_agents(agents)
+
+    orch = get_shared_orchestrator()
+    assert orch.agents is agents
+    assert get_shared_orchestrator() is orch
+    assert GrammarCollaborationWorkflows().orch is orch
+
+
+def test_orchestrator_rebuilt_after_reregistration():
+    agent_registry.register_shared_agents({"koumi": object()})
+    old = get_shared_orchestrator()
+
+    new_agents = {"tanaka": object()}
+    agent_registry.register_shared_agents(new_agents)
+
+    assert get_shared_orchestrator() is not old
+    assert get_shared_orchestrator().agents is new_agents
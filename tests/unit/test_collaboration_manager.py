@@ -0,0 +1,139 @@
+"""MixedCollaborationManager 并发协作测试"""
+import asyncio
+
+import pytest
+
+from main import MixedCollaborationManager
+
+
+class SlowAgent:
+    """按指定延迟回应的模拟智能体"""
+    is_mock = True
+
+    def __init__(self, agent_id, delay):
+        self.agent_id = agent_id
+        self.name = agent_id
+        self.delay = delay
+
+    async def process_user_input(self, user_input, session_context, scene):
+        await asyncio.sleep(self.delay)
+        return {"content": f"{self.agent_id}: {user_input}", "agent_id": self.agent_id,
+                "agent_name": self.name, "emotion": "😊"}
+
+
+class StreamingAgent:
+    """按固定间隔逐段输出的流式模拟智能体；hang=True 时输出完后不再结束"""
+    is_mock = True
+
+    def __init__(self, agent_id, parts, gap, hang=False):
+        self.agent_id = agent_id
+        self.name = agent_id
+        self.parts = parts
+        self.gap = gap
+        self.hang = hang
+
+    async def process_user_input_stream(self, user_input, session_context, scene):
+        for part in self.parts:
+            await asyncio.sleep(self.gap)
+            yield {"type": "delta", "content": part}
+        if self.hang:
+            await asyncio.sleep(60)
+        yield {"type": "done", "result": {"content": "".join(self.parts), "agent_id": self.agent_id,
+                                          "agent_name": self.name}}
+
+
+async def _stream_results(manager, agent_ids):
+    return {agent_id: event["result"] async for agent_id, event in
+            manager.stream_user_input("s", "hi", agent_ids, "conversation") if event["type"] == "done"}
+
+
+def _manager(delays, **kwargs):
+    agents = {agent_id: SlowAgent(agent_id, delay) for agent_id, delay in delays.items()}
+    return MixedCollaborationManager(agents, **kwargs)
+
+
+@pytest.mark.asyncio
+async def test_iter_user_input_yields_in_completion_order():
+    manager = _manager({"slow": 0.2, "fast": 0.01})
+
+    order = [r["agent_id"] async for r in manager.iter_user_input("s", "hi", ["slow", "fast"], "conversation")]
+
+    assert order == ["fast", "slow"]
+
+
+@pytest.mark.asyncio
+async def test_agent_timeout_returns_fallback_without_blocking_others():
+    manager = _manager({"slow": 5, "fast": 0.01}, agent_timeout=0.1)
+
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    responses = await manager.process_user_input("s", "hi", ["slow", "fast"], "conversation")
+
+    assert loop.time() - started < 1
+    assert [r["agent_id"] for r in responses] == ["slow", "fast"]
+    assert responses[0]["timeout"] is True and responses[0]["error"] is True
+    assert "error" not in responses[1]
+
+
+@pytest.mark.asyncio
+async def test_deadline_returns_partial_results():
+    manager = _manager({"slow": 5, "fast": 0.01}, agent_timeout=10, deadline=0.1)
+
+    result = await manager.multi_agent_collaboration("hi", ["fast", "slow"])
+
+    fast, slow = result["responses"]
+    assert fast["agent_id"] == "fast" and fast["confidence"] == 0.8
+    assert slow["agent_id"] == "slow" and slow["timeout"] is True and slow["confidence"] == 0.0
+
+
+@pytest.mark.asyncio
+async def test_stream_user_input_interleaves_agents():
+    manager = _manager({"slow": 0.2, "fast": 0.01})
+
+    done = [agent_id async for agent_id, event in
+            manager.stream_user_input("s", "hi", ["slow", "fast"], "conversation")
+            if event["type"] == "done"]
+
+    assert done == ["fast", "slow"]
+
+
+@pytest.mark.asyncio
+async def test_stream_timeout_bounds_the_gap_between_chunks_not_the_whole_reply():
+    agent = StreamingAgent("talker", ["a", "b", "c", "d", "e"], gap=0.05)
+    manager = MixedCollaborationManager({"talker": agent}, agent_timeout=0.15)
+
+    results = await _stream_results(manager, ["talker"])  # 总时长超过 agent_timeout，但每段间隔都没超
+
+    assert results["talker"]["content"] == "abcde"
+    assert "truncated" not in results["talker"]
+
+
+@pytest.mark.parametrize("timeouts", [{"agent_timeout": 0.1}, {"agent_timeout": 10, "deadline": 0.2}])
+@pytest.mark.asyncio
+async def test_stream_timeout_after_output_keeps_the_partial_reply(timeouts):
+    agents = {"stuck": StreamingAgent("stuck", ["こん", "にちは"], gap=0.01, hang=True),
+              "silent": StreamingAgent("silent", [], gap=0, hang=True)}
+    manager = MixedCollaborationManager(agents, **timeouts)
+
+    results = await _stream_results(manager, ["stuck", "silent"])
+
+    assert results["stuck"]["content"] == "こんにちは"
+    assert results["stuck"]["truncated"] is True and "error" not in results["stuck"]
+    assert results["silent"]["error"] is True and results["silent"]["timeout"] is True
+
+
+def test_detect_simple_conflicts_compares_first_and_second_keywords():
+    manager = _manager({})
+    responses = [
+        {"agent_id": "tanaka", "content": "这个用法是正确的，应该这样说"},
+        {"agent_id": "koumi", "content": "我觉得不对，有点错误"},
+        {"agent_id": "ai", "content": "数据不足"},
+        {"agent_id": "sato", "content": "不推荐死记硬背"},
+    ]
+
+    conflicts = manager._detect_simple_conflicts(responses)
+
+    # koumi 的“不对”也含前项“对”，但排在它之后的回复都不含“不对”
+    assert [(c["agent1"], c["agent2"], c["conflict_id"]) for c in conflicts] == [
+        ("tanaka", "koumi", "conflict_0_1")
+    ]
@@ -0,0 +1,61 @@
+"""JSON 列压缩测试"""
+import json
+import zlib
+from pathlib import Path
+
+from sqlalchemy import Column, Integer, create_engine, text
+from sqlalchemy.orm import Session, declarative_base
+
+from utils.compression import CURRENT_DICT_ID, CompressedJSON, compress_json, decompress_json, dumps_json
+
+REPLIES = Path(__file__).resolve().parents[1] / "fixtures" / "conversation_replies.jsonl"
+
+REPLY = {
+    "tanaka": {"content": "「私は学生です」は正しい文です。语法：は 是主题助词，です 表示礼貌的断定。",
+               "agent_name": "田中先生"},
+    "koumi": {"content": "いいじゃん！そのまま使えるよ～ **中文：** 很好呀！", "agent_name": "小美"},
+}
+
+
+def test_round_trip_and_dictionary_helps_short_values():
+    blob = compress_json(REPLY)
+
+    assert decompress_json(blob) == REPLY
+    assert len(blob) < len(compress_json(REPLY, dict_id=0)) < len(dumps_json(REPLY))
+    assert len(blob) < len(zlib.compress(dumps_json(REPLY)))
+
+
+def test_tiny_values_are_stored_plain_and_legacy_text_is_readable():
+    assert compress_json([]) == b"J[]"
+    assert decompress_json(b"J[]") == []
+    assert decompress_json(json.dumps(REPLY, ensure_ascii=False)) == REPLY
+
+
+def test_compressed_json_column():
+    Base = declarative_base()
+
+    class Row(Base):
+        __tablename__ = "rows"
+        id = Column(Integer, primary_key=True)
+        data = Column(CompressedJSON)
+
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.add_all([Row(id=1, data=REPLY), Row(id=2, data=None)])
+        session.commit()
+        session.execute(text("INSERT INTO rows (id, data) VALUES (3, :legacy)"), {"legacy": '{"a": 1}'})
+
+        assert session.get(Row, 1).data == REPLY
+        assert session.get(Row, 2).data is None
+        assert session.get(Row, 3).data == {"a": 1}
+        assert session.execute(text("SELECT typeof(data) FROM rows WHERE id = 1")).scalar() == "blob"
+
+
+def test_current_dictionary_beats_v1_on_replies_and_v1_data_stays_readable():
+    replies = [json.loads(line)["agent_responses"] for line in REPLIES.read_text(encoding="utf-8").splitlines()]
+    current = sum(len(compress_json(reply)) for reply in replies)
+    v1 = sum(len(compress_json(reply, dict_id=1)) for reply in replies)
+
+    assert CURRENT_DICT_ID != 1 and current < v1
+    assert all(decompress_json(compress_json(reply, dict_id=1)) == reply for reply in replies)
@@ -0,0 +1,60 @@
+"""共享数据库引擎测试"""
+import pytest
+from sqlalchemy import exc, text
+
+from utils.db_engine import get_engine, get_sessionmaker
+
+
+def _pragma(engine, name):
+    with engine.connect() as conn:
+        return conn.exec_driver_sql(f"PRAGMA {name}").scalar()
+
+
+def test_file_sqlite_engine_is_shared_and_tuned(tmp_path):
+    url = f"sqlite:///{tmp_path / 'app.db'}"
+    engine = get_engine(url)
+
+    assert get_engine(url) is engine
+    assert get_sessionmaker(url).kw["bind"] is engine
+    assert _pragma(engine, "journal_mode") == "wal"
+    assert _pragma(engine, "synchronous") == 1  # NORMAL
+    assert _pragma(engine, "busy_timeout") > 0
+    assert engine.pool.size() > 1  # 写者不靠单连接池串行化
+
+
+def test_read_engine_is_separate_and_query_only(tmp_path):
+    url = f"sqlite:///{tmp_path / 'app.db'}"
+    writer, reader = get_engine(url), get_engine(url, readonly=True)
+    with writer.begin() as conn:
+        conn.execute(text("CREATE TABLE t (x INTEGER)"))
+        conn.execute(text("INSERT INTO t VALUES (1)"))
+
+    assert reader is not writer
+    with reader.connect() as conn:
+        assert conn.execute(text("SELECT COUNT(*) FROM t")).scalar() == 1
+        with pytest.raises(exc.OperationalError):
+            conn.execute(text("INSERT INTO t VALUES (2)"))
+
+
+def test_memory_sqlite_shares_one_engine_for_reads_and_writes():
+    assert get_engine("sqlite://", readonly=True) is get_engine("sqlite://")
+
+
+def test_open_session_does_not_block_another_writer(tmp_path):
+    url = f"sqlite:///{tmp_path / 'app.db'}"
+    with get_engine(url).begin() as conn:
+        conn.execute(text("CREATE TABLE t (x INTEGER)"))
+
+    Session = get_sessionmaker(url)
+    idle = Session()
+    try:
+        # 会话读过一次后一直不关闭，仍占着写连接池里的一个连接
+        assert idle.execute(text("SELECT COUNT(*) FROM t")).scalar() == 0
+
+        with Session() as writer:
+            writer.execute(text("INSERT INTO t VALUES (1)"))
+            writer.commit()
+
+        assert idle.execute(text("SELECT COUNT(*) FROM t")).scalar() == 1
+    finally:
+        idle.close()
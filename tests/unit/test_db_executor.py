@@ -0,0 +1,51 @@
+"""数据库线程池测试"""
+import asyncio
+import contextvars
+import threading
+import time
+
+import pytest
+
+from utils.db_executor import DatabaseExecutor, offload_db, run_db
+
+request_id = contextvars.ContextVar("request_id", default=None)
+
+
+@pytest.mark.asyncio
+async def test_blocking_calls_do_not_stall_the_loop():
+    executor = DatabaseExecutor(max_workers=2)
+    ticks = 0
+
+    async def ticker():
+        nonlocal ticks
+        while True:
+            await asyncio.sleep(0.01)
+            ticks += 1
+
+    task = asyncio.create_task(ticker())
+    threads = await asyncio.gather(*(
+        executor.run(lambda: (time.sleep(0.1), threading.current_thread().name)[1]) for _ in range(4)
+    ))
+    task.cancel()
+    executor.shutdown()
+
+    assert ticks >= 5  # 阻塞调用期间事件循环仍在运行
+    assert len(set(threads)) == 2  # 线程数受 max_workers 限制
+    assert all(name.startswith("db") for name in threads)
+
+
+@pytest.mark.asyncio
+async def test_context_is_propagated_to_worker():
+    request_id.set("req-1")
+
+    assert await run_db(request_id.get) == "req-1"
+
+
+@pytest.mark.asyncio
+async def test_offload_db_turns_sync_method_into_coroutine():
+    class Repo:
+        @offload_db
+        def load(self, key):
+            return key, threading.current_thread() is threading.main_thread()
+
+    assert await Repo().load("k") == ("k", False)
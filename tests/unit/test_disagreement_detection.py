@@ -0,0 +1,57 @@
+"""分歧检测（特征向量）测试"""
+import asyncio
+from datetime import datetime
+
+from src.core.workflows.collaboration import AgentResponse, EnhancedMultiAgentOrchestrator
+
+
+def _orchestrator():
+    return EnhancedMultiAgentOrchestrator(agents={})
+
+
+def _response(orchestrator, agent_id, name, content):
+    return AgentResponse(
+        agent_id=agent_id, agent_name=name, content=content,
+        confidence=orchestrator._calculate_confidence(content, agent_id),
+        emotion="", learning_points=[], suggestions=[], timestamp=datetime.now(),
+        stance=orchestrator._analyze_agent_stance(agent_id, content),
+    )
+
+
+def test_features_capture_polarity_certainty_and_length():
+    features = _orchestrator().extract_features("这样说确实是正确的，但也许不可以用在正式场合")
+
+    assert features.side("correctness", "positive") == ("正确",)
+    assert features.side("permission", "positive") == ("可以",)  # “不可以”里也含“可以”
+    assert features.side("permission", "negative") == ("不可以",)
+    assert features.side("formality", "formal") == ("正式",)
+    assert (features.certainty, features.uncertainty) == (1, 1)
+    assert features.length == len("这样说确实是正确的，但也许不可以用在正式场合")
+
+
+def test_stance_and_confidence_come_from_features():
+    orchestrator = _orchestrator()
+
+    assert orchestrator._analyze_agent_stance("tanaka", "完全正确") == "correctness_positive"
+    assert orchestrator._analyze_agent_stance("koumi", "轻松一点就好") == "casual_flexible"
+    assert orchestrator._analyze_agent_stance("ai", "数据如下") == "neutral"
+    assert orchestrator._calculate_confidence("显然" * 60, "ai") == 0.95
+
+
+def test_disagreements_are_detected_from_cached_features():
+    orchestrator = _orchestrator()
+    responses = [
+        _response(orchestrator, "tanaka", "田中先生", "这个说法是正确的，です 体更礼貌"),
+        _response(orchestrator, "koumi", "小美", "我觉得有点不对呢，つもり 就行"),
+        _response(orchestrator, "yamada", "山田先生", "这是准确的表达"),
+    ]
+
+    disagreements = asyncio.run(orchestrator._detect_enhanced_disagreements(responses, "行くつもり"))
+
+    semantic = next(d for d in disagreements if d.topic == "correctness_opposition")
+    assert semantic.positions == {"田中先生": "positive", "小美": "negative", "山田先生": "positive"}
+    assert semantic.evidence["小美"] == ["不对"]
+    assert semantic.severity == "medium"
+    politeness = next(d for d in disagreements if d.topic == "politeness_level_disagreement")
+    assert politeness.positions == {"田中先生": "formal_required", "小美": "casual_acceptable"}
+    assert all(r.features is not None for r in responses)
@@ -0,0 +1,53 @@
+"""多模式关键词匹配测试"""
+import random
+
+from utils.keyword_matcher import KeywordMatcher
+
+
+def _loops(tables, *texts):
+    """改造前的写法：逐个关键词 `in` 判断"""
+    result = {}
+    for category, patterns in tables.items():
+        found = [p for p in patterns if any(p in t for t in texts)]
+        if found:
+            result[category] = found
+    return result
+
+
+def test_overlapping_patterns_match_like_in_loops():
+    # 互为前缀 / 子串 / 首尾重叠的关键词
+    tables = {
+        "a": ["で", "です", "である", "から", "らま", "まで"],
+        "b": ["ab", "bc", "abc", "c", "cab"],
+        "c": ["です", "x"],
+    }
+    matcher = KeywordMatcher(tables)
+    rng = random.Random(7)
+    alphabet = "でするあからまabcx "
+    for _ in range(2000):
+        texts = ["".join(rng.choice(alphabet) for _ in range(rng.randint(0, 30))) for _ in range(2)]
+        assert matcher.match(*texts) == _loops(tables, *texts)
+        assert matcher.scan(*texts) == {p for found in _loops(tables, *texts).values() for p in found}
+
+
+def test_texts_are_scanned_separately_and_lowercased():
+    matcher = KeywordMatcher({"greet": ["hello", "こんにちは"], "n": ["N1"]}, lower=True)
+
+    assert matcher.match("HELLO") == {"greet": ["hello"]}
+    assert matcher.match("hel", "lo") == {}  # 不跨段匹配
+    assert matcher.match("N1") == {}  # 与 `word in text.lower()` 一致
+
+
+def test_first_category_follows_table_order():
+    matcher = KeywordMatcher({"add": ["记住"], "progress": ["进度", "复习"], "plan": ["计划"]})
+
+    assert matcher.first_category("帮我制定复习计划，记住这个") == "add"
+    assert matcher.first_category("复习计划") == "progress"
+    assert matcher.first_category("你好", default="chat") == "chat"
+
+
+def test_categories_lists_matched_categories_in_table_order():
+    matcher = KeywordMatcher({"练习助词": ["は", "が"], "注意敬语": ["です"], "多听": ["听力"]})
+
+    assert matcher.categories("これはペンです") == ["练习助词", "注意敬语"]
+    assert matcher.categories("你好") == []
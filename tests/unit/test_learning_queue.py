@@ -0,0 +1,99 @@
+"""学习事件写后队列测试"""
+import asyncio
+
+import pytest
+
+from utils.learning_queue import DROP_NEWEST, DROP_OLDEST, LearningEvent, LearningEventQueue
+
+
+def _event(i):
+    return LearningEvent(f"msg{i}", {}, "s1")
+
+
+class FakeWriter:
+    def __init__(self, fail=False):
+        self.batches = []
+        self.fail = fail
+
+    def __call__(self, events):
+        if self.fail:
+            raise RuntimeError("db locked")
+        self.batches.append([e.user_input for e in events])
+
+
+@pytest.mark.asyncio
+async def test_events_are_written_in_batches():
+    writer = FakeWriter()
+    queue = LearningEventQueue(writer, batch_size=3, flush_interval=0.01)
+
+    for i in range(7):
+        queue.submit(_event(i))
+    await queue.stop()
+
+    assert [len(b) for b in writer.batches] == [3, 3, 1]
+    assert queue.get_stats()["written"] == 7
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("policy,kept", [
+    (DROP_OLDEST, ["msg1", "msg2"]),
+    (DROP_NEWEST, ["msg0", "msg1"]),
+])
+async def test_full_queue_applies_drop_policy(policy, kept):
+    writer = FakeWriter()
+    queue = LearningEventQueue(writer, max_size=2, batch_size=10, flush_interval=0.05, drop_policy=policy)
+
+    accepted = [queue.submit(_event(i)) for i in range(3)]
+    await queue.stop()
+
+    assert accepted[-1] is (policy == DROP_OLDEST)
+    assert writer.batches == [kept]
+    assert queue.get_stats()["dropped"] == 1
+
+
+@pytest.mark.asyncio
+async def test_put_waits_for_space():
+    writer = FakeWriter()
+    queue = LearningEventQueue(writer, max_size=1, batch_size=1, flush_interval=0, drop_policy=DROP_NEWEST)
+
+    queue.submit(_event(0))
+    assert await queue.put(_event(1), timeout=1.0)
+    await queue.stop()
+
+    assert writer.batches == [["msg0"], ["msg1"]]
+    assert queue.get_stats()["dropped"] == 0
+
+
+@pytest.mark.asyncio
+async def test_writer_failure_is_counted_and_worker_continues():
+    writer = FakeWriter(fail=True)
+    queue = LearningEventQueue(writer, batch_size=2, flush_interval=0)
+
+    queue.submit(_event(0))
+    await asyncio.sleep(0.05)
+    writer.fail = False
+    queue.submit(_event(1))
+    await queue.stop()
+
+    assert queue.get_stats()["failed"] == 1
+    assert writer.batches == [["msg1"]]
+
+
+@pytest.mark.asyncio
+async def test_events_skipped_by_writer_are_counted_as_failed():
+    queue = LearningEventQueue(lambda events: 1, batch_size=3, flush_interval=0)
+
+    for i in range(3):
+        queue.submit(_event(i))
+    await queue.stop()
+
+    assert queue.get_stats()["written"] == 2
+    assert queue.get_stats()["failed"] == 1
+
+
+@pytest.mark.asyncio
+async def test_stopped_queue_rejects_new_events():
+    queue = LearningEventQueue(FakeWriter())
+    await queue.stop()
+
+    assert queue.submit(_event(0)) is False
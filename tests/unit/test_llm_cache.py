@@ -0,0 +1,168 @@
+"""LLM回复缓存 / 请求合并测试"""
+import asyncio
+import threading
+
+import httpx
+import pytest
+
+from utils.cache import LRUCache, ResponseCache, SQLiteCache, make_cache_key
+from utils.llm_client import LLMClient
+
+MESSAGES = [{"role": "user", "content": "「は」和「が」的区别？"}]
+
+
+class RecordingDisk(SQLiteCache):
+    """记录磁盘层在哪个线程被访问、每批写入多少条"""
+
+    def __init__(self, path):
+        super().__init__(path)
+        self.threads = []
+        self.batches = []
+
+    def get(self, key):
+        self.threads.append(threading.get_ident())
+        return super().get(key)
+
+    def set_many(self, items):
+        self.threads.append(threading.get_ident())
+        self.batches.append(len(items))
+        super().set_many(items)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_cache_key_depends_on_every_field():
+    base = make_cache_key("m", "sys", MESSAGES, 0.3, 1000)
+    assert base == make_cache_key("m", "sys", [dict(MESSAGES[0])], 0.3, 1000)
+    assert base != make_cache_key("m2", "sys", MESSAGES, 0.3, 1000)
+    assert base != make_cache_key("m", "other", MESSAGES, 0.3, 1000)
+    assert base != make_cache_key("m", "sys", MESSAGES, 0.7, 1000)
+    assert base != make_cache_key("m", "sys", MESSAGES, 0.3, 500)
+
+
+def test_lru_evicts_oldest_and_expires():
+    clock = FakeClock()
+    lru = LRUCache(max_entries=2, ttl_seconds=10, clock=clock)
+    lru.set("a", 1)
+    lru.set("b", 2)
+    lru.get("a")
+    lru.set("c", 3)
+    assert lru.get("b") is None and lru.get("a") == 1
+
+    clock.now = 11
+    assert lru.get("a") is None
+
+
+def test_disk_tier_survives_new_memory_tier(tmp_path):
+    path = str(tmp_path / "llm_cache.db")
+    ResponseCache(LRUCache(), SQLiteCache(path)).set("k", "v")
+
+    cache = ResponseCache(LRUCache(), SQLiteCache(path))
+    assert cache.get("k") == "v"
+    assert cache.get("k") == "v"
+    stats = cache.get_stats()
+    assert (stats["disk_hits"], stats["memory_hits"], stats["misses"]) == (1, 1, 0)
+
+
+@pytest.mark.asyncio
+async def test_async_disk_tier_runs_off_the_loop_and_batches_writes(tmp_path):
+    disk = RecordingDisk(str(tmp_path / "llm_cache.db"))
+    cache = ResponseCache(LRUCache(), disk)
+    for i in range(5):
+        await cache.set_async(f"k{i}", f"v{i}")
+    assert disk.batches == []  # 磁盘写入在后台进行，set_async 不等待
+    await cache.flush()
+
+    reopened = ResponseCache(LRUCache(), disk)
+    assert await reopened.get_async("k3") == "v3"
+    assert await reopened.get_async("k3") == "v3"
+    assert await reopened.get_async("missing") is None
+    stats = reopened.get_stats()
+    assert (stats["disk_hits"], stats["memory_hits"], stats["misses"]) == (1, 1, 1)
+    assert disk.batches == [5]  # 五条写入合并成一次提交
+    assert threading.get_ident() not in disk.threads
+
+
+@pytest.mark.asyncio
+async def test_client_serves_repeat_prompt_from_cache():
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(200, json={"choices": [{"message": {"content": "「は」提示主题"}}]})
+
+    client = LLMClient()
+    client.cache = ResponseCache(LRUCache())
+    client.client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+    for _ in range(2):
+        assert await client.chat_completion(MESSAGES, temperature=0.3, cache=True) == "「は」提示主题"
+    assert len(calls) == 1
+
+    # 未开启缓存的调用始终请求上游
+    await client.chat_completion(MESSAGES, temperature=0.3)
+    assert len(calls) == 2
+    assert client.cache.get_stats()["hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_concurrent_identical_requests_share_one_upstream_call():
+    calls = []
+
+    async def handler(request):
+        calls.append(request)
+        await asyncio.sleep(0.05)
+        return httpx.Response(200, json={"choices": [{"message": {"content": "同じ答え"}}]})
+
+    client = LLMClient()
+    client.client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+    results = await asyncio.gather(*[client.chat_completion(MESSAGES) for _ in range(5)])
+
+    assert results == ["同じ答え"] * 5
+    assert len(calls) == 1
+    assert client.coalesced_requests == 4
+    assert client._inflight == {}
+
+    # 上一轮结束后不再合并，重新请求上游
+    await client.chat_completion(MESSAGES)
+    assert len(calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_does_not_cancel_shared_call():
+    async def handler(request):
+        await asyncio.sleep(0.05)
+        return httpx.Response(200, json={"choices": [{"message": {"content": "ok"}}]})
+
+    client = LLMClient()
+    client.client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+    impatient = asyncio.ensure_future(asyncio.wait_for(client.chat_completion(MESSAGES), timeout=0.01))
+    patient = asyncio.ensure_future(client.chat_completion(MESSAGES))
+
+    with pytest.raises(asyncio.TimeoutError):
+        await impatient
+    assert await patient == "ok"
+
+
+@pytest.mark.asyncio
+async def test_connection_probe_bypasses_cache():
+    status = {"code": 200}
+
+    def handler(request):
+        return httpx.Response(status["code"], json={"choices": [{"message": {"content": "Hi"}}]})
+
+    client = LLMClient()
+    client.cache = ResponseCache(LRUCache())
+    client.client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+    assert await client.test_connection() is True
+    status["code"] = 503
+    assert await client.test_connection() is False
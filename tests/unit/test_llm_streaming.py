@@ -0,0 +1,90 @@
+"""LLM流式接口测试"""
+import json
+
+import httpx
+import pytest
+
+from utils.llm_client import LLMClient
+from src.core.agents.core_agents.koumi import KoumiAgent
+
+
+def _sse_body(parts):
+    lines = []
+    for part in parts:
+        chunk = {"choices": [{"delta": {"content": part}}]}
+        lines.append(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n")
+    lines.append("data: [DONE]\n\n")
+    return "".join(lines).encode("utf-8")
+
+
+@pytest.fixture
+def llm_client():
+    """使用本地 MockTransport 的 LLM 客户端"""
+    def handler(request: httpx.Request) -> httpx.Response:
+        payload = json.loads(request.content)
+        assert payload["stream"] is True
+        assert payload["messages"][0]["role"] == "system"
+        return httpx.Response(200, content=_sse_body(["こん", "にちは", "！"]),
+                              headers={"Content-Type": "text/event-stream"})
+
+    client = LLMClient()
+    client.client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return client
+
+
+@pytest.mark.asyncio
+async def test_chat_completion_stream_yields_deltas(llm_client):
+    """测试流式接口逐段产出增量文本"""
+    deltas = [d async for d in llm_client.chat_completion_stream(
+        messages=[{"role": "user", "content": "hi"}], system_prompt="sys"
+    )]
+    assert deltas == ["こん", "にちは", "！"]
+
+
+@pytest.mark.asyncio
+async def test_chat_completion_stream_http_error_ends_quietly():
+    """测试HTTP错误时流式接口不抛异常，直接结束"""
+    client = LLMClient()
+    client.client = httpx.AsyncClient(transport=httpx.MockTransport(
+        lambda request: httpx.Response(429, text="rate limited")
+    ))
+    deltas = [d async for d in client.chat_completion_stream([{"role": "user", "content": "hi"}])]
+    assert deltas == []
+
+
+@pytest.mark.asyncio
+async def test_agent_stream_ends_with_full_result(llm_client):
+    """测试智能体流式接口最后产出完整结果"""
+    agent = KoumiAgent()
+    agent.llm_client = llm_client
+
+    events = [e async for e in agent.process_user_input_stream("こんにちは", {"session_id": "s1"})]
+
+    assert [e["content"] for e in events if e["type"] == "delta"] == ["こん", "にちは", "！"]
+    assert events[-1]["type"] == "done"
+    result = events[-1]["result"]
+    assert result["content"] == "こんにちは！"
+    assert result["agent_id"] == "koumi"
+    assert result["learning_points"]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("use_async_fallback", [False, True])
+async def test_agent_stream_falls_back_when_llm_yields_nothing(use_async_fallback):
+    """测试流式调用没有内容时使用备用回复（同步覆盖与基类协程两种备用方法）"""
+    client = LLMClient()
+    client.client = httpx.AsyncClient(transport=httpx.MockTransport(
+        lambda request: httpx.Response(429, text="rate limited")
+    ))
+    agent = KoumiAgent()
+    agent.llm_client = client
+    if use_async_fallback:
+        async def fallback(user_input):
+            return "もう一度お願いします"
+        agent._get_fallback_response = fallback
+
+    events = [e async for e in agent.process_user_input_stream("こんにちは", {"session_id": "s1"})]
+
+    deltas = [e["content"] for e in events if e["type"] == "delta"]
+    assert len(deltas) == 1 and isinstance(deltas[0], str) and deltas[0]
+    assert events[-1]["result"]["content"] == deltas[0]
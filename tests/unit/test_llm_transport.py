@@ -0,0 +1,57 @@
+"""LLM客户端连接池配置与统计测试"""
+import httpx
+import pytest
+
+from utils.llm_client import LLMClient, TransportConfig
+
+
+def _completion(request: httpx.Request) -> httpx.Response:
+    return httpx.Response(200, json={"choices": [{"message": {"content": "はい"}}]})
+
+
+def test_transport_config_from_env(monkeypatch):
+    monkeypatch.setenv("LLM_MAX_CONNECTIONS", "500")
+    monkeypatch.setenv("LLM_CONNECT_TIMEOUT", "2.5")
+    monkeypatch.setenv("LLM_HTTP2", "true")
+
+    config = TransportConfig.from_env()
+
+    assert config.max_connections == 500
+    assert config.connect_timeout == 2.5
+    assert config.read_timeout == 60.0
+    assert config.http2 is True
+
+
+def test_http2_falls_back_without_h2(monkeypatch):
+    monkeypatch.setattr("utils.llm_client._http2_available", lambda: False)
+    # 未安装 h2 时 httpx.AsyncClient(http2=True) 会直接抛 ImportError
+    client = LLMClient(TransportConfig(http2=True, max_connections=7))
+
+    stats = client.get_pool_stats()
+    assert stats["max_connections"] == 7
+    assert stats["http2"] is False  # 报告实际协议，而不是配置值
+
+
+@pytest.mark.asyncio
+async def test_pool_stats_track_requests_and_saturation():
+    client = LLMClient()
+    client.client = httpx.AsyncClient(transport=httpx.MockTransport(_completion))
+
+    assert await client.chat_completion([{"role": "user", "content": "hi"}]) == "はい"
+
+    stats = client.get_pool_stats()
+    assert stats["requests_total"] == 1
+    assert stats["peak_in_flight"] == 1
+    assert stats["in_flight"] == 0 and stats["saturation"] == 0
+
+
+@pytest.mark.asyncio
+async def test_pool_timeout_is_counted():
+    def exhausted(request):
+        raise httpx.PoolTimeout("no free connection", request=request)
+
+    client = LLMClient()
+    client.client = httpx.AsyncClient(transport=httpx.MockTransport(exhausted))
+
+    assert await client.chat_completion([{"role": "user", "content": "hi"}]) is None
+    assert client.get_pool_stats()["pool_timeouts"] == 1
@@ -0,0 +1,25 @@
+"""压测结果统计测试"""
+from tests.performance.load_test import ScenarioResult, compare_with_baseline, percentile
+
+
+def test_percentiles_and_summary():
+    result = ScenarioResult("chat", latencies=[i / 1000 for i in range(1, 101)], errors=["HTTP 500"], duration=2.0)
+
+    summary = result.summarize()
+
+    assert percentile([], 0.5) is None
+    assert summary["latency_ms"]["p50"] == 50.0
+    assert summary["latency_ms"]["p95"] == 95.0
+    assert summary["latency_ms"]["p99"] == 99.0
+    assert summary["requests"] == 101 and summary["error_rate"] == round(1 / 101, 4)
+    assert summary["throughput_rps"] == 50.5
+    assert "first_agent_frame_ms" not in summary
+
+
+def test_baseline_comparison_flags_regressions():
+    baseline = {"scenarios": {"chat": {"latency_ms": {"p95": 100.0}, "error_rate": 0.0}}}
+    ok = {"scenarios": {"chat": {"latency_ms": {"p95": 110.0}, "error_rate": 0.0}}}
+    slow = {"scenarios": {"chat": {"latency_ms": {"p95": 150.0}, "error_rate": 0.05}}}
+
+    assert compare_with_baseline(ok, baseline, tolerance=0.2) == []
+    assert len(compare_with_baseline(slow, baseline, tolerance=0.2)) == 2
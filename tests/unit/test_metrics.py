@@ -0,0 +1,126 @@
+"""指标注册表与 /metrics 埋点测试"""
+import asyncio
+
+import httpx
+import pytest
+from sqlalchemy import create_engine, text
+
+from utils.llm_client import LLMClient
+from utils.metrics import LLM_COALESCED, LLM_ERRORS, LLM_REQUEST_DURATION, LLM_TOKENS, MetricsRegistry, \
+    count_db_queries, get_metrics_registry
+
+
+def test_render_prometheus_text_format():
+    registry = MetricsRegistry()
+    requests = registry.counter("requests_total", "请求数", ("route",))
+    latency = registry.histogram("latency_seconds", "耗时", ("route",), buckets=(0.1, 1.0))
+    connections = registry.gauge("connections", "连接数")
+
+    requests.inc(route="/a")
+    requests.inc(2, route="/a")
+    latency.observe(0.05, route="/a")
+    latency.observe(0.5, route="/a")
+    connections.set_function(lambda: 7)
+
+    output = registry.render()
+
+    assert "# TYPE requests_total counter" in output
+    assert 'requests_total{route="/a"} 3' in output
+    assert 'latency_seconds_bucket{route="/a",le="0.1"} 1' in output
+    assert 'latency_seconds_bucket{route="/a",le="1"} 2' in output
+    assert 'latency_seconds_bucket{route="/a",le="+Inf"} 2' in output
+    assert 'latency_seconds_count{route="/a"} 2' in output
+    assert "connections 7" in output
+
+
+def test_labels_must_match_declaration():
+    counter = MetricsRegistry().counter("c_total", "c", ("provider",))
+
+    with pytest.raises(ValueError):
+        counter.inc(agent="tanaka")
+
+
+def test_count_db_queries_per_call():
+    engine = create_engine("sqlite://")
+
+    @count_db_queries("test.inner")
+    def inner():
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+
+    @count_db_queries("test.outer")
+    def outer():
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+            conn.execute(text("SELECT 2"))
+        inner()
+
+    outer()
+
+    registry = get_metrics_registry()
+    assert registry.get("db_queries_total").get(operation="test.outer") == 3
+    assert registry.get("db_queries_total").get(operation="test.inner") == 1
+    assert registry.get("db_queries_per_call").get_count(operation="test.outer") == 1
+
+
+@pytest.mark.asyncio
+async def test_llm_client_records_latency_tokens_and_errors():
+    def handler(request: httpx.Request) -> httpx.Response:
+        if b"boom" in request.content:
+            return httpx.Response(500, json={"error": "boom"})
+        return httpx.Response(200, json={
+            "choices": [{"message": {"content": "はい"}}],
+            "usage": {"prompt_tokens": 12, "completion_tokens": 3, "total_tokens": 15}
+        })
+
+    client = LLMClient()
+    client.client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    labels = {"provider": client.provider, "agent": "metrics_test"}
+    before = LLM_REQUEST_DURATION.get_count(outcome="ok", **labels)
+
+    assert await client.chat_completion([{"role": "user", "content": "hi"}], agent="metrics_test") == "はい"
+    assert await client.chat_completion([{"role": "user", "content": "boom"}], agent="metrics_test") is None
+
+    assert LLM_REQUEST_DURATION.get_count(outcome="ok", **labels) == before + 1
+    assert LLM_TOKENS.get(kind="prompt", **labels) >= 12
+    assert LLM_TOKENS.get(kind="completion", **labels) >= 3
+    assert LLM_ERRORS.get(reason="500", **labels) >= 1
+    await client.close()
+
+
+@pytest.mark.asyncio
+async def test_coalesced_llm_calls_are_attributed_to_each_waiting_agent():
+    async def handler(request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(0.05)
+        return httpx.Response(200, json={"choices": [{"message": {"content": "はい"}}]})
+
+    client = LLMClient()
+    client.client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    messages = [{"role": "user", "content": "coalesce me"}]
+    before = {agent: LLM_COALESCED.get(agent=agent) for agent in ("leader_agent", "follower_agent")}
+    leader_calls = LLM_REQUEST_DURATION.get_count(provider=client.provider, agent="leader_agent", outcome="ok")
+
+    await asyncio.gather(
+        client.chat_completion(messages, agent="leader_agent"),
+        client.chat_completion(messages, agent="follower_agent"),
+        client.chat_completion(messages, agent="follower_agent")
+    )
+
+    assert LLM_COALESCED.get(agent="follower_agent") == before["follower_agent"] + 2
+    assert LLM_COALESCED.get(agent="leader_agent") == before["leader_agent"]
+    assert LLM_REQUEST_DURATION.get_count(provider=client.provider, agent="leader_agent", outcome="ok") == leader_calls + 1
+    await client.close()
+
+
+@pytest.mark.asyncio
+async def test_metrics_endpoint_exposes_route_latency():
+    from main import app
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        await client.get("/health")
+        response = await client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert 'http_request_duration_seconds_count{method="GET",route="/health",status="200"}' in response.text
+    assert "websocket_connections 0" in response.text
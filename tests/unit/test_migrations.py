@@ -0,0 +1,78 @@
+"""学习进度库迁移测试"""
+import json
+
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.orm import Session
+
+from src.data.migrations import run_migrations
+from src.data.models.base import Base
+from src.data.models.learning import ConversationLearning
+
+
+def _index_names(engine, table):
+    return {index["name"] for index in inspect(engine).get_indexes(table)}
+
+
+def _legacy_engine(tmp_path):
+    """模拟迁移前的库：表结构相同但没有索引"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                conn.execute(text(f"DROP INDEX {index.name}"))
+    return engine
+
+
+def test_migration_adds_indexes_and_removes_duplicates(tmp_path):
+    engine = _legacy_engine(tmp_path)
+    with engine.begin() as conn:
+        for row_id, reviewed in (("a", 1), ("b", 5), ("c", 2)):
+            conn.execute(text(
+                "INSERT INTO vocabulary_progress (id, user_id, word, meaning, times_reviewed, mastery_score) "
+                "VALUES (:id, 'demo_user', '勉強', '', :reviewed, 0.1)"
+            ), {"id": row_id, "reviewed": reviewed})
+
+    assert run_migrations(engine) == [1, 2]
+
+    assert {"uq_vocabulary_progress_user_word", "ix_vocabulary_progress_user_next_review"} <= \
+        _index_names(engine, "vocabulary_progress")
+    assert "uq_user_stats_user" in _index_names(engine, "user_stats")
+    with engine.connect() as conn:
+        rows = conn.execute(text("SELECT id FROM vocabulary_progress")).all()
+    assert rows == [("b",)]  # 保留复习次数最多的一条
+
+
+def test_migrations_run_once(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'fresh.db'}")
+    Base.metadata.create_all(engine)
+
+    assert run_migrations(engine) == [1, 2]
+    assert run_migrations(engine) == []
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT version, name FROM schema_migrations")).all() == [
+            (1, "progress_indexes"), (2, "compress_conversation_json")
+        ]
+
+
+def test_migration_compresses_legacy_conversation_json(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    Base.metadata.create_all(engine)
+    reply = "「を」は目的語を表す助詞です。语法说明：を 表示宾语。"
+    responses = json.dumps({"tanaka": {"content": reply, "agent_name": "田中先生"}}, ensure_ascii=False)
+    points = json.dumps({"grammar_points": [{"point": "を", "explanation": reply}], "corrections": []},
+                        ensure_ascii=False)
+    with engine.begin() as conn:
+        conn.execute(text(
+            "INSERT INTO conversation_learning (id, session_id, agent_responses, learning_points, corrections_made) "
+            "VALUES ('c1', 's1', :responses, :points, '[]')"
+        ), {"responses": responses, "points": points})
+
+    run_migrations(engine)
+
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT typeof(agent_responses) FROM conversation_learning")).scalar() == "blob"
+    with Session(engine) as session:
+        row = session.get(ConversationLearning, "c1")
+        assert row.agent_responses["tanaka"]["content"] == reply
+        assert row.learning_points["grammar_points"] == [{"point": "を", "explanation_ref": "tanaka"}]
@@ -0,0 +1,70 @@
+"""上游LLM替身服务测试：LLMClient 通过 ASGI 直接调用替身服务"""
+import random
+
+import httpx
+import pytest
+
+from mock_llm_api import CANNED_REPLIES, MockProfile, canned_reply, create_app, sample_latency
+from utils.llm_client import LLMClient
+from utils.rate_limiter import LimiterConfig, ProviderLimiter
+
+TANAKA_PROMPT = "你是田中先生，一位严谨的日语语法专家和老师。"
+
+
+def _client(monkeypatch, profile):
+    monkeypatch.setenv("LLM_PROVIDER", "deepseek")
+    monkeypatch.delenv("LLM_PROVIDERS", raising=False)
+    monkeypatch.setenv("DEEPSEEK_API_BASE", "http://mock-llm/v1")
+    app = create_app(profile)
+    client = LLMClient()
+    client.limiter = ProviderLimiter(LimiterConfig())
+    client.client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app))
+    return client, app
+
+
+def canned_reply_options(system_prompt):
+    return next(r for name, r in CANNED_REPLIES.items() if name in system_prompt)
+
+
+def test_canned_reply_is_deterministic_per_agent():
+    messages = [{"role": "system", "content": TANAKA_PROMPT}, {"role": "user", "content": "は と が"}]
+    assert canned_reply(messages) == canned_reply(list(messages))
+    assert "中文解释" in canned_reply(messages)
+
+
+def test_latency_distributions():
+    rng = random.Random(1)
+    assert sample_latency("fixed:0.2", rng) == 0.2
+    assert 0.1 <= sample_latency("uniform:0.1,0.3", rng) <= 0.3
+    assert sample_latency("lognormal:-2,0.5", rng) > 0
+
+
+@pytest.mark.asyncio
+async def test_non_streaming_completion(monkeypatch):
+    client, _ = _client(monkeypatch, MockProfile(latency="fixed:0", tokens_per_second=0))
+
+    content = await client.chat_completion([{"role": "user", "content": "こんにちは"}], system_prompt=TANAKA_PROMPT)
+
+    assert content in canned_reply_options(TANAKA_PROMPT)
+
+
+@pytest.mark.asyncio
+async def test_streaming_completion(monkeypatch):
+    client, _ = _client(monkeypatch, MockProfile(latency="fixed:0", tokens_per_second=0))
+
+    deltas = [d async for d in client.chat_completion_stream(
+        [{"role": "user", "content": "こんにちは"}], system_prompt=TANAKA_PROMPT
+    )]
+
+    assert len(deltas) > 1
+    assert "".join(deltas) in canned_reply_options(TANAKA_PROMPT)
+
+
+@pytest.mark.asyncio
+async def test_rate_limit_injection(monkeypatch):
+    client, app = _client(monkeypatch, MockProfile(latency="fixed:0", rate_limit_rate=1.0, retry_after=0))
+
+    assert await client.chat_completion([{"role": "user", "content": "hi"}]) is None
+    assert app.state.stats["rate_limited"] == 1
+    assert client.limiter.get_stats()["throttled_total"] == 1
+
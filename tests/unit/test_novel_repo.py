@@ -0,0 +1,86 @@
+"""小说项目存储测试"""
+import json
+
+import pytest
+from sqlalchemy import event
+
+from src.storage import novel_repo
+from utils.db_engine import get_engine, get_sessionmaker
+
+
+@pytest.fixture
+def repo(tmp_path, monkeypatch):
+    url = f"sqlite:///{tmp_path / 'novel.db'}"
+    engine = get_engine(url)
+    monkeypatch.setattr(novel_repo, "engine", engine)
+    monkeypatch.setattr(novel_repo, "SessionLocal", get_sessionmaker(url))
+    monkeypatch.setattr(novel_repo, "ReadSessionLocal", get_sessionmaker(url, readonly=True))
+    monkeypatch.setattr(novel_repo, "_schema_ready", False)
+
+    writes = []
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _record(conn, cursor, statement, *args):
+        if "novel_items" in statement and statement.split()[0] in ("INSERT", "UPDATE", "DELETE"):
+            writes.append(statement.split()[0])
+
+    monkeypatch.setattr(novel_repo, "writes", writes, raising=False)
+    yield novel_repo
+    event.remove(engine, "before_cursor_execute", _record)
+
+
+def _paragraphs(n, edited=None):
+    return [{"jp": f"第{i}段" + ("（改）" if i == edited else ""), "zh": f"段落{i}"} for i in range(n)]
+
+
+def test_save_writes_only_changed_paragraphs(repo):
+    outline = [{"title": "第一章", "status": "current"}]
+    assert repo.save_project("s1", "p", outline, _paragraphs(50))["written"] == 51
+
+    repo.writes.clear()
+    result = repo.save_project("s1", "p", outline, _paragraphs(52, edited=3))
+
+    assert (result["written"], result["deleted"]) == (3, 0)  # 1 处修改 + 2 段新增
+    assert repo.writes == ["UPDATE", "INSERT"]  # 新增段落一次批量插入
+
+    result = repo.save_project("s1", "p", outline, _paragraphs(10))
+    assert (result["written"], result["deleted"]) == (1, 42)
+    assert repo.load_project("s1", "p")["manuscript"] == _paragraphs(10)
+
+
+def test_load_supports_range_reads(repo):
+    repo.save_project("s1", "p", [], _paragraphs(30))
+
+    page = repo.load_project("s1", "p", offset=10, limit=5)
+
+    assert page["manuscript"] == _paragraphs(30)[10:15]
+    assert page["manuscript_total"] == 30
+    assert repo.load_project("s1", "missing") is None
+
+
+def test_load_rejects_negative_offset_and_non_positive_limit(repo):
+    repo.save_project("s1", "p", [], _paragraphs(3))
+
+    with pytest.raises(ValueError):
+        repo.load_project("s1", "p", offset=-1)
+    with pytest.raises(ValueError):
+        repo.load_project("s1", "p", limit=0)
+
+
+def test_legacy_json_rows_are_readable_and_migrated_on_save(repo):
+    repo.init_db()
+    with repo.SessionLocal() as db:
+        db.add(repo.NovelProject(
+            id="s1:old", session_id="s1", project="old",
+            outline=json.dumps([{"title": "序章"}]), manuscript=json.dumps(_paragraphs(4))
+        ))
+        db.commit()
+
+    loaded = repo.load_project("s1", "old", offset=1, limit=2)
+    assert loaded["outline"] == [{"title": "序章"}]
+    assert loaded["manuscript"] == _paragraphs(4)[1:3]
+
+    repo.save_project("s1", "old", loaded["outline"], _paragraphs(4))
+    with repo.SessionLocal() as db:
+        assert db.get(repo.NovelProject, "s1:old").manuscript is None
+    assert repo.load_project("s1", "old")["manuscript"] == _paragraphs(4)
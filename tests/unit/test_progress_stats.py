@@ -0,0 +1,268 @@
+"""ProgressTracker 写入路径与学习统计测试"""
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from src.data.models.base import Base
+from src.data.models.learning import ConversationLearning, UserStats, VocabularyProgress
+from src.data.repositories.progress_tracker import (
+    ProgressTracker, collect_learning_data, expand_learning_points, invalidate_progress_summary
+)
+from utils.metrics import get_metrics_registry
+
+KOUMI_REPLY = {"koumi": {"content": "日本語の勉強、頑張って", "agent_name": "小美"}}
+
+
+@pytest.fixture
+def tracker():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    invalidate_progress_summary()  # 摘要缓存是进程级的，避免串用其他测试的数据库
+    yield ProgressTracker(session=session)
+    session.close()
+
+
+def _stats(tracker):
+    return tracker.session.query(UserStats).filter(UserStats.user_id == "demo_user").one()
+
+
+def test_stats_follow_new_rows(tracker):
+    tracker.extract_learning_data("こんにちは", KOUMI_REPLY, "s1")
+    tracker.extract_learning_data("こんにちは", KOUMI_REPLY, "s1")
+
+    stats = _stats(tracker)
+    vocabulary = tracker.session.query(VocabularyProgress).count()
+    assert vocabulary > 0
+    assert stats.total_conversations == 2
+    assert stats.total_vocabulary == vocabulary  # 第二次是复习，不新增
+    assert stats.total_xp == 2 * 10 + vocabulary * 5
+    assert tracker.reconcile_user_stats() == {
+        "total_conversations": 0, "total_vocabulary": 0, "total_grammar_points": 0
+    }
+
+
+def test_stats_update_does_not_recount_history(tracker):
+    tracker.extract_learning_data("こんにちは", KOUMI_REPLY, "s1")
+    queries = get_metrics_registry().get("db_queries_per_call")
+    before = queries.get_sum(operation="progress_tracker.reconcile_user_stats")
+
+    tracker.extract_learning_data("おはよう", KOUMI_REPLY, "s1")
+
+    # 统计记录已存在时不再走全表计数
+    assert queries.get_sum(operation="progress_tracker.reconcile_user_stats") == before
+
+
+def test_reconcile_corrects_drift(tracker):
+    tracker.extract_learning_data("こんにちは", KOUMI_REPLY, "s1")
+    stats = _stats(tracker)
+    stats.total_conversations = 10
+    tracker.session.commit()
+
+    drift = tracker.reconcile_user_stats()
+
+    assert drift["total_conversations"] == -9
+    assert _stats(tracker).total_conversations == 1
+
+
+def test_one_commit_per_message_and_repeated_words(tracker):
+    from sqlalchemy import event
+
+    commits = []
+    # 按数据库层的 COMMIT 计数（每条对话的保存点释放也会触发 Session 的 after_commit）
+    event.listen(tracker.session.get_bind(), "commit", lambda conn: commits.append(1))
+    reply = {"koumi": {"content": "勉強、勉強、日本語", "agent_name": "小美"}}
+
+    tracker.extract_learning_data("こんにちは", reply, "s1")
+
+    assert len(commits) == 1
+    words = {v.word: v for v in tracker.session.query(VocabularyProgress).all()}
+    assert words["勉強"].times_reviewed == 2  # 同一条消息中重复出现按复习计
+    assert _stats(tracker).total_vocabulary == 2
+
+
+def test_failed_write_rolls_back_whole_message(tracker, monkeypatch):
+    def fail(*args, **kwargs):
+        raise RuntimeError("disk full")
+
+    monkeypatch.setattr(tracker, "_update_cultural_knowledge", fail)
+
+    with pytest.raises(RuntimeError):
+        tracker.extract_learning_data("こんにちは", KOUMI_REPLY, "s1")
+
+    assert tracker.session.query(VocabularyProgress).count() == 0
+
+
+def test_bad_event_is_skipped_without_losing_the_batch(tracker, monkeypatch):
+    save = tracker._save_conversation_learning
+
+    def save_or_fail(user_input, *args):
+        if user_input == "bad":
+            raise RuntimeError("bad event")
+        return save(user_input, *args)
+
+    monkeypatch.setattr(tracker, "_save_conversation_learning", save_or_fail)
+    events = [
+        {"user_input": text, "agent_responses": KOUMI_REPLY, "session_id": "s1"}
+        for text in ("こんにちは", "bad", "おはよう")
+    ]
+
+    results = tracker.track_batch(events)
+
+    assert results[1] is None and results[0] and results[2]
+    assert tracker.session.query(ConversationLearning).count() == 2
+    assert _stats(tracker).total_conversations == 2
+
+
+def test_progress_rows_are_upserted_in_one_statement_per_table(tracker):
+    from sqlalchemy import event
+
+    statements = []
+    event.listen(tracker.session.get_bind(), "before_cursor_execute",
+                 lambda conn, cursor, statement, *args: statements.append(statement))
+    reply = {"koumi": {"content": "勉強、日本語、会話、練習、単語", "agent_name": "小美"}}
+
+    tracker.extract_learning_data("こんにちは", reply, "s1")
+    tracker.extract_learning_data("こんにちは", reply, "s1")
+
+    vocabulary = [s for s in statements if "vocabulary_progress" in s]
+    upserts = [s for s in vocabulary if s.startswith("INSERT")]
+    assert len(upserts) == 2  # 每条消息一条 INSERT ... ON CONFLICT，不逐词查询
+    assert all("ON CONFLICT" in s for s in upserts)
+    assert all("count(*)" in s for s in vocabulary if s not in upserts)  # 只有首次创建统计时的计数
+    assert {v.times_reviewed for v in tracker.session.query(VocabularyProgress)} == {2}
+    assert _stats(tracker).total_vocabulary == 5
+
+
+def test_summary_is_aggregated_in_sql(tracker):
+    reply = {"tanaka": {"content": "语法：を と が 的用法", "agent_name": "田中先生"}, **KOUMI_REPLY}
+    tracker.extract_learning_data("こんにちは", reply, "s1")
+    tracker.extract_learning_data("こんにちは", KOUMI_REPLY, "s1")
+
+    summary = tracker.get_user_progress_summary()
+
+    vocabulary = tracker.session.query(VocabularyProgress).all()
+    skills = summary["skills"]
+    assert skills["vocabulary"]["count"] == len(vocabulary)
+    assert skills["vocabulary"]["mastery"] == pytest.approx(
+        sum(v.mastery_score for v in vocabulary) / len(vocabulary)
+    )
+    assert skills["grammar"]["count"] == 3
+    assert skills["conversation"]["count"] == 2
+    assert len(summary["weak_points"]) == 3  # 新语法点掌握度 0.1，最多列 3 个
+
+
+def test_summary_cache_is_invalidated_by_writes(tracker):
+    tracker.extract_learning_data("こんにちは", KOUMI_REPLY, "s1")
+    queries = get_metrics_registry().get("db_queries_per_call")
+    operation = "progress_tracker.get_user_progress_summary"
+
+    first = tracker.get_user_progress_summary()
+    calls, total = queries.get_count(operation=operation), queries.get_sum(operation=operation)
+    assert tracker.get_user_progress_summary() == first
+    assert queries.get_sum(operation=operation) == total  # 命中缓存，不查库
+    assert queries.get_count(operation=operation) == calls + 1
+
+    tracker.extract_learning_data("おはよう", KOUMI_REPLY, "s1")
+    assert tracker.get_user_progress_summary()["skills"]["conversation"]["count"] == 2
+
+
+def test_stored_learning_points_reference_agent_replies(tracker):
+    reply = "「を」は目的語を表します。语法：を と が 的用法，应该是「本を読む」。"
+    responses = {"tanaka": {"content": reply, "agent_name": "田中先生"}}
+    learning_data = tracker.extract_learning_data("本が読む", responses, "s1")
+
+    row = tracker.session.query(ConversationLearning).one()
+    stored = row.learning_points
+    assert learning_data["grammar_points"][0]["explanation"] == reply  # 返回值不变
+    assert all("explanation" not in p and p["explanation_ref"] == "tanaka" for p in stored["grammar_points"])
+    assert row.corrections_made == stored["corrections"]
+    assert expand_learning_points(stored, row.agent_responses) == learning_data
+
+
+def test_concurrent_writers_of_the_same_word_do_not_conflict(tmp_path):
+    from concurrent.futures import ThreadPoolExecutor
+
+    from utils.db_engine import get_engine, get_sessionmaker
+
+    url = f"sqlite:///{tmp_path / 'progress.db'}"
+    Base.metadata.create_all(get_engine(url))
+    reply = {"koumi": {"content": "勉強", "agent_name": "小美"}}
+
+    def track(i):
+        with get_sessionmaker(url)() as session:
+            ProgressTracker(session=session).extract_learning_data(f"q{i}", reply, f"s{i}")
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        list(pool.map(track, range(8)))  # 重复插入同一个词不会触发唯一索引冲突
+
+    with get_sessionmaker(url)() as session:
+        word = session.query(VocabularyProgress).one()
+        assert word.times_reviewed == 8
+
+
+def test_stats_increment_is_atomic_across_sessions(tmp_path):
+    from utils.db_engine import get_engine, get_sessionmaker
+
+    url = f"sqlite:///{tmp_path / 'progress.db'}"
+    Base.metadata.create_all(get_engine(url))
+    with get_sessionmaker(url)() as first, get_sessionmaker(url)() as second:
+        tracker, other = ProgressTracker(session=first), ProgressTracker(session=second)
+        tracker.extract_learning_data("q0", KOUMI_REPLY, "s1")
+        loaded = _stats(tracker)  # 会话里留着一份已加载（之后会过时）的统计
+        assert loaded.total_conversations == 1
+
+        other.extract_learning_data("q1", KOUMI_REPLY, "s2")
+        tracker.extract_learning_data("q2", KOUMI_REPLY, "s1")
+
+        assert _stats(other).total_conversations == 3
+
+
+def test_queue_writers_and_reconcile_run_concurrently(tmp_path):
+    from concurrent.futures import ThreadPoolExecutor
+
+    from sqlalchemy import text
+
+    from utils.db_engine import get_engine, get_sessionmaker
+
+    url = f"sqlite:///{tmp_path / 'progress.db'}"
+    Base.metadata.create_all(get_engine(url))
+    Session = get_sessionmaker(url)
+    events = [{"user_input": f"q{i}", "agent_responses": KOUMI_REPLY,
+               "session_id": f"s{i}", "scene_context": "general"} for i in range(4)]
+
+    def write(i):
+        with Session() as session:
+            if i % 3 == 2:
+                ProgressTracker(session=session).reconcile_user_stats()
+            else:
+                assert None not in ProgressTracker(session=session).track_batch(events)
+
+    idle = Session()
+    try:
+        # 另有一个读过数据后不关闭的会话，占着写连接池里的一个连接
+        idle.execute(text("SELECT COUNT(*) FROM user_stats")).all()
+        with ThreadPoolExecutor(max_workers=6) as pool:
+            list(pool.map(write, range(12)))  # 8 个批量写入与 4 次全表校正交错
+    finally:
+        idle.close()
+
+    with Session() as session:
+        tracker = ProgressTracker(session=session)
+        assert _stats(tracker).total_conversations == 8 * len(events)
+        assert tracker.reconcile_user_stats() == {
+            "total_conversations": 0, "total_vocabulary": 0, "total_grammar_points": 0
+        }
+
+
+def test_learning_data_is_collected_without_a_tracker():
+    responses = {
+        **KOUMI_REPLY,
+        "tanaka": {"content": "文法：「を」は目的語", "agent_name": "田中先生"},
+        "yamada": {"content": "茶道", "agent_name": "山田先生"},
+    }
+    data = collect_learning_data("お茶を飲む", responses)  # 纯计算，不需要会话
+
+    assert [point["point"] for point in data["grammar_points"]] == ["を"]
+    assert [topic["topic"] for topic in data["cultural_topics"]] == ["茶道"]
+    assert data["vocabulary"] and data["corrections"] == []
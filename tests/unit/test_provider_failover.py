@@ -0,0 +1,116 @@
+"""多提供商故障转移 / 对冲请求测试（两个本地替身服务，离线运行）"""
+import asyncio
+
+import httpx
+import pytest
+
+from utils.llm_client import LLMClient
+from utils.provider_pool import PoolConfig
+
+PRIMARY = "primary.test"
+BACKUP = "backup.test"
+MESSAGES = [{"role": "user", "content": "こんにちは"}]
+
+
+@pytest.fixture(autouse=True)
+def two_providers(monkeypatch):
+    monkeypatch.setenv("LLM_PROVIDER", "deepseek")
+    monkeypatch.setenv("LLM_PROVIDERS", "deepseek,ark")
+    monkeypatch.setenv("DEEPSEEK_API_BASE", f"http://{PRIMARY}/v1")
+    monkeypatch.setenv("ARK_API_BASE", f"http://{BACKUP}/v1")
+    monkeypatch.setenv("ARK_MODEL", "ark-test")
+
+
+def _client(servers, **pool_kwargs):
+    """servers: host -> async handler(request) -> httpx.Response"""
+    async def route(request):
+        return await servers[request.url.host](request)
+
+    client = LLMClient(pool_config=PoolConfig(**pool_kwargs))
+    client.client = httpx.AsyncClient(transport=httpx.MockTransport(route))
+    return client
+
+
+def _answer(text, delay=0.0, status=200):
+    async def handler(request):
+        await asyncio.sleep(delay)
+        if status != 200:
+            return httpx.Response(status, text="upstream error")
+        return httpx.Response(200, json={"choices": [{"message": {"content": text}}]})
+    return handler
+
+
+@pytest.mark.asyncio
+async def test_fails_over_to_backup_provider():
+    client = _client({PRIMARY: _answer("", status=500), BACKUP: _answer("backup")})
+
+    assert await client.chat_completion(MESSAGES) == "backup"
+
+    primary, backup = client.providers.get_stats()
+    assert primary["failures"] == 1 and backup["successes"] == 1
+
+
+@pytest.mark.asyncio
+async def test_unhealthy_provider_is_ejected():
+    seen = []
+
+    async def failing(request):
+        seen.append(request)
+        return httpx.Response(503)
+
+    client = _client({PRIMARY: failing, BACKUP: _answer("backup")}, failure_threshold=2, cooldown=60)
+
+    for i in range(4):
+        assert await client.chat_completion([{"role": "user", "content": f"q{i}"}]) == "backup"
+
+    # 连续失败 2 次后主提供商被摘除，后续请求直接走备用提供商
+    assert len(seen) == 2
+    assert client.providers.ordered()[0].name == "ark"
+
+
+@pytest.mark.asyncio
+async def test_hedged_request_takes_faster_provider():
+    client = _client(
+        {PRIMARY: _answer("slow", delay=1.0), BACKUP: _answer("fast", delay=0.01)},
+        hedge=True, hedge_default_delay=0.05
+    )
+
+    started = asyncio.get_running_loop().time()
+    assert await client.chat_completion(MESSAGES) == "fast"
+    assert asyncio.get_running_loop().time() - started < 0.5
+    assert client.providers.get_stats()[1]["hedges_won"] == 1
+
+
+@pytest.mark.asyncio
+async def test_no_hedge_when_primary_is_fast():
+    calls = []
+
+    async def counting(request):
+        calls.append(request.url.host)
+        return await _answer("ok")(request)
+
+    client = _client({PRIMARY: counting, BACKUP: counting}, hedge=True, hedge_default_delay=0.2)
+
+    assert await client.chat_completion(MESSAGES) == "ok"
+    assert calls == [PRIMARY]
+
+
+@pytest.mark.asyncio
+async def test_failover_reply_is_cached_under_serving_provider():
+    from utils.cache import LRUCache, ResponseCache
+
+    status = {"primary": 500}
+
+    async def primary(request):
+        return await _answer("primary", status=status["primary"])(request)
+
+    client = _client({PRIMARY: primary, BACKUP: _answer("backup")}, failure_threshold=5)
+    client.cache = ResponseCache(LRUCache())
+
+    assert await client.chat_completion(MESSAGES, cache=True) == "backup"
+
+    # 主提供商恢复后按主提供商查缓存，不会拿到备用提供商的回复
+    status["primary"] = 200
+    assert await client.chat_completion(MESSAGES, cache=True) == "primary"
+    assert await client.chat_completion(MESSAGES, cache=True) == "primary"
+    assert client.cache.get_stats()["hits"] == 1
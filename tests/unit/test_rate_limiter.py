@@ -0,0 +1,84 @@
+"""上游LLM限流测试"""
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from utils.llm_client import LLMClient
+from utils.rate_limiter import (
+    AdaptiveConcurrencyLimiter, LimiterConfig, Priority, ProviderLimiter, TokenBucket,
+    current_priority, llm_priority,
+)
+
+
+@pytest.mark.asyncio
+async def test_interactive_waiters_are_served_before_background():
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=1, min_limit=1)
+    await limiter.acquire()
+    served = []
+
+    async def worker(name, priority):
+        await limiter.acquire(priority)
+        served.append(name)
+        limiter.release()
+
+    background = asyncio.ensure_future(worker("novel", Priority.BACKGROUND))
+    await asyncio.sleep(0)
+    interactive = asyncio.ensure_future(worker("chat", Priority.INTERACTIVE))
+    await asyncio.sleep(0)
+
+    limiter.release()
+    await asyncio.gather(background, interactive)
+    assert served == ["chat", "novel"]
+
+
+def test_aimd_window_grows_additively_and_halves_on_overload():
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=10, min_limit=2, max_limit=20)
+    for _ in range(10):
+        limiter.in_flight += 1
+        limiter.release()
+    assert limiter.limit == pytest.approx(11, abs=0.05)
+
+    limiter.in_flight += 1
+    limiter.release(overloaded=True)
+    assert limiter.limit == pytest.approx(5.5, abs=0.05)
+
+    limiter.in_flight += 1
+    limiter.release(latency=limiter.latency_threshold + 1)
+    assert limiter.limit == pytest.approx(2.75, abs=0.05)
+
+
+@pytest.mark.asyncio
+async def test_token_bucket_paces_requests():
+    bucket = TokenBucket(rate=50, capacity=1)
+    started = time.monotonic()
+    for _ in range(3):
+        await bucket.acquire()
+    assert time.monotonic() - started >= 0.035
+
+
+@pytest.mark.asyncio
+async def test_priority_context_propagates_to_tasks():
+    async def read_priority():
+        return current_priority()
+
+    with llm_priority(Priority.BACKGROUND):
+        assert await asyncio.ensure_future(read_priority()) == Priority.BACKGROUND
+    assert current_priority() == Priority.INTERACTIVE
+
+
+@pytest.mark.asyncio
+async def test_429_shrinks_provider_window():
+    client = LLMClient()
+    client.limiter = ProviderLimiter(LimiterConfig(initial_concurrency=8, min_concurrency=1))
+    client.client = httpx.AsyncClient(transport=httpx.MockTransport(
+        lambda request: httpx.Response(429, text="rate limited")
+    ))
+
+    assert await client.chat_completion([{"role": "user", "content": "hi"}]) is None
+
+    stats = client.limiter.get_stats()
+    assert stats["throttled_total"] == 1
+    assert stats["concurrency_limit"] == 4
+    assert stats["in_flight"] == 0
@@ -0,0 +1,85 @@
+"""会话状态存储测试"""
+from src.core.agents.core_agents.koumi import KoumiAgent
+from utils.session_store import SessionStore
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_ring_buffer_keeps_latest_turns():
+    store = SessionStore(max_turns=3)
+    for i in range(5):
+        store.append_turn("s1", "koumi", f"q{i}", f"a{i}")
+
+    assert [t["user"] for t in store.get_turns("s1", "koumi")] == ["q2", "q3", "q4"]
+    assert store.get_history_messages("s1", "koumi", limit=1) == [
+        {"role": "user", "content": "q4"},
+        {"role": "assistant", "content": "a4"},
+    ]
+
+
+def test_sessions_are_isolated():
+    store = SessionStore()
+    store.append_turn("s1", "koumi", "hello", "やっほ")
+    store.append_turn("s2", "koumi", "bye", "またね")
+
+    assert [t["user"] for t in store.get_turns("s1", "koumi")] == ["hello"]
+    assert [t["user"] for t in store.get_turns("s2", "koumi")] == ["bye"]
+    assert store.get_turns("s1", "tanaka") == []
+
+
+def test_idle_sessions_expire():
+    clock = FakeClock()
+    store = SessionStore(ttl_seconds=60, clock=clock)
+    store.append_turn("old", "koumi", "q", "a")
+    clock.now = 30
+    store.append_turn("new", "koumi", "q", "a")
+
+    clock.now = 70
+    assert store.get_turns("old", "koumi") == []
+    assert "old" not in store and "new" in store
+
+
+def test_memory_cap_evicts_least_recently_used():
+    store = SessionStore(max_bytes=2000)
+    store.append_turn("s1", "koumi", "x" * 500, "y" * 400)
+    store.append_turn("s2", "koumi", "x" * 500, "y" * 400)
+    store.get_turns("s1", "koumi")  # s1 变为最近访问
+    store.append_turn("s3", "koumi", "x" * 500, "y" * 400)
+
+    assert "s2" not in store
+    assert "s1" in store and "s3" in store
+    assert store.get_stats()["total_bytes"] <= 2000
+
+
+def test_agent_history_comes_from_session():
+    agent = KoumiAgent()
+    agent.session_store = SessionStore()
+    agent.add_to_memory("今日は", "こんにちは〜", {"session_id": "s1"})
+
+    messages = agent._build_llm_messages("元気？", {"session_id": "s1"})
+    assert [m["content"] for m in messages] == ["今日は", "こんにちは〜", "元気？"]
+    assert agent._build_llm_messages("元気？", {"session_id": "s2"}) == [{"role": "user", "content": "元気？"}]
+
+
+def test_calls_without_session_id_share_no_history():
+    store = SessionStore()
+    store.append_turn(None, "koumi", "秘密", "ひみつ")
+    store.update_user_profile("", {"level": "N3"})
+
+    assert len(store) == 0
+    assert store.get_turns(None, "koumi") == []
+    assert store.get_user_profile(None) == {}
+
+
+def test_internal_prompts_are_not_recorded_as_user_turns():
+    agent = KoumiAgent()
+    agent.session_store = SessionStore()
+    agent.add_to_memory("其他智能体认为：…", "[回应] …", {"session_id": "s1", "internal_prompt": True})
+
+    assert agent.session_store.get_turns("s1", agent.agent_id) == []
@@ -0,0 +1,87 @@
+"""请求追踪测试"""
+import asyncio
+
+import httpx
+import pytest
+
+from utils.tracing import Trace, TraceStore, current_trace_id, get_trace_store, span, start_trace, traced
+
+
+def _by_name(trace):
+    return {s.name: s for s in trace.spans}
+
+
+@pytest.mark.asyncio
+async def test_spans_nest_across_tasks():
+    @traced("agent.work")
+    async def work(delay):
+        await asyncio.sleep(delay)
+        with span("llm.call", provider="mock"):
+            await asyncio.sleep(0)
+
+    with start_trace("request") as root:
+        trace_id = current_trace_id()
+        with span("orchestrator.collect") as collect:
+            await asyncio.gather(work(0.01), work(0.02))
+
+    trace = get_trace_store().get(trace_id)
+    names = [s.name for s in trace.spans]
+    assert names.count("agent.work") == 2
+    assert names.count("llm.call") == 2
+    assert all(s.parent_id == collect.span_id for s in trace.spans if s.name == "agent.work")
+    assert collect.parent_id == root.span_id
+    assert root.duration_ms >= collect.duration_ms >= 20
+    assert current_trace_id() is None
+
+
+@pytest.mark.asyncio
+async def test_span_rejoins_trace_by_id_and_records_errors():
+    with start_trace("request"):
+        trace_id = current_trace_id()
+        session_context = {"trace_id": trace_id}
+
+        # 模拟脱离调用链的代码（新的空上下文）按 session_context 接回
+        def detached():
+            with span("background.save", trace_id=session_context["trace_id"]):
+                pass
+        await asyncio.get_running_loop().run_in_executor(None, detached)
+
+        with pytest.raises(ValueError):
+            with span("failing"):
+                raise ValueError("boom")
+
+    spans = _by_name(get_trace_store().get(trace_id))
+    assert spans["background.save"].parent_id == spans["request"].span_id
+    assert spans["failing"].error == "ValueError: boom"
+
+
+def test_span_outside_trace_is_noop():
+    with span("orphan") as current:
+        assert current is None
+
+
+def test_store_keeps_most_recent_traces():
+    store = TraceStore(max_traces=2)
+    traces = [Trace(f"t{i}") for i in range(3)]
+    for trace in traces:
+        store.begin(trace)
+        store.finish(trace)
+
+    assert [t.name for t in store.recent()] == ["t2", "t1"]
+    assert store.get(traces[0].trace_id) is None
+
+
+@pytest.mark.asyncio
+async def test_api_requests_are_traced_and_exportable():
+    from main import app
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        response = await client.get("/api/health", headers={"X-Trace-Id": "trace-test-1"})
+        assert response.headers["x-trace-id"] == "trace-test-1"
+
+        exported = (await client.get("/api/v1/traces/trace-test-1")).json()
+        listed = (await client.get("/api/v1/traces")).json()
+
+    assert exported["spans"][0]["name"] == "GET /api/health"
+    assert exported["spans"][0]["attributes"]["status"] == 200
+    assert any(t["trace_id"] == "trace-test-1" for t in listed["traces"])
@@ -2,6 +2,285 @@
 # -*- coding: utf-8 -*-
 """
 🎌 cache - 日语学习Multi-Agent系统
+
+LLM 回复缓存（按内容寻址）：
+- 键 = model / system_prompt / messages / temperature / max_tokens 的 SHA-256
+- 内存 LRU 层（条数上限 + TTL）
+- 可选 SQLite 磁盘层（进程重启后仍可命中）
+- 命中 / 未命中计数
+- 事件循环上用 get_async / set_async：只有内存层在循环上访问；磁盘读放到数据库线程池，
+  磁盘写先进入待写缓冲，由一个后台任务批量写入（一批只提交一次）
 """
 
-# TODO: 实现 cache 模块功能
+import asyncio
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from utils.config import settings
+from utils.db_executor import run_db
+from utils.metrics import CACHE_HIT_RATIO
+
+logger = logging.getLogger(__name__)
+
+
+def make_cache_key(
+    model: Optional[str],
+    system_prompt: Optional[str],
+    messages: List[Dict[str, str]],
+    temperature: float,
+    max_tokens: Optional[int]
+) -> str:
+    """根据请求内容生成缓存键"""
+    payload = json.dumps(
+        {
+            "model": model,
+            "system_prompt": system_prompt,
+            "messages": messages,
+            "temperature": temperature,
+            "max_tokens": max_tokens
+        },
+        ensure_ascii=False,
+        sort_keys=True,
+        separators=(",", ":")
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LRUCache:
+    """内存 LRU 缓存（带 TTL）"""
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 3600.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._data: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[Any]:
+        item = self._data.get(key)
+        if item is None:
+            return None
+        expires_at, value = item
+        if expires_at <= self._clock():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: Any) -> None:
+        self._data[key] = (self._clock() + self.ttl_seconds, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        self._data.pop(key, None)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class SQLiteCache:
+    """SQLite 磁盘缓存（带 TTL），用于跨进程 / 重启复用"""
+
+    def __init__(self, path: str, ttl_seconds: float = 86400.0):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if row[1] <= time.time():
+                self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+            return row[0]
+
+    def set(self, key: str, value: str) -> None:
+        self.set_many([(key, value)])
+
+    def set_many(self, items: List[Tuple[str, str]]) -> None:
+        """批量写入，只提交一次"""
+        expires_at = time.time() + self.ttl_seconds
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO llm_cache (key, value, expires_at) VALUES (?, ?, ?)",
+                [(key, value, expires_at) for key, value in items]
+            )
+            self._conn.commit()
+
+    def purge_expired(self) -> int:
+        with self._lock:
+            cursor = self._conn.execute("DELETE FROM llm_cache WHERE expires_at <= ?", (time.time(),))
+            self._conn.commit()
+            return cursor.rowcount
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_cache")
+            self._conn.commit()
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+class ResponseCache:
+    """两级 LLM 回复缓存：内存 LRU → SQLite（可选）"""
+
+    def __init__(self, memory: LRUCache, disk: Optional[SQLiteCache] = None):
+        self.memory = memory
+        self.disk = disk
+        self.hits = 0
+        self.misses = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.sets = 0
+        # 等待后台批量写入磁盘层的条目，以及正在执行的写入任务
+        self._pending: Dict[str, str] = {}
+        self._flush_task: Optional[asyncio.Task] = None
+
+    def get(self, key: str) -> Optional[str]:
+        value = self.memory.get(key)
+        if value is not None:
+            self.hits += 1
+            self.memory_hits += 1
+            return value
+
+        if self.disk is not None:
+            try:
+                value = self.disk.get(key)
+            except sqlite3.Error as e:
+                logger.warning(f"读取磁盘缓存失败: {e}")
+                value = None
+            if value is not None:
+                self.memory.set(key, value)  # 回填内存层
+                self.hits += 1
+                self.disk_hits += 1
+                return value
+
+        self.misses += 1
+        return None
+
+    def set(self, key: str, value: str) -> None:
+        self.memory.set(key, value)
+        self.sets += 1
+        if self.disk is not None:
+            try:
+                self.disk.set(key, value)
+            except sqlite3.Error as e:
+                logger.warning(f"写入磁盘缓存失败: {e}")
+
+    async def get_async(self, key: str) -> Optional[str]:
+        """get 的事件循环版本：内存层直接读，磁盘层在数据库线程池中读"""
+        value = self.memory.get(key)
+        if value is None and self.disk is not None:
+            value = self._pending.get(key)
+            if value is None:
+                try:
+                    value = await run_db(self.disk.get, key)
+                except sqlite3.Error as e:
+                    logger.warning(f"读取磁盘缓存失败: {e}")
+            if value is not None:
+                self.memory.set(key, value)  # 回填内存层
+                self.hits += 1
+                self.disk_hits += 1
+                return value
+
+        if value is not None:
+            self.hits += 1
+            self.memory_hits += 1
+        else:
+            self.misses += 1
+        return value
+
+    async def set_async(self, key: str, value: str) -> None:
+        """set 的事件循环版本：立即写内存层，磁盘层交给后台任务批量写入（不等待写完）"""
+        self.memory.set(key, value)
+        self.sets += 1
+        if self.disk is None:
+            return
+        self._pending[key] = value
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._write_pending())
+
+    async def _write_pending(self) -> None:
+        """把待写缓冲写入磁盘层；写入期间新到的条目在下一轮一起写"""
+        while self._pending:
+            batch = list(self._pending.items())
+            try:
+                await run_db(self.disk.set_many, batch)
+            except sqlite3.Error as e:
+                logger.warning(f"写入磁盘缓存失败: {e}")
+            for key, value in batch:
+                if self._pending.get(key) == value:
+                    del self._pending[key]
+
+    async def flush(self) -> None:
+        """等待待写缓冲全部写入磁盘层（关闭时调用）"""
+        if self._flush_task is not None:
+            await self._flush_task
+
+    def clear(self) -> None:
+        self.memory.clear()
+        self._pending.clear()
+        if self.disk is not None:
+            self.disk.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "sets": self.sets,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "memory_entries": len(self.memory),
+            "disk_enabled": self.disk is not None
+        }
+
+
+response_cache: Optional[ResponseCache] = None
+
+
+def get_response_cache() -> Optional[ResponseCache]:
+    """获取全局 LLM 回复缓存（LLM_CACHE_ENABLED=false 时返回 None）"""
+    global response_cache
+    if not settings.LLM_CACHE_ENABLED:
+        return None
+    if response_cache is None:
+        disk = None
+        if settings.LLM_CACHE_SQLITE_PATH:
+            try:
+                disk = SQLiteCache(settings.LLM_CACHE_SQLITE_PATH, ttl_seconds=settings.LLM_CACHE_DISK_TTL)
+            except sqlite3.Error as e:
+                logger.warning(f"初始化磁盘缓存失败，仅使用内存缓存: {e}")
+        response_cache = ResponseCache(
+            LRUCache(max_entries=settings.LLM_CACHE_MAX_ENTRIES, ttl_seconds=settings.LLM_CACHE_TTL),
+            disk
+        )
+        cache = response_cache
+        CACHE_HIT_RATIO.set_function(lambda: cache.get_stats()["hit_rate"], cache="llm_response")
+    return response_cache
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🎌 compression - 日语学习Multi-Agent系统
+
+大 JSON 列的透明压缩：
+- CompressedJSON：SQLAlchemy 列类型，写入时 JSON 序列化 + zlib 压缩为 BLOB，读取时自动还原
+- zlib 预置字典（用日语 / 中文的智能体回复与学习数据训练，见 scripts/build_compression_dict.py），
+  短文本也能压得下来；字典按编号存放，已写入的数据始终用写入时的字典解压
+- 兼容旧数据：列中原有的 JSON 文本照常读取
+
+存储格式：b"Z" + 字典编号(1 字节，0 表示无字典) + zlib 数据；压缩后不更小时存 b"J" + 原始 JSON
+"""
+
+import json
+import zlib
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Optional
+
+from sqlalchemy.types import LargeBinary, TypeDecorator
+
+DICT_DIR = Path(__file__).resolve().parent / "compression_dicts"
+
+# 字典编号 -> 文件名；已发布的编号不可修改或删除（旧数据解压需要）
+DICTIONARIES = {
+    1: "ja_zh_v1.dict",  # 旧版：用源码中的提示词 / 模板字符串训练
+    2: "ja_zh_v2.dict",  # 用对话回复样本训练（8KB），见 scripts/build_compression_dict.py
+}
+CURRENT_DICT_ID = 2
+
+COMPRESSED = b"Z"
+PLAIN = b"J"
+LEVEL = 6
+
+
+@lru_cache(maxsize=None)
+def load_dictionary(dict_id: int) -> bytes:
+    if dict_id == 0:
+        return b""
+    return (DICT_DIR / DICTIONARIES[dict_id]).read_bytes()
+
+
+def compress_bytes(data: bytes, dict_id: int = CURRENT_DICT_ID) -> bytes:
+    zdict = load_dictionary(dict_id)
+    compressor = zlib.compressobj(LEVEL, zdict=zdict) if zdict else zlib.compressobj(LEVEL)
+    compressed = compressor.compress(data) + compressor.flush()
+    if len(compressed) + 2 >= len(data) + 1:
+        return PLAIN + data
+    return COMPRESSED + bytes([dict_id]) + compressed
+
+
+def decompress_bytes(blob: bytes) -> bytes:
+    marker = blob[:1]
+    if marker == PLAIN:
+        return blob[1:]
+    if marker != COMPRESSED:
+        raise ValueError("未知的压缩数据格式")
+    zdict = load_dictionary(blob[1])
+    decompressor = zlib.decompressobj(zdict=zdict) if zdict else zlib.decompressobj()
+    return decompressor.decompress(blob[2:]) + decompressor.flush()
+
+
+def dumps_json(value: Any) -> bytes:
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def compress_json(value: Any, dict_id: int = CURRENT_DICT_ID) -> bytes:
+    return compress_bytes(dumps_json(value), dict_id)
+
+
+def decompress_json(stored: Any) -> Any:
+    """还原 compress_json 的结果；旧数据（JSON 文本）直接解析"""
+    if isinstance(stored, str):
+        return json.loads(stored)
+    return json.loads(decompress_bytes(bytes(stored)).decode("utf-8"))
+
+
+class CompressedJSON(TypeDecorator):
+    """压缩存储的 JSON 列（BLOB）"""
+
+    impl = LargeBinary
+    cache_ok = True
+
+    def process_bind_param(self, value: Any, dialect) -> Optional[bytes]:
+        if value is None:
+            return None
+        return compress_json(value)
+
+    def process_result_value(self, value: Any, dialect) -> Any:
+        if value is None:
+            return None
+        return decompress_json(value)
@@ -38,8 +38,53 @@ class Settings:
         self.ANTHROPIC_API_KEY = os.getenv("ANTHROPIC_API_KEY")
         self.PRIMARY_LLM = os.getenv("PRIMARY_LLM", "mock")  # mock, openai, anthropic
 
+        # 多智能体并发配置（秒）
+        self.AGENT_RESPONSE_TIMEOUT = float(os.getenv("AGENT_RESPONSE_TIMEOUT", "30"))  # 单个智能体超时（流式为输出间隔）
+        self.COLLABORATION_DEADLINE = float(os.getenv("COLLABORATION_DEADLINE", "45"))  # 整轮对话截止时间
+
+        # 会话状态存储配置
+        self.SESSION_MAX_TURNS = int(os.getenv("SESSION_MAX_TURNS", "20"))  # 每个会话每个智能体保留的轮数
+        self.SESSION_TTL_SECONDS = float(os.getenv("SESSION_TTL_SECONDS", "3600"))  # 会话空闲过期时间
+        self.SESSION_STORE_MAX_BYTES = int(os.getenv("SESSION_STORE_MAX_BYTES", str(32 * 1024 * 1024)))  # 内存上限
+
+        # LLM 回复缓存配置
+        self.LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+        self.LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "1024"))  # 内存 LRU 条数上限
+        self.LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", "3600"))  # 内存层过期时间（秒）
+        self.LLM_CACHE_SQLITE_PATH = os.getenv("LLM_CACHE_SQLITE_PATH", "")  # 为空时不启用磁盘层
+        self.LLM_CACHE_DISK_TTL = float(os.getenv("LLM_CACHE_DISK_TTL", "86400"))  # 磁盘层过期时间（秒）
+
+        # 数据库线程池（async 路由中的同步数据库调用都在这里执行）
+        self.DB_EXECUTOR_MAX_WORKERS = int(os.getenv("DB_EXECUTOR_MAX_WORKERS", "4"))
+
+        # 学习事件写后队列配置
+        self.LEARNING_QUEUE_MAX_SIZE = int(os.getenv("LEARNING_QUEUE_MAX_SIZE", "1000"))  # 队列容量
+        self.LEARNING_QUEUE_BATCH_SIZE = int(os.getenv("LEARNING_QUEUE_BATCH_SIZE", "50"))  # 每批写入事件数
+        self.LEARNING_QUEUE_FLUSH_INTERVAL = float(os.getenv("LEARNING_QUEUE_FLUSH_INTERVAL", "0.5"))  # 攒批等待（秒）
+        self.LEARNING_QUEUE_DROP_POLICY = os.getenv("LEARNING_QUEUE_DROP_POLICY", "drop_oldest")  # 或 drop_newest
+
+        # 学习进度摘要缓存（秒，0 表示不缓存；写入学习数据时按用户失效）
+        self.PROGRESS_SUMMARY_CACHE_TTL = float(os.getenv("PROGRESS_SUMMARY_CACHE_TTL", "5"))
+
+        # 学习统计校正间隔（秒，0 表示只按需校正）
+        self.STATS_RECONCILE_INTERVAL = float(os.getenv("STATS_RECONCILE_INTERVAL", "3600"))
+
+        # 请求追踪配置
+        self.TRACE_ENABLED = os.getenv("TRACE_ENABLED", "true").lower() == "true"
+        self.TRACE_BUFFER_SIZE = int(os.getenv("TRACE_BUFFER_SIZE", "200"))  # 内存中保留的最近 trace 条数
+        self.TRACE_EXPORT_DIR = os.getenv("TRACE_EXPORT_DIR", "")  # 非空时每条 trace 另存为 JSON 文件
+
         # 数据库配置
         self.DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./japanese_learning.db")
+        # 学习进度库（ProgressTracker 等 SQLAlchemy 模型所在的库）
+        self.PROGRESS_DATABASE_URL = os.getenv("PROGRESS_DATABASE_URL", "sqlite:///./database/japanese_learning.db")
+        # SQLite 连接参数（由 utils.db_engine 统一设置）
+        self.SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))  # 等锁时间
+        self.SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", "65536"))  # 每个连接的页缓存
+        self.SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))  # 内存映射读取大小
+        self.SQLITE_READ_POOL_SIZE = int(os.getenv("SQLITE_READ_POOL_SIZE", "4"))  # 只读连接数
+        self.SQLITE_WRITE_POOL_SIZE = int(os.getenv("SQLITE_WRITE_POOL_SIZE", "4"))  # 写连接数（写者由 busy_timeout 排队）
+        self.SQLITE_POOL_MAX_OVERFLOW = int(os.getenv("SQLITE_POOL_MAX_OVERFLOW", "8"))  # 连接池溢出上限
         self.REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
 
         # 安全配置
@@ -2,168 +2,186 @@
 # -*- coding: utf-8 -*-
 """
 🎌 数据库管理工具
+- 连接来自共享引擎的连接池（WAL 等设置见 utils.db_engine）
+- 连接、建表等阻塞操作都在数据库线程池中执行（见 utils.db_executor）
 """
 
-import sqlite3
 import logging
-from pathlib import Path
+from contextlib import contextmanager
 from typing import Optional
 
+from sqlalchemy.engine import Engine
+
+from utils.config import settings
+from utils.db_engine import get_engine
+from utils.db_executor import run_db
+
 logger = logging.getLogger(__name__)
 
 
 class DatabaseManager:
     """数据库管理器"""
 
-    def __init__(self, db_path: str = "japanese_learning.db"):
-        self.db_path = db_path
-        self.connection: Optional[sqlite3.Connection] = None
+    def __init__(self, db_url: Optional[str] = None):
+        self.db_url = db_url or settings.DATABASE_URL
+        self.engine: Engine = get_engine(self.db_url)
 
     async def connect(self):
         """连接数据库"""
+        await run_db(self._connect)
+
+    def _connect(self):
         try:
-            self.connection = sqlite3.connect(self.db_path)
-            self.connection.row_factory = sqlite3.Row  # 使结果可以通过列名访问
-            logger.info(f"✅ 数据库连接成功: {self.db_path}")
+            with self.engine.connect() as conn:
+                conn.exec_driver_sql("SELECT 1")
+            logger.info(f"✅ 数据库连接成功: {self.db_url}")
         except Exception as e:
             logger.error(f"❌ 数据库连接失败: {e}")
             raise
 
+    @contextmanager
+    def _cursor(self):
+        """从共享连接池借出一个连接，成功则提交，用完归还"""
+        connection = self.engine.raw_connection()
+        try:
+            yield connection.cursor()
+            connection.commit()
+        except Exception:
+            connection.rollback()
+            raise
+        finally:
+            connection.close()
+
     async def create_tables(self):
         """创建数据表"""
-        if not self.connection:
-            await self.connect()
-
-        cursor = self.connection.cursor()
-
-        # 用户表
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS users (
-                user_id TEXT PRIMARY KEY,
-                username TEXT UNIQUE NOT NULL,
-                email TEXT UNIQUE,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                learning_level TEXT DEFAULT 'beginner',
-                target_jlpt_level TEXT,
-                daily_goal INTEGER DEFAULT 30
-            )
-        ''')
-
-        # 学习会话表
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS learning_sessions (
-                session_id TEXT PRIMARY KEY,
-                user_id TEXT,
-                start_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                end_time TIMESTAMP,
-                scene TEXT DEFAULT 'grammar',
-                active_agents TEXT,
-                message_count INTEGER DEFAULT 0,
-                duration_minutes INTEGER DEFAULT 0,
-                FOREIGN KEY (user_id) REFERENCES users (user_id)
-            )
-        ''')
-
-        # 对话历史表
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS conversation_history (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                session_id TEXT,
-                user_input TEXT,
-                agent_responses TEXT,
-                timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                scene TEXT,
-                FOREIGN KEY (session_id) REFERENCES learning_sessions (session_id)
-            )
-        ''')
-
-        # 学习进度表
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS learning_progress (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id TEXT,
-                grammar_mastery REAL DEFAULT 0.0,
-                vocabulary_count INTEGER DEFAULT 0,
-                culture_understanding REAL DEFAULT 0.0,
-                total_study_time INTEGER DEFAULT 0,
-                last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (user_id) REFERENCES users (user_id)
-            )
-        ''')
-
-        # 自定义智能体表
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS custom_agents (
-                agent_id TEXT PRIMARY KEY,
-                created_by TEXT,
-                name TEXT NOT NULL,
-                role TEXT NOT NULL,
-                avatar TEXT DEFAULT '🤖',
-                personality_config TEXT,
-                expertise_areas TEXT,
-                is_public BOOLEAN DEFAULT FALSE,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (created_by) REFERENCES users (user_id)
-            )
-        ''')
-
-        # 自定义场景表
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS custom_scenes (
-                scene_id TEXT PRIMARY KEY,
-                created_by TEXT,
-                name TEXT NOT NULL,
-                description TEXT,
-                learning_objectives TEXT,
-                difficulty TEXT DEFAULT 'beginner',
-                recommended_agents TEXT,
-                is_public BOOLEAN DEFAULT FALSE,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (created_by) REFERENCES users (user_id)
-            )
-        ''')
-
-        # 成就记录表
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS user_achievements (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id TEXT,
-                achievement_id TEXT,
-                unlocked_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (user_id) REFERENCES users (user_id)
-            )
-        ''')
-
-        self.connection.commit()
+        await run_db(self._create_tables)
+
+    def _create_tables(self):
+        with self._cursor() as cursor:
+            # 用户表
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS users (
+                    user_id TEXT PRIMARY KEY,
+                    username TEXT UNIQUE NOT NULL,
+                    email TEXT UNIQUE,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    learning_level TEXT DEFAULT 'beginner',
+                    target_jlpt_level TEXT,
+                    daily_goal INTEGER DEFAULT 30
+                )
+            ''')
+
+            # 学习会话表
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS learning_sessions (
+                    session_id TEXT PRIMARY KEY,
+                    user_id TEXT,
+                    start_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    end_time TIMESTAMP,
+                    scene TEXT DEFAULT 'grammar',
+                    active_agents TEXT,
+                    message_count INTEGER DEFAULT 0,
+                    duration_minutes INTEGER DEFAULT 0,
+                    FOREIGN KEY (user_id) REFERENCES users (user_id)
+                )
+            ''')
+
+            # 对话历史表
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS conversation_history (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    session_id TEXT,
+                    user_input TEXT,
+                    agent_responses TEXT,
+                    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    scene TEXT,
+                    FOREIGN KEY (session_id) REFERENCES learning_sessions (session_id)
+                )
+            ''')
+
+            # 学习进度表
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS learning_progress (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    user_id TEXT,
+                    grammar_mastery REAL DEFAULT 0.0,
+                    vocabulary_count INTEGER DEFAULT 0,
+                    culture_understanding REAL DEFAULT 0.0,
+                    total_study_time INTEGER DEFAULT 0,
+                    last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    FOREIGN KEY (user_id) REFERENCES users (user_id)
+                )
+            ''')
+
+            # 自定义智能体表
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS custom_agents (
+                    agent_id TEXT PRIMARY KEY,
+                    created_by TEXT,
+                    name TEXT NOT NULL,
+                    role TEXT NOT NULL,
+                    avatar TEXT DEFAULT '🤖',
+                    personality_config TEXT,
+                    expertise_areas TEXT,
+                    is_public BOOLEAN DEFAULT FALSE,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    FOREIGN KEY (created_by) REFERENCES users (user_id)
+                )
+            ''')
+
+            # 自定义场景表
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS custom_scenes (
+                    scene_id TEXT PRIMARY KEY,
+                    created_by TEXT,
+                    name TEXT NOT NULL,
+                    description TEXT,
+                    learning_objectives TEXT,
+                    difficulty TEXT DEFAULT 'beginner',
+                    recommended_agents TEXT,
+                    is_public BOOLEAN DEFAULT FALSE,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    FOREIGN KEY (created_by) REFERENCES users (user_id)
+                )
+            ''')
+
+            # 成就记录表
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS user_achievements (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    user_id TEXT,
+                    achievement_id TEXT,
+                    unlocked_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    FOREIGN KEY (user_id) REFERENCES users (user_id)
+                )
+            ''')
+
         logger.info("✅ 数据表创建完成")
 
     async def insert_sample_data(self):
         """插入示例数据"""
-        if not self.connection:
-            await self.connect()
-
-        cursor = self.connection.cursor()
-
-        # 示例用户
-        cursor.execute('''
-            INSERT OR IGNORE INTO users (user_id, username, email, learning_level, target_jlpt_level)
-            VALUES ('demo_user', 'demo', 'demo@example.com', 'beginner', 'N5')
-        ''')
+        await run_db(self._insert_sample_data)
+
+    def _insert_sample_data(self):
+        with self._cursor() as cursor:
+            # 示例用户
+            cursor.execute('''
+                INSERT OR IGNORE INTO users (user_id, username, email, learning_level, target_jlpt_level)
+                VALUES ('demo_user', 'demo', 'demo@example.com', 'beginner', 'N5')
+            ''')
+
+            # 示例学习进度
+            cursor.execute('''
+                INSERT OR IGNORE INTO learning_progress (user_id, grammar_mastery, vocabulary_count, culture_understanding)
+                VALUES ('demo_user', 0.65, 1250, 0.40)
+            ''')
 
-        # 示例学习进度
-        cursor.execute('''
-            INSERT OR IGNORE INTO learning_progress (user_id, grammar_mastery, vocabulary_count, culture_understanding)
-            VALUES ('demo_user', 0.65, 1250, 0.40)
-        ''')
-
-        self.connection.commit()
         logger.info("✅ 示例数据插入完成")
 
     async def close(self):
-        """关闭数据库连接"""
-        if self.connection:
-            self.connection.close()
-            logger.info("🛑 数据库连接已关闭")
+        """关闭连接池中的数据库连接"""
+        await run_db(self.engine.dispose)
+        logger.info("🛑 数据库连接已关闭")
 
 
 # 全局数据库管理器实例
@@ -182,8 +200,6 @@ async def init_database():
         raise
 
 
-async def get_database():
-    """获取数据库连接"""
-    if not db_manager.connection:
-        await db_manager.connect()
-    return db_manager.connection
\ No newline at end of file
+async def get_database() -> Engine:
+    """获取数据库引擎（共享连接池）"""
+    return db_manager.engine
\ No newline at end of file
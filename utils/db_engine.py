@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🎌 db_engine - 日语学习Multi-Agent系统
+
+统一的数据库引擎工厂（所有数据模块共用）：
+- 同一个数据库 URL 在进程内只创建一次引擎，共享连接池
+- SQLite 新连接统一设置 journal_mode=WAL、synchronous=NORMAL、busy_timeout、cache_size、mmap_size、foreign_keys
+- 读写分离：写引擎是一个小连接池，写者之间由 SQLite 的 busy_timeout 在库文件锁上排队
+  （不靠把连接池压到 1 个连接来串行化，否则一个未关闭的会话就会卡死所有写者）；
+  读引擎多个连接且 query_only，WAL 下读写互不阻塞
+- 会先读后写的写事务用 begin_immediate() 开始，一开始就排队拿写锁，
+  多个线程各自的会话并发写入时不会出现 SQLITE_BUSY_SNAPSHOT
+- 内存库（sqlite://）每个连接都是独立的库，读写共用同一个单连接引擎
+- 非 SQLite URL 按普通连接池创建，读写共用
+"""
+
+import logging
+import threading
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from utils.config import settings
+
+logger = logging.getLogger(__name__)
+
+_engines: Dict[Tuple[str, bool], Engine] = {}
+_sessionmakers: Dict[Tuple[str, bool], sessionmaker] = {}
+_lock = threading.Lock()
+
+
+def is_memory_sqlite(url: str) -> bool:
+    parsed = make_url(url)
+    return parsed.get_backend_name() == "sqlite" and parsed.database in (None, "", ":memory:")
+
+
+def _apply_sqlite_pragmas(dbapi_connection, readonly: bool) -> None:
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute(f"PRAGMA busy_timeout={settings.SQLITE_BUSY_TIMEOUT_MS}")
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute(f"PRAGMA cache_size=-{settings.SQLITE_CACHE_SIZE_KB}")  # 负数单位为 KiB
+        cursor.execute(f"PRAGMA mmap_size={settings.SQLITE_MMAP_SIZE}")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.execute("PRAGMA foreign_keys=ON")
+        if readonly:
+            cursor.execute("PRAGMA query_only=ON")
+    finally:
+        cursor.close()
+
+
+def create_db_engine(url: str, readonly: bool = False) -> Engine:
+    """按 URL 与读写角色创建引擎（一般应通过 get_engine 获取共享实例）"""
+    backend = make_url(url).get_backend_name()
+    if backend != "sqlite":
+        return create_engine(url, pool_pre_ping=True, echo=False)
+
+    if is_memory_sqlite(url):
+        return create_engine(url, poolclass=StaticPool, connect_args={"check_same_thread": False})
+
+    engine = create_engine(
+        url,
+        pool_size=settings.SQLITE_READ_POOL_SIZE if readonly else settings.SQLITE_WRITE_POOL_SIZE,
+        max_overflow=settings.SQLITE_POOL_MAX_OVERFLOW,
+        # 连接会在数据库线程池的不同线程间使用
+        connect_args={"check_same_thread": False, "timeout": settings.SQLITE_BUSY_TIMEOUT_MS / 1000}
+    )
+
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        _apply_sqlite_pragmas(dbapi_connection, readonly)
+
+    return engine
+
+
+def _engine_key(url: Optional[str], readonly: bool) -> Tuple[str, bool]:
+    """只有文件型 SQLite 有单独的读连接池，其余情况读写共用一个引擎"""
+    url = url or settings.DATABASE_URL
+    if readonly and (make_url(url).get_backend_name() != "sqlite" or is_memory_sqlite(url)):
+        readonly = False
+    return url, readonly
+
+
+def get_engine(url: Optional[str] = None, readonly: bool = False) -> Engine:
+    """获取共享引擎；readonly=True 时返回只读引擎"""
+    key = _engine_key(url, readonly)
+    url, readonly = key
+    with _lock:
+        engine = _engines.get(key)
+        if engine is None:
+            engine = _engines[key] = create_db_engine(url, readonly)
+            logger.info(f"创建数据库引擎: {make_url(url).render_as_string(hide_password=True)} "
+                        f"({'read' if readonly else 'write'})")
+        return engine
+
+
+def get_sessionmaker(url: Optional[str] = None, readonly: bool = False) -> sessionmaker:
+    """获取绑定到共享引擎的会话工厂"""
+    engine = get_engine(url, readonly)
+    key = _engine_key(url, readonly)
+    with _lock:
+        factory = _sessionmakers.get(key)
+        if factory is None:
+            factory = _sessionmakers[key] = sessionmaker(bind=engine, autocommit=False, autoflush=False)
+        return factory
+
+
+def begin_immediate(session: Session) -> None:
+    """
+    SQLite 写事务显式以 BEGIN IMMEDIATE 开始：一开始就拿写锁（拿不到时按 busy_timeout 等待），
+    之后的读写都在这一个事务里，不会出现读后升级写锁时的 SQLITE_BUSY_SNAPSHOT；
+    pysqlite 默认不会在 SAVEPOINT 前开启事务，先开好事务 begin_nested() 的保存点才真正嵌套在其中。
+    会话已在事务中或不是 SQLite 时不做任何事。
+    """
+    connection = session.connection()
+    if connection.dialect.name != "sqlite":
+        return
+    if not connection.connection.dbapi_connection.in_transaction:
+        connection.exec_driver_sql("BEGIN IMMEDIATE")
+
+
+def dispose_engines() -> None:
+    """关闭所有共享引擎的连接（应用关闭时调用）"""
+    with _lock:
+        for engine in _engines.values():
+            engine.dispose()
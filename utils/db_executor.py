@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🎌 db_executor - 日语学习Multi-Agent系统
+
+数据库调用的专用线程池：
+- SQLAlchemy 会话 / sqlite3 都是阻塞的，async 路由中直接调用会卡住事件循环（以及其上的所有 WebSocket）
+- run_db(func, ...) 把一次同步数据库调用放到有界线程池中执行并 await 结果
+- 线程数由 DB_EXECUTOR_MAX_WORKERS 限制，不会与 asyncio 默认线程池（LLM / 文件等）争抢
+- 复制 contextvars，线程中的 span / 查询计数仍归属当前请求
+"""
+
+import asyncio
+import contextvars
+import functools
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional, TypeVar
+
+from utils.config import settings
+from utils.metrics import metrics_registry
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+DB_EXECUTOR_WAIT = metrics_registry.histogram(
+    "db_executor_wait_seconds", "数据库调用在线程池中的排队时间"
+)
+DB_EXECUTOR_IN_FLIGHT = metrics_registry.gauge(
+    "db_executor_in_flight", "已提交到数据库线程池、尚未完成的调用数"
+)
+
+
+class DatabaseExecutor:
+    """有界的数据库线程池"""
+
+    def __init__(self, max_workers: int = 4):
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="db")
+        self._in_flight = 0
+        self._lock = threading.Lock()
+        DB_EXECUTOR_IN_FLIGHT.set_function(lambda: self._in_flight)
+
+    async def run(self, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """在线程池中执行 func(*args, **kwargs)"""
+        loop = asyncio.get_running_loop()
+        context = contextvars.copy_context()
+        submitted = time.perf_counter()
+
+        def call() -> T:
+            DB_EXECUTOR_WAIT.observe(time.perf_counter() - submitted)
+            return context.run(func, *args, **kwargs)
+
+        self._add_in_flight(1)
+        try:
+            return await loop.run_in_executor(self._executor, call)
+        finally:
+            self._add_in_flight(-1)
+
+    def _add_in_flight(self, delta: int) -> None:
+        with self._lock:
+            self._in_flight += delta
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._executor.shutdown(wait=wait)
+
+
+db_executor: Optional[DatabaseExecutor] = None
+
+
+def get_db_executor() -> DatabaseExecutor:
+    """获取全局数据库线程池"""
+    global db_executor
+    if db_executor is None:
+        db_executor = DatabaseExecutor(settings.DB_EXECUTOR_MAX_WORKERS)
+    return db_executor
+
+
+def shutdown_db_executor() -> None:
+    """关闭全局数据库线程池（等待进行中的调用完成）"""
+    global db_executor
+    if db_executor is not None:
+        db_executor.shutdown()
+        db_executor = None
+
+
+async def run_db(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """在数据库线程池中执行一次同步数据库调用"""
+    return await get_db_executor().run(func, *args, **kwargs)
+
+
+def offload_db(func: Callable[..., T]) -> Callable[..., Any]:
+    """装饰器：把同步数据库函数 / 方法变成协程函数，调用时在数据库线程池中执行"""
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        return await run_db(func, *args, **kwargs)
+    return wrapper
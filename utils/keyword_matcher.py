@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🎌 keyword_matcher - 日语学习Multi-Agent系统
+
+关键词表匹配（智能体学习点 / 建议提取、进度追踪、意图识别共用）：
+- 按 类别 -> 关键词列表 的表在模块级构建一次，调用处不再各自维护关键词循环
+- 匹配就是逐个关键词 `in`：表都只有几个到二十几个关键词，CPython 的子串查找在 C 层完成、命中即停，
+  比一个编译好的正则交替式扫描整段文本更快（见 tests/performance/bench_keyword_matcher.py）
+- 多段文本（如用户消息 + 回复）以 \\x00 拼接后查找，关键词不会跨段匹配
+"""
+
+from typing import Dict, List, Optional, Sequence, Set
+
+SEPARATOR = "\x00"
+
+
+class KeywordMatcher:
+    """
+    关键词匹配器
+
+    tables: 类别 -> 关键词列表（类别与关键词的顺序即结果顺序）
+    lower: 为 True 时先把文本转为小写再匹配（关键词本身不变，与 `word in text.lower()` 一致）
+    """
+
+    def __init__(self, tables: Dict[str, Sequence[str]], lower: bool = False):
+        self.tables = {category: [p for p in patterns if p] for category, patterns in tables.items()}
+        self.lower = lower
+
+    def _join(self, texts: Sequence[str]) -> str:
+        text = (texts[0] or "") if len(texts) == 1 else SEPARATOR.join(filter(None, texts))
+        return text.lower() if self.lower else text
+
+    def scan(self, *texts: str) -> Set[str]:
+        """返回在任一文本中出现的关键词"""
+        text = self._join(texts)
+        return {p for patterns in self.tables.values() for p in patterns if p in text}
+
+    def match(self, *texts: str) -> Dict[str, List[str]]:
+        """类别 -> 命中的关键词（按表中顺序），只包含有命中的类别"""
+        text = self._join(texts)
+        result = {}
+        for category, patterns in self.tables.items():
+            found = [p for p in patterns if p in text]
+            if found:
+                result[category] = found
+        return result
+
+    def categories(self, *texts: str) -> List[str]:
+        """有命中的类别（按表中顺序），用于“类别即输出”的表（如建议文案 -> 触发词）"""
+        text = self._join(texts)
+        return [category for category, patterns in self.tables.items() if any(p in text for p in patterns)]
+
+    def first_category(self, *texts: str, default: Optional[str] = None) -> Optional[str]:
+        """第一个有命中的类别（用于 if / elif 式的分类）"""
+        text = self._join(texts)
+        for category, patterns in self.tables.items():
+            if any(p in text for p in patterns):
+                return category
+        return default
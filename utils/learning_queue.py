@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🎌 learning_queue - 日语学习Multi-Agent系统
+
+学习事件的写后（write-behind）队列：
+- 聊天接口只把学习事件放入进程内有界队列（不等待任何数据库 I/O）
+- 后台协程按批次取出事件，在数据库线程池中用 ProgressTracker.track_batch 一次事务写入；
+  每条事件有自己的保存点，单条出错只丢弃这一条并计入 failed，不影响同批其他事件
+- 背压：put() 在队列满时等待腾出空间；仍满（或 submit() 不等待）时按 LEARNING_QUEUE_DROP_POLICY
+  丢弃最旧 / 最新事件，并计入指标
+- 关闭时把队列中剩余的事件写完再退出
+"""
+
+import asyncio
+import logging
+import sys
+import time
+from collections import deque
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+from utils.config import settings
+from utils.db_executor import run_db
+from utils.metrics import metrics_registry
+
+logger = logging.getLogger(__name__)
+
+# 进度追踪器按 data.* 导入（与 main.py 一致）
+_SRC_DIR = str(Path(__file__).resolve().parent.parent / 'src')
+
+LEARNING_EVENTS = metrics_registry.counter(
+    "learning_events_total", "学习事件处理结果（enqueued / written / dropped / failed）", ("outcome",)
+)
+LEARNING_QUEUE_DEPTH = metrics_registry.gauge(
+    "learning_queue_depth", "等待写入的学习事件数"
+)
+LEARNING_QUEUE_WRITE_DURATION = metrics_registry.histogram(
+    "learning_queue_write_duration_seconds", "单批学习事件写入耗时"
+)
+
+DROP_OLDEST = "drop_oldest"
+DROP_NEWEST = "drop_newest"
+
+
+@dataclass
+class LearningEvent:
+    """一轮对话的学习事件"""
+    user_input: str
+    agent_responses: Dict[str, Any]
+    session_id: str
+    scene_context: str = "general"
+    enqueued_at: float = field(default_factory=time.monotonic)
+
+
+def write_with_progress_tracker(events: List[LearningEvent]) -> int:
+    """默认写入方式：一批事件在同一事务中交给 ProgressTracker，返回写入失败（被跳过）的事件数"""
+    if _SRC_DIR not in sys.path:
+        sys.path.append(_SRC_DIR)
+    from data.repositories.progress_tracker import ProgressTracker
+
+    with ProgressTracker() as tracker:
+        results = tracker.track_batch([asdict(event) for event in events])
+    return sum(1 for result in results if result is None)
+
+
+class LearningEventQueue:
+    """有界学习事件队列 + 批量写入的后台协程"""
+
+    def __init__(
+        self,
+        writer: Callable[[List[LearningEvent]], Optional[int]] = write_with_progress_tracker,
+        max_size: int = 1000,
+        batch_size: int = 50,
+        flush_interval: float = 0.5,
+        drop_policy: str = DROP_OLDEST
+    ):
+        if drop_policy not in (DROP_OLDEST, DROP_NEWEST):
+            raise ValueError(f"不支持的丢弃策略: {drop_policy}")
+        self.writer = writer
+        self.max_size = max_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.drop_policy = drop_policy
+        self._events: Deque[LearningEvent] = deque()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._space_freed: Optional[asyncio.Event] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._stopping = False
+        self.stats = {"enqueued": 0, "written": 0, "dropped": 0, "failed": 0, "batches": 0}
+        LEARNING_QUEUE_DEPTH.set_function(lambda: len(self._events))
+
+    def submit(self, event: LearningEvent) -> bool:
+        """
+        放入一个事件（不阻塞）；队列满时按丢弃策略处理
+        返回该事件是否被接收（drop_newest 且队列已满时为 False）
+        """
+        if self._stopping:
+            self._count("dropped")
+            return False
+
+        accepted = True
+        if len(self._events) >= self.max_size:
+            if self.drop_policy == DROP_NEWEST:
+                accepted = False
+            else:
+                self._events.popleft()
+            self._count("dropped")
+            logger.warning(f"学习事件队列已满（{self.max_size}），按 {self.drop_policy} 丢弃一条事件")
+
+        if accepted:
+            self._events.append(event)
+            self._count("enqueued")
+        self._ensure_worker()
+        return accepted
+
+    async def put(self, event: LearningEvent, timeout: float = 1.0) -> bool:
+        """带背压的放入：队列满时最多等待 timeout 秒腾出空间，仍满则按丢弃策略处理"""
+        self._ensure_worker()
+        deadline = time.monotonic() + timeout
+        while len(self._events) >= self.max_size and not self._stopping and self._space_freed is not None:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            self._space_freed.clear()
+            try:
+                await asyncio.wait_for(self._space_freed.wait(), remaining)
+            except asyncio.TimeoutError:
+                break
+        return self.submit(event)
+
+    def _ensure_worker(self) -> None:
+        """在当前事件循环中按需启动后台写入协程"""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return  # 没有运行中的事件循环（如同步脚本），等 start() 或下一次 submit
+        if self._worker is not None and not self._worker.done() and self._worker.get_loop() is loop:
+            self._wake()
+            return
+        self._wakeup = asyncio.Event()
+        self._space_freed = asyncio.Event()
+        self._worker = loop.create_task(self._run())
+        self._wake()
+
+    def _wake(self) -> None:
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def start(self) -> None:
+        self._stopping = False
+        self._ensure_worker()
+
+    async def _run(self) -> None:
+        while True:
+            if not self._events:
+                if self._stopping:
+                    return
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            # 攒一小段时间凑满一批，减少事务次数
+            if len(self._events) < self.batch_size and not self._stopping:
+                await asyncio.sleep(self.flush_interval)
+
+            batch = [self._events.popleft() for _ in range(min(self.batch_size, len(self._events)))]
+            self._space_freed.set()
+            await self._write(batch)
+
+    async def _write(self, batch: List[LearningEvent]) -> None:
+        started = time.perf_counter()
+        try:
+            # writer 可返回被单独跳过的事件数，其余事件已写入
+            failed = await run_db(self.writer, batch) or 0
+            self._count("written", len(batch) - failed)
+            if failed:
+                self._count("failed", failed)
+        except Exception as e:
+            self._count("failed", len(batch))
+            logger.error(f"写入 {len(batch)} 条学习事件失败: {e}")
+        finally:
+            self.stats["batches"] += 1
+            LEARNING_QUEUE_WRITE_DURATION.observe(time.perf_counter() - started)
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        """停止接收新事件，把剩余事件写完（最多等待 timeout 秒）"""
+        self._stopping = True
+        self._ensure_worker()  # 从未启动过写入协程时在此启动，把剩余事件写完
+        if self._worker is None:
+            return
+        try:
+            await asyncio.wait_for(asyncio.shield(self._worker), timeout)
+        except asyncio.TimeoutError:
+            logger.error(f"关闭时仍有 {len(self._events)} 条学习事件未写入")
+            self._worker.cancel()
+
+    def _count(self, outcome: str, amount: int = 1) -> None:
+        self.stats[outcome] += amount
+        LEARNING_EVENTS.inc(amount, outcome=outcome)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "depth": len(self._events),
+            "max_size": self.max_size,
+            "drop_policy": self.drop_policy
+        }
+
+
+learning_queue: Optional[LearningEventQueue] = None
+
+
+def get_learning_queue() -> LearningEventQueue:
+    """获取全局学习事件队列"""
+    global learning_queue
+    if learning_queue is None:
+        learning_queue = LearningEventQueue(
+            max_size=settings.LEARNING_QUEUE_MAX_SIZE,
+            batch_size=settings.LEARNING_QUEUE_BATCH_SIZE,
+            flush_interval=settings.LEARNING_QUEUE_FLUSH_INTERVAL,
+            drop_policy=settings.LEARNING_QUEUE_DROP_POLICY
+        )
+    return learning_queue
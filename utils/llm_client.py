@@ -5,13 +5,25 @@ LLM客户端工具
 
 import os
 import json
+import time
+import asyncio
 import httpx
 import logging
-from typing import Dict, List, Optional, Any
-from dataclasses import dataclass
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, List, Optional, Any, Tuple
+from dataclasses import dataclass, asdict
+
+from utils.cache import get_response_cache, make_cache_key
+from utils.metrics import LLM_COALESCED, LLM_ERRORS, LLM_REQUEST_DURATION, LLM_TOKENS
+from utils.tracing import record_span, span
+from utils.rate_limiter import estimate_tokens, get_provider_limiter
+from utils.provider_pool import PoolConfig, ProviderHealth, ProviderPool
 
 logger = logging.getLogger(__name__)
 
+# 流式响应结束标记（对应 SSE 中的 "data: [DONE]"）
+_STREAM_DONE = object()
+
 
 @dataclass
 class LLMConfig:
@@ -22,26 +34,162 @@ class LLMConfig:
     provider: str
 
 
+@dataclass
+class TransportConfig:
+    """HTTP 连接池 / 超时配置（全部可通过环境变量调整）"""
+    max_connections: int = 200          # 连接池总连接数上限
+    max_keepalive_connections: int = 50  # 保持空闲复用的连接数
+    keepalive_expiry: float = 30.0      # 空闲连接保留时长（秒）
+    connect_timeout: float = 10.0
+    read_timeout: float = 60.0          # 非流式整段回复 / 流式两段增量之间的最长等待
+    write_timeout: float = 10.0
+    pool_timeout: float = 10.0          # 等待空闲连接的最长时间，超时记为连接池饱和
+    http2: bool = False                 # 需要安装 h2（pip install httpx[http2]）
+
+    @classmethod
+    def from_env(cls) -> "TransportConfig":
+        return cls(
+            max_connections=int(os.getenv("LLM_MAX_CONNECTIONS", cls.max_connections)),
+            max_keepalive_connections=int(os.getenv("LLM_MAX_KEEPALIVE_CONNECTIONS", cls.max_keepalive_connections)),
+            keepalive_expiry=float(os.getenv("LLM_KEEPALIVE_EXPIRY", cls.keepalive_expiry)),
+            connect_timeout=float(os.getenv("LLM_CONNECT_TIMEOUT", cls.connect_timeout)),
+            read_timeout=float(os.getenv("LLM_READ_TIMEOUT", cls.read_timeout)),
+            write_timeout=float(os.getenv("LLM_WRITE_TIMEOUT", cls.write_timeout)),
+            pool_timeout=float(os.getenv("LLM_POOL_TIMEOUT", cls.pool_timeout)),
+            http2=os.getenv("LLM_HTTP2", "false").lower() == "true"
+        )
+
+
+@dataclass
+class PoolStats:
+    """连接池使用统计"""
+    max_connections: int
+    in_flight: int = 0          # 当前进行中的请求
+    peak_in_flight: int = 0     # 进行中请求数峰值
+    requests_total: int = 0
+    pool_timeouts: int = 0      # 等待空闲连接超时次数（连接池饱和）
+    errors_total: int = 0
+    total_latency: float = 0.0  # 已完成请求累计耗时（秒）
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
 class LLMClient:
     """LLM客户端，支持多个提供商"""
 
-    def __init__(self):
+    def __init__(self, transport_config: Optional[TransportConfig] = None,
+                 pool_config: Optional[PoolConfig] = None):
         self.provider = os.getenv("LLM_PROVIDER", "deepseek").lower()
         self.config = self._load_config()
-        self.client = httpx.AsyncClient(timeout=60.0)
+        # 提供商池：主提供商 + LLM_PROVIDERS 中的备用提供商（故障转移 / 对冲）
+        self.providers = ProviderPool(
+            [ProviderHealth(name, self._load_config(name)) for name in self._provider_names()],
+            pool_config
+        )
+        self.transport_config = transport_config or TransportConfig.from_env()
+        # 实际使用的协议（未安装 h2 时回退到 HTTP/1.1，与 LLM_HTTP2 配置可能不同）
+        self.http2 = self._resolve_http2(self.transport_config)
+        self.client = self._create_http_client(self.transport_config, self.http2)
+        self.pool_stats = PoolStats(max_connections=self.transport_config.max_connections)
+        self.cache = get_response_cache()
+        # 同一提供商共享的限流器（请求 / token 预算 + 自适应并发窗口 + 优先级）
+        self.limiters = {p.name: get_provider_limiter(p.name) for p in self.providers.providers}
+        # single-flight：请求键 -> 进行中的上游调用，相同请求并发到达时共享同一次调用
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self.coalesced_requests = 0
 
         logger.info(f"初始化LLM客户端，提供商: {self.provider}")
 
-    def _load_config(self) -> LLMConfig:
+    @staticmethod
+    def _resolve_http2(config: TransportConfig) -> bool:
+        """按配置与 h2 是否安装决定实际是否启用 HTTP/2"""
+        if config.http2 and not _http2_available():
+            logger.warning("LLM_HTTP2=true 但未安装 h2，回退到 HTTP/1.1（pip install httpx[http2]）")
+            return False
+        return config.http2
+
+    @staticmethod
+    def _create_http_client(config: TransportConfig, http2: bool) -> httpx.AsyncClient:
+        """创建带连接池的 HTTP 客户端（所有智能体共享，连接复用）"""
+        return httpx.AsyncClient(
+            http2=http2,
+            limits=httpx.Limits(
+                max_connections=config.max_connections,
+                max_keepalive_connections=config.max_keepalive_connections,
+                keepalive_expiry=config.keepalive_expiry
+            ),
+            timeout=httpx.Timeout(
+                connect=config.connect_timeout,
+                read=config.read_timeout,
+                write=config.write_timeout,
+                pool=config.pool_timeout
+            )
+        )
+
+    @asynccontextmanager
+    async def _track_request(self):
+        """统计进行中请求数 / 峰值 / 连接池等待超时"""
+        stats = self.pool_stats
+        stats.in_flight += 1
+        stats.requests_total += 1
+        stats.peak_in_flight = max(stats.peak_in_flight, stats.in_flight)
+        started = time.perf_counter()
+        try:
+            yield
+        except httpx.PoolTimeout:
+            stats.pool_timeouts += 1
+            stats.errors_total += 1
+            logger.warning(f"LLM连接池已饱和（{stats.in_flight}/{stats.max_connections} 进行中）")
+            raise
+        except Exception:
+            stats.errors_total += 1
+            raise
+        finally:
+            stats.in_flight -= 1
+            stats.total_latency += time.perf_counter() - started
+
+    def get_pool_stats(self) -> Dict[str, Any]:
+        """获取连接池统计（saturation = 进行中请求 / 最大连接数）"""
+        stats = asdict(self.pool_stats)
+        stats["saturation"] = round(self.pool_stats.in_flight / max(self.pool_stats.max_connections, 1), 4)
+        stats["http2"] = self.http2
+        return stats
+
+    @property
+    def limiter(self):
+        """主提供商的限流器"""
+        return self.limiters[self.provider]
+
+    @limiter.setter
+    def limiter(self, value):
+        self.limiters[self.provider] = value
+
+    def _provider_names(self) -> List[str]:
+        """LLM_PROVIDERS（逗号分隔，按优先级）中的提供商，主提供商始终排第一"""
+        names = [self.provider]
+        for name in os.getenv("LLM_PROVIDERS", "").split(","):
+            name = name.strip().lower()
+            if name and name not in names:
+                names.append(name)
+        return names
+
+    def _load_config(self, provider: Optional[str] = None) -> LLMConfig:
         """加载配置"""
-        if self.provider == "deepseek":
+        provider = provider or self.provider
+        if provider == "deepseek":
             return LLMConfig(
                 api_key=os.getenv("DEEPSEEK_API_KEY"),
                 api_base=os.getenv("DEEPSEEK_API_BASE", "https://api.deepseek.com/v1"),
                 model=os.getenv("DEEPSEEK_MODEL", "deepseek-chat"),
                 provider="deepseek"
             )
-        elif self.provider == "ark":
+        elif provider == "ark":
             return LLMConfig(
                 api_key=os.getenv("ARK_API_KEY"),
                 api_base=os.getenv("ARK_API_BASE", "https://ark.cn-beijing.volces.com/api/v3"),
@@ -49,80 +197,396 @@ class LLMClient:
                 provider="ark"
             )
         else:
-            raise ValueError(f"不支持的LLM提供商: {self.provider}")
+            raise ValueError(f"不支持的LLM提供商: {provider}")
 
 
     async def chat(self, messages: List[Dict[str, str]], **kwargs) -> Optional[str]:
         """聊天方法，调用chat_completion的别名"""
         return await self.chat_completion(messages, **kwargs)
 
+    def _build_request(
+            self,
+            messages: List[Dict[str, str]],
+            temperature: float,
+            max_tokens: Optional[int],
+            system_prompt: Optional[str],
+            stream: bool = False,
+            config: Optional[LLMConfig] = None
+    ) -> Dict[str, Any]:
+        """构建 /chat/completions 请求（url、headers、json）"""
+        config = config or self.config
+
+        # 如果有系统提示词，添加到消息开头
+        if system_prompt:
+            messages = [{"role": "system", "content": system_prompt}] + messages
+
+        # 构建请求数据
+        request_data = {
+            "model": config.model,
+            "messages": messages,
+            "temperature": temperature,
+            "stream": stream
+        }
+
+        if max_tokens:
+            request_data["max_tokens"] = max_tokens
+
+        # 构建请求头
+        headers = {
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {config.api_key}"
+        }
+
+        return {
+            "url": f"{config.api_base}/chat/completions",
+            "headers": headers,
+            "json": request_data
+        }
+
     async def chat_completion(
             self,
             messages: List[Dict[str, str]],
             temperature: float = 0.7,
             max_tokens: Optional[int] = None,
-            system_prompt: Optional[str] = None
+            system_prompt: Optional[str] = None,
+            cache: bool = False,
+            agent: Optional[str] = None
     ) -> Optional[str]:
         """
         统一的聊天完成接口
+
+        cache=True 时先查回复缓存（相同 model / system_prompt / messages / temperature / max_tokens
+        直接返回上次结果），成功的回复写回缓存。缓存键包含实际返回回复的提供商：
+        故障转移后由备用提供商给出的回复记在备用提供商名下，查缓存时按当前首选的提供商查找。
+        无论是否缓存，并发到达的相同请求只发起一次上游调用，结果共享（single-flight）。
+        agent 为发起调用的智能体，仅用作指标标签；合并到他人调用的请求记为该 agent 的一次合并命中。
         """
-        try:
-            # 如果有系统提示词，添加到消息开头
-            if system_prompt:
-                messages = [{"role": "system", "content": system_prompt}] + messages
-
-            # 构建请求数据
-            request_data = {
-                "model": self.config.model,
-                "messages": messages,
-                "temperature": temperature,
-                "stream": False
-            }
-
-            if max_tokens:
-                request_data["max_tokens"] = max_tokens
-
-            # 构建请求头
-            headers = {
-                "Content-Type": "application/json",
-                "Authorization": f"Bearer {self.config.api_key}"
-            }
-
-            # 发送API请求
-            url = f"{self.config.api_base}/chat/completions"
-
-            logger.debug(f"发送请求到 {url}")
-
-            response = await self.client.post(
-                url=url,
-                headers=headers,
-                json=request_data
+        with span("llm.chat_completion", agent=agent or "unknown") as current:
+            request_key = self._request_key(messages, temperature, max_tokens, system_prompt)
+            use_cache = cache and self.cache is not None
+            if use_cache:
+                cached = await self.cache.get_async(
+                    self._cache_key(self.providers.ordered()[0], messages, temperature, max_tokens, system_prompt)
+                )
+                if cached is not None:
+                    logger.debug("LLM缓存命中")
+                    if current:
+                        current.set_attribute("cache_hit", True)
+                    return cached
+
+            task = self._inflight.get(request_key)
+            if task is None:
+                task = asyncio.ensure_future(
+                    self._send_completion(messages, temperature, max_tokens, system_prompt, agent)
+                )
+                self._inflight[request_key] = task
+                task.add_done_callback(lambda done: self._release_inflight(request_key, done))
+            else:
+                # 上游调用的耗时 / token 记在发起方的 agent 名下，等待方单独记一次合并命中
+                self.coalesced_requests += 1
+                LLM_COALESCED.inc(agent=agent or "unknown")
+                logger.debug("合并相同的进行中LLM请求")
+                if current:
+                    current.set_attribute("coalesced", True)
+
+            # shield：某个调用方被取消（如智能体超时）时不影响其它等待同一结果的调用方
+            content, provider = await asyncio.shield(task)
+            if use_cache and content:
+                await self.cache.set_async(
+                    self._cache_key(provider, messages, temperature, max_tokens, system_prompt), content
+                )
+            return content
+
+    def _release_inflight(self, request_key: str, task: asyncio.Task) -> None:
+        if self._inflight.get(request_key) is task:
+            del self._inflight[request_key]
+
+    async def _send_completion(
+            self,
+            messages: List[Dict[str, str]],
+            temperature: float,
+            max_tokens: Optional[int],
+            system_prompt: Optional[str],
+            agent: Optional[str] = None
+    ) -> Tuple[Optional[str], Optional[ProviderHealth]]:
+        """
+        按健康顺序向提供商池发起调用，返回 (回复, 给出回复的提供商)；全部失败时返回 (None, None)
+
+        - 故障转移：当前提供商失败后立即尝试下一个
+        - 对冲：启用 LLM_HEDGE 时，当前提供商超过其 p95 延迟仍未返回，
+          同时向下一个提供商再发一次，取先成功者并取消其余请求
+        """
+        remaining = self.providers.ordered()
+        pending: Dict[asyncio.Task, ProviderHealth] = {}
+
+        def launch():
+            provider = remaining.pop(0)
+            task = asyncio.ensure_future(
+                self._send_to_provider(provider, messages, temperature, max_tokens, system_prompt, agent)
             )
+            pending[task] = provider
+            return provider
+
+        first = latest = launch()
+        try:
+            while pending:
+                hedge_delay = self.providers.hedge_delay(latest) if remaining else None
+                done, _ = await asyncio.wait(pending, timeout=hedge_delay, return_when=asyncio.FIRST_COMPLETED)
+
+                for task in done:
+                    provider = pending.pop(task)
+                    content = task.result()
+                    if content is not None:
+                        if provider is not first and pending:
+                            provider.hedges_won += 1
+                        return content, provider
+
+                if remaining:
+                    if not done:
+                        logger.info(f"{latest.name} 超过 {hedge_delay:.2f}s 未返回，对冲请求 {remaining[0].name}")
+                    else:
+                        logger.warning(f"{latest.name} 调用失败，故障转移到 {remaining[0].name}")
+                    latest = launch()
+            return None, None
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def _send_to_provider(
+            self,
+            provider: ProviderHealth,
+            messages: List[Dict[str, str]],
+            temperature: float,
+            max_tokens: Optional[int],
+            system_prompt: Optional[str],
+            agent: Optional[str] = None
+    ) -> Optional[str]:
+        """向单个提供商发起一次 /chat/completions 调用，出错时返回 None"""
+        with span("llm.provider_call", provider=provider.name) as current:
+            content = await self._post_completion(provider, messages, temperature, max_tokens, system_prompt, agent)
+            if current:
+                current.set_attribute("ok", content is not None)
+            return content
+
+    async def _post_completion(
+            self,
+            provider: ProviderHealth,
+            messages: List[Dict[str, str]],
+            temperature: float,
+            max_tokens: Optional[int],
+            system_prompt: Optional[str],
+            agent: Optional[str]
+    ) -> Optional[str]:
+        """发送请求并记录指标 / 提供商健康状况"""
+        labels = {"provider": provider.name, "agent": agent or "unknown"}
+        started = time.perf_counter()
+        try:
+            request = self._build_request(messages, temperature, max_tokens, system_prompt, config=provider.config)
 
-            response.raise_for_status()
-            result = response.json()
+            logger.debug(f"发送请求到 {request['url']}")
+
+            # 发送API请求（先在限流器中排队拿名额，429 / 慢响应会缩小并发窗口）
+            estimated = estimate_tokens(messages, system_prompt, max_tokens)
+            async with self.limiters[provider.name].slot(estimated) as slot, self._track_request():
+                response = await self.client.post(**request)
+                slot.record(response.status_code, retry_after=self._retry_after(response))
+                response.raise_for_status()
+                result = response.json()
+                usage = result.get("usage") or {}
+                slot.used_tokens = usage.get("total_tokens")
 
             # 提取回复内容
             if "choices" in result and len(result["choices"]) > 0:
                 content = result["choices"][0]["message"]["content"]
-                logger.info(f"成功获取{self.provider}响应")
+                logger.info(f"成功获取{provider.name}响应")
+                latency = time.perf_counter() - started
+                self.providers.record_success(provider, latency)
+                LLM_REQUEST_DURATION.observe(latency, outcome="ok", **labels)
+                for kind in ("prompt_tokens", "completion_tokens"):
+                    if usage.get(kind):
+                        LLM_TOKENS.inc(usage[kind], kind=kind.split("_")[0], **labels)
                 return content
             else:
                 logger.error(f"API响应格式异常: {result}")
-                return None
+                reason = "invalid_response"
 
         except httpx.HTTPStatusError as e:
             logger.error(f"HTTP错误: {e.response.status_code} - {e.response.text}")
-            return None
+            reason = str(e.response.status_code)
         except httpx.RequestError as e:
             logger.error(f"请求错误: {str(e)}")
-            return None
+            reason = type(e).__name__
         except Exception as e:
             logger.error(f"意外错误: {str(e)}")
+            reason = "unexpected"
+
+        self.providers.record_failure(provider)
+        LLM_REQUEST_DURATION.observe(time.perf_counter() - started, outcome="error", **labels)
+        LLM_ERRORS.inc(reason=reason, **labels)
+        return None
+
+    async def chat_completion_stream(
+            self,
+            messages: List[Dict[str, str]],
+            temperature: float = 0.7,
+            max_tokens: Optional[int] = None,
+            system_prompt: Optional[str] = None,
+            cache: bool = False,
+            agent: Optional[str] = None
+    ) -> AsyncIterator[str]:
+        """
+        流式聊天完成接口（SSE），逐段产出增量文本
+
+        与 chat_completion 一致：出错时只记录日志并结束迭代，不向上抛异常。
+        调用方可根据是否收到任何增量来决定是否使用备用回复。
+        cache=True 时缓存命中直接一次性产出完整回复；完整结束的流式回复写回缓存。
+        """
+        use_cache = cache and self.cache is not None
+        if use_cache:
+            cached = await self.cache.get_async(
+                self._cache_key(self.providers.ordered()[0], messages, temperature, max_tokens, system_prompt)
+            )
+            if cached is not None:
+                logger.debug("LLM缓存命中（流式）")
+                yield cached
+                return
+
+        chunks: List[str] = []
+        # 故障转移：当前提供商在产出任何内容前失败，换下一个；已开始输出后不再切换
+        for provider in self.providers.ordered():
+            async for delta in self._stream_from_provider(
+                    provider, messages, temperature, max_tokens, system_prompt, agent
+            ):
+                chunks.append(delta)
+                yield delta
+            if chunks:
+                break
+            logger.warning(f"{provider.name} 流式调用失败，尝试下一个提供商")
+
+        if use_cache and chunks:
+            await self.cache.set_async(
+                self._cache_key(provider, messages, temperature, max_tokens, system_prompt), "".join(chunks)
+            )
+
+    async def _stream_from_provider(
+            self,
+            provider: ProviderHealth,
+            messages: List[Dict[str, str]],
+            temperature: float,
+            max_tokens: Optional[int],
+            system_prompt: Optional[str],
+            agent: Optional[str] = None
+    ) -> AsyncIterator[str]:
+        """向单个提供商发起流式调用，出错时只记录日志并结束迭代"""
+        request = self._build_request(
+            messages, temperature, max_tokens, system_prompt, stream=True, config=provider.config
+        )
+
+        logger.debug(f"发送流式请求到 {request['url']}")
+
+        labels = {"provider": provider.name, "agent": agent or "unknown"}
+        started = time.perf_counter()
+        reason = None
+        try:
+            estimated = estimate_tokens(messages, system_prompt, max_tokens)
+            async with self.limiters[provider.name].slot(estimated) as slot, self._track_request(), \
+                    self.client.stream("POST", **request) as response:
+                slot.record(response.status_code, retry_after=self._retry_after(response))
+                if response.status_code >= 400:
+                    body = await response.aread()
+                    logger.error(f"HTTP错误: {response.status_code} - {body.decode('utf-8', 'replace')}")
+                    self.pool_stats.errors_total += 1
+                    self.providers.record_failure(provider)
+                    reason = str(response.status_code)
+                    return
+
+                # 健康评分按首包延迟计
+                self.providers.record_success(provider, time.perf_counter() - started)
+                async for line in response.aiter_lines():
+                    delta = self._parse_stream_line(line)
+                    if delta is None:
+                        continue
+                    if delta is _STREAM_DONE:
+                        break
+                    yield delta
+
+            logger.info(f"成功获取{provider.name}流式响应")
+
+        except httpx.RequestError as e:
+            logger.error(f"流式请求错误: {str(e)}")
+            self.providers.record_failure(provider)
+            reason = type(e).__name__
+        except Exception as e:
+            logger.error(f"流式响应意外错误: {str(e)}")
+            self.providers.record_failure(provider)
+            reason = "unexpected"
+        finally:
+            LLM_REQUEST_DURATION.observe(
+                time.perf_counter() - started, outcome="error" if reason else "ok", **labels
+            )
+            record_span("llm.provider_stream", started, error=reason, **labels)
+            if reason:
+                LLM_ERRORS.inc(reason=reason, **labels)
+
+    def _request_key(
+            self,
+            messages: List[Dict[str, str]],
+            temperature: float,
+            max_tokens: Optional[int],
+            system_prompt: Optional[str]
+    ) -> str:
+        """请求内容键（不含提供商）：用于 single-flight 合并，同一请求无论最终由哪个提供商回复都只调用一次"""
+        return make_cache_key(None, system_prompt, messages, temperature, max_tokens)
+
+    @staticmethod
+    def _cache_key(
+            provider: ProviderHealth,
+            messages: List[Dict[str, str]],
+            temperature: float,
+            max_tokens: Optional[int],
+            system_prompt: Optional[str]
+    ) -> str:
+        """回复缓存键：包含提供商与模型，不同提供商的回复分开缓存"""
+        return make_cache_key(
+            f"{provider.name}/{provider.config.model}", system_prompt, messages, temperature, max_tokens
+        )
+
+    @staticmethod
+    def _retry_after(response: httpx.Response) -> Optional[float]:
+        """解析 429 响应的 Retry-After（秒）"""
+        if response.status_code != 429:
+            return None
+        try:
+            return float(response.headers.get("retry-after", ""))
+        except ValueError:
             return None
 
+    @staticmethod
+    def _parse_stream_line(line: str):
+        """解析一行 SSE 数据，返回增量文本 / _STREAM_DONE / None（忽略）"""
+        line = line.strip()
+        if not line.startswith("data:"):
+            return None
+
+        payload = line[len("data:"):].strip()
+        if payload == "[DONE]":
+            return _STREAM_DONE
+
+        try:
+            chunk = json.loads(payload)
+        except json.JSONDecodeError:
+            logger.warning(f"无法解析的流式数据: {payload[:100]}")
+            return None
+
+        choices = chunk.get("choices") or []
+        if not choices:
+            return None
+
+        delta = choices[0].get("delta") or {}
+        return delta.get("content") or None
+
     async def test_connection(self) -> bool:
-        """测试API连接"""
+        """测试API连接（存活探测，不走回复缓存，否则提供商宕机后仍会报告健康）"""
         try:
             test_messages = [{"role": "user", "content": "Hello"}]
             response = await self.chat_completion(test_messages)
@@ -137,11 +601,18 @@ class LLMClient:
             "provider": self.provider,
             "model": self.config.model,
             "api_base": self.config.api_base,
-            "has_api_key": bool(self.config.api_key)
+            "has_api_key": bool(self.config.api_key),
+            "pool": self.get_pool_stats(),
+            "cache": self.cache.get_stats() if self.cache else None,
+            "coalesced_requests": self.coalesced_requests,
+            "limiter": self.limiter.get_stats(),
+            "providers": self.providers.get_stats()
         }
 
     async def close(self):
-        """关闭客户端"""
+        """关闭客户端（先等回复缓存的磁盘写入完成）"""
+        if self.cache is not None:
+            await self.cache.flush()
         await self.client.aclose()
 
 
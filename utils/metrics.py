@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🎌 metrics - 日语学习Multi-Agent系统
+
+进程内指标注册表，按 Prometheus 文本格式（0.0.4）在 /metrics 暴露（不依赖 prometheus_client）：
+- Counter / Gauge / Histogram，支持标签
+- Gauge.set_function：抓取时再取值（连接数、缓存命中率等已有统计）
+- count_db_queries：统计一次仓储调用内执行的 SQL 条数
+"""
+
+import contextvars
+import functools
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# 默认延迟分桶（秒），覆盖本地路由到慢 LLM 调用
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+LabelValues = Tuple[str, ...]
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + "}"
+
+
+class _Metric:
+    """指标基类：名称、说明、标签名，以及按标签值存放的样本"""
+    type_name = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _label_values(self, labels: Dict[str, str]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"指标 {self.name} 需要标签 {self.labelnames}，实际为 {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self) -> Iterable[Tuple[str, Sequence[str], Sequence[str], float]]:
+        """产出 (样本名, 标签名, 标签值, 数值)"""
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        for sample_name, names, values, value in self.samples():
+            lines.append(f"{sample_name}{_format_labels(names, values)} {_format_value(value)}")
+        return lines
+
+
+class Counter(_Metric):
+    """只增计数器"""
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        if amount < 0:
+            raise ValueError("Counter 只能增加")
+        key = self._label_values(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def get(self, **labels: str) -> float:
+        return self._values.get(self._label_values(labels), 0.0)
+
+    def samples(self):
+        for key, value in sorted(self._values.items()):
+            yield self.name, self.labelnames, key, value
+
+
+class Gauge(_Metric):
+    """可增可减的瞬时值；set_function 注册后在抓取时取值"""
+    type_name = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+        self._functions: Dict[LabelValues, Callable[[], float]] = {}
+
+    def set(self, value: float, **labels: str) -> None:
+        key = self._label_values(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._label_values(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+    def set_function(self, function: Callable[[], float], **labels: str) -> None:
+        """注册取值函数：抓取时调用 function() 作为该标签组合的当前值"""
+        key = self._label_values(labels)
+        with self._lock:
+            self._functions[key] = function
+            self._values.pop(key, None)
+
+    def get(self, **labels: str) -> float:
+        return dict(self._collect()).get(self._label_values(labels), 0.0)
+
+    def _collect(self) -> List[Tuple[LabelValues, float]]:
+        values = dict(self._values)
+        for key, function in list(self._functions.items()):
+            values[key] = float(function())
+        return sorted(values.items())
+
+    def samples(self):
+        for key, value in self._collect():
+            yield self.name, self.labelnames, key, value
+
+
+class Histogram(_Metric):
+    """累积分桶直方图（_bucket / _sum / _count）"""
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        self._counts: Dict[LabelValues, List[int]] = {}
+        self._sums: Dict[LabelValues, float] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._label_values(labels)
+        with self._lock:
+            counts = self._counts.setdefault(key, [0] * len(self.buckets))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            self._sums[key] = self._sums.get(key, 0.0) + value
+
+    @contextmanager
+    def time(self, **labels: str):
+        """记录代码块耗时（秒），异常时同样记录"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def get_count(self, **labels: str) -> int:
+        return sum(self._counts.get(self._label_values(labels), ()))
+
+    def get_sum(self, **labels: str) -> float:
+        return self._sums.get(self._label_values(labels), 0.0)
+
+    def samples(self):
+        names = self.labelnames + ("le",)
+        for key in sorted(self._counts):
+            cumulative = 0
+            for bound, count in zip(self.buckets, self._counts[key]):
+                cumulative += count
+                yield f"{self.name}_bucket", names, key + (_format_value(bound),), cumulative
+            yield f"{self.name}_sum", self.labelnames, key, self._sums[key]
+            yield f"{self.name}_count", self.labelnames, key, cumulative
+
+
+class MetricsRegistry:
+    """指标注册表（同名指标重复注册时返回已有实例）"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, cls, name: str, documentation: str, labelnames: Sequence[str], **kwargs) -> _Metric:
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, documentation, labelnames, **kwargs)
+            elif not isinstance(metric, cls) or metric.labelnames != tuple(labelnames):
+                raise ValueError(f"指标 {name} 已以不同类型或标签注册")
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter, name, documentation, labelnames)
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def get(self, name: str) -> Optional[_Metric]:
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        """生成 Prometheus 文本格式"""
+        lines: List[str] = []
+        for name in sorted(self._metrics):
+            lines.extend(self._metrics[name].render())
+        return "\n".join(lines) + "\n"
+
+
+CONTENT_TYPE_LATEST = "text/plain; version=0.0.4; charset=utf-8"
+
+metrics_registry = MetricsRegistry()
+
+
+def get_metrics_registry() -> MetricsRegistry:
+    """获取全局指标注册表"""
+    return metrics_registry
+
+
+# ==================== 系统指标 ====================
+
+HTTP_REQUEST_DURATION = metrics_registry.histogram(
+    "http_request_duration_seconds", "HTTP 请求耗时（按路由模板）", ("method", "route", "status")
+)
+LLM_REQUEST_DURATION = metrics_registry.histogram(
+    "llm_request_duration_seconds", "上游 LLM 调用耗时（流式为整段输出耗时）", ("provider", "agent", "outcome")
+)
+LLM_TOKENS = metrics_registry.counter(
+    "llm_tokens_total", "上游返回的 token 用量", ("provider", "agent", "kind")
+)
+LLM_ERRORS = metrics_registry.counter(
+    "llm_errors_total", "上游 LLM 调用失败次数", ("provider", "agent", "reason")
+)
+LLM_COALESCED = metrics_registry.counter(
+    "llm_coalesced_requests_total", "合并到进行中相同调用的 LLM 请求数（按等待方智能体）", ("agent",)
+)
+ORCHESTRATOR_STAGE_DURATION = metrics_registry.histogram(
+    "orchestrator_stage_duration_seconds", "多智能体协作各阶段耗时", ("orchestrator", "stage")
+)
+WEBSOCKET_CONNECTIONS = metrics_registry.gauge(
+    "websocket_connections", "当前 WebSocket 连接数"
+)
+WEBSOCKET_SEND_QUEUE_DEPTH = metrics_registry.gauge(
+    "websocket_send_queue_depth", "等待写出的 WebSocket 消息数"
+)
+DB_QUERIES = metrics_registry.counter(
+    "db_queries_total", "仓储调用内执行的 SQL 条数", ("operation",)
+)
+DB_QUERIES_PER_CALL = metrics_registry.histogram(
+    "db_queries_per_call", "单次仓储调用执行的 SQL 条数", ("operation",), buckets=QUERY_COUNT_BUCKETS
+)
+CACHE_HIT_RATIO = metrics_registry.gauge(
+    "cache_hit_ratio", "缓存命中率", ("cache",)
+)
+
+
+# ==================== SQL 计数 ====================
+
+_query_counter: contextvars.ContextVar = contextvars.ContextVar("db_query_counter", default=None)
+_listener_installed = False
+
+
+def _install_query_listener() -> None:
+    """在所有 SQLAlchemy Engine 上统计执行的语句（只安装一次）"""
+    global _listener_installed
+    if _listener_installed:
+        return
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+
+    @event.listens_for(Engine, "before_cursor_execute")
+    def _count_query(conn, cursor, statement, parameters, context, executemany):
+        counter = _query_counter.get()
+        if counter is not None:
+            counter[0] += 1
+
+    _listener_installed = True
+
+
+def count_db_queries(operation: str):
+    """
+    装饰器：统计被装饰方法执行的 SQL 条数，记入 db_queries_total / db_queries_per_call
+    嵌套调用时内层条数同时计入外层。
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            _install_query_listener()
+            counter = [0]
+            token = _query_counter.set(counter)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                _query_counter.reset(token)
+                outer = _query_counter.get()
+                if outer is not None:
+                    outer[0] += counter[0]
+                DB_QUERIES.inc(counter[0], operation=operation)
+                DB_QUERIES_PER_CALL.observe(counter[0], operation=operation)
+        return wrapper
+    return decorator
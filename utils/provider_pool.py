@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🎌 LLM 提供商池 - 健康评分 / 故障转移 / 对冲请求
+
+- 按 LLM_PROVIDERS 配置的顺序排列提供商（第一个为主提供商）
+- 记录每个提供商最近的延迟与失败；连续失败达到阈值后暂时摘除（冷却期后自动恢复）
+- 对冲（hedging）：主提供商超过其 p95 延迟仍未返回时，向下一个提供商再发一次，取先返回者
+"""
+
+import logging
+import math
+import os
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Deque, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class PoolConfig:
+    """提供商池配置（全部可通过环境变量调整）"""
+    failure_threshold: int = 3      # 连续失败多少次后摘除
+    cooldown: float = 30.0          # 摘除后的冷却时间（秒）
+    hedge: bool = False             # 是否启用对冲请求
+    hedge_default_delay: float = 3.0  # 延迟样本不足时的对冲等待（秒）
+    hedge_min_delay: float = 0.2
+    hedge_min_samples: int = 20     # 计算 p95 所需的最少样本数
+
+    @classmethod
+    def from_env(cls) -> "PoolConfig":
+        return cls(
+            failure_threshold=int(os.getenv("LLM_FAILURE_THRESHOLD", cls.failure_threshold)),
+            cooldown=float(os.getenv("LLM_PROVIDER_COOLDOWN", cls.cooldown)),
+            hedge=os.getenv("LLM_HEDGE", "false").lower() == "true",
+            hedge_default_delay=float(os.getenv("LLM_HEDGE_DEFAULT_DELAY", cls.hedge_default_delay)),
+            hedge_min_delay=float(os.getenv("LLM_HEDGE_MIN_DELAY", cls.hedge_min_delay)),
+            hedge_min_samples=int(os.getenv("LLM_HEDGE_MIN_SAMPLES", cls.hedge_min_samples))
+        )
+
+
+class ProviderHealth:
+    """单个提供商的健康状态"""
+
+    def __init__(self, name: str, config: Any, window: int = 200):
+        self.name = name
+        self.config = config  # LLMConfig
+        self.latencies: Deque[float] = deque(maxlen=window)
+        self.successes = 0
+        self.failures = 0
+        self.hedges_won = 0
+        self.consecutive_failures = 0
+        self.ejected_until = 0.0
+
+    def record_success(self, latency: float) -> None:
+        self.successes += 1
+        self.consecutive_failures = 0
+        self.ejected_until = 0.0
+        self.latencies.append(latency)
+
+    def record_failure(self, failure_threshold: int, cooldown: float) -> None:
+        self.failures += 1
+        self.consecutive_failures += 1
+        if self.consecutive_failures >= failure_threshold:
+            self.ejected_until = time.monotonic() + cooldown
+            logger.warning(f"LLM提供商 {self.name} 连续失败 {self.consecutive_failures} 次，暂停 {cooldown}s")
+
+    def is_available(self) -> bool:
+        return time.monotonic() >= self.ejected_until
+
+    def percentile(self, q: float) -> Optional[float]:
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, math.ceil(q * len(ordered)) - 1)]
+
+    def get_stats(self) -> Dict[str, Any]:
+        total = self.successes + self.failures
+        return {
+            "provider": self.name,
+            "available": self.is_available(),
+            "successes": self.successes,
+            "failures": self.failures,
+            "error_rate": round(self.failures / total, 4) if total else 0.0,
+            "consecutive_failures": self.consecutive_failures,
+            "hedges_won": self.hedges_won,
+            "p50_latency": self.percentile(0.5),
+            "p95_latency": self.percentile(0.95)
+        }
+
+
+class ProviderPool:
+    """按健康状况排序的提供商列表"""
+
+    def __init__(self, providers: List[ProviderHealth], config: Optional[PoolConfig] = None):
+        if not providers:
+            raise ValueError("至少需要一个LLM提供商")
+        self.providers = providers
+        self.config = config or PoolConfig.from_env()
+
+    def ordered(self) -> List[ProviderHealth]:
+        """可用的提供商在前（保持配置顺序），被摘除的排在最后作为兜底；冷却期满后自动恢复"""
+        return sorted(self.providers, key=lambda p: not p.is_available())
+
+    def hedge_delay(self, provider: ProviderHealth) -> Optional[float]:
+        """对冲等待时间：该提供商最近延迟的 p95；未启用对冲时返回 None"""
+        if not self.config.hedge or len(self.providers) < 2:
+            return None
+        if len(provider.latencies) < self.config.hedge_min_samples:
+            return self.config.hedge_default_delay
+        return max(self.config.hedge_min_delay, provider.percentile(0.95))
+
+    def record_success(self, provider: ProviderHealth, latency: float) -> None:
+        provider.record_success(latency)
+
+    def record_failure(self, provider: ProviderHealth) -> None:
+        provider.record_failure(self.config.failure_threshold, self.config.cooldown)
+
+    def get_stats(self) -> List[Dict[str, Any]]:
+        return [p.get_stats() for p in self.providers]
@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🎌 上游 LLM 限流 - 令牌桶 + AIMD 自适应并发窗口 + 优先级
+
+每个提供商一组限流器（见 get_provider_limiter）：
+- 请求数令牌桶（RPM）与 token 数令牌桶（TPM），平滑突发流量
+- AIMD 并发窗口：成功时窗口缓慢加大（每个窗口 +1），
+  遇到 429 或响应过慢时窗口减半，避免在限额边缘反复触发 429
+- 优先级：窗口已满时按优先级唤醒等待者，交互式聊天优先于后台小说工作流
+"""
+
+import asyncio
+import contextvars
+import heapq
+import itertools
+import logging
+import os
+import time
+from contextlib import asynccontextmanager, contextmanager
+from dataclasses import dataclass
+from enum import IntEnum
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class Priority(IntEnum):
+    """请求优先级（数值越小越优先）"""
+    INTERACTIVE = 0  # 用户正在等待的聊天
+    BACKGROUND = 1   # 小说创作等后台工作流
+
+
+_current_priority: contextvars.ContextVar = contextvars.ContextVar("llm_priority", default=Priority.INTERACTIVE)
+
+
+@contextmanager
+def llm_priority(priority: Priority):
+    """在代码块内（及其中创建的 asyncio 任务内）发出的 LLM 请求使用指定优先级"""
+    token = _current_priority.set(priority)
+    try:
+        yield
+    finally:
+        _current_priority.reset(token)
+
+
+def current_priority() -> Priority:
+    return _current_priority.get()
+
+
+class TokenBucket:
+    """令牌桶：rate 每秒补充量，capacity 桶容量（允许的突发量）"""
+
+    def __init__(self, rate: float, capacity: float, clock: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.capacity = capacity
+        self._clock = clock
+        self._tokens = capacity
+        self._updated = clock()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, amount: float = 1.0) -> None:
+        """取走 amount 个令牌，不足时等待补充（超过容量的请求按容量计）"""
+        amount = min(amount, self.capacity)
+        async with self._lock:  # 先到先得，避免大请求被小请求饿死
+            self._refill()
+            while self._tokens < amount:
+                await asyncio.sleep((amount - self._tokens) / self.rate)
+                self._refill()
+            self._tokens -= amount
+
+    def adjust(self, amount: float) -> None:
+        """事后修正（如按实际 token 用量补扣 / 退还），允许暂时为负"""
+        self._refill()
+        self._tokens = min(self.capacity, self._tokens - amount)
+
+    @property
+    def available(self) -> float:
+        self._refill()
+        return self._tokens
+
+
+class AdaptiveConcurrencyLimiter:
+    """AIMD 自适应并发窗口（带优先级等待队列）"""
+
+    def __init__(
+        self,
+        initial_limit: int = 16,
+        min_limit: int = 1,
+        max_limit: int = 128,
+        backoff_factor: float = 0.5,
+        latency_threshold: float = 30.0
+    ):
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff_factor = backoff_factor
+        self.latency_threshold = latency_threshold
+        self.in_flight = 0
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._seq = itertools.count()
+        self._blocked_until = 0.0
+
+    async def acquire(self, priority: Priority = Priority.INTERACTIVE) -> None:
+        if not self._waiters and self._has_capacity():
+            self.in_flight += 1
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (int(priority), next(self._seq), future))
+        self._schedule_wakeup()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # 已被唤醒但调用方取消：把名额让给下一个等待者
+                self.in_flight -= 1
+                self._wake_waiters()
+            raise
+
+    def release(self, overloaded: bool = False, latency: Optional[float] = None,
+                retry_after: Optional[float] = None) -> None:
+        """释放名额并根据结果调整窗口（overloaded=429 等过载信号）"""
+        self.in_flight -= 1
+        if overloaded or (latency is not None and latency > self.latency_threshold):
+            self.limit = max(self.min_limit, self.limit * self.backoff_factor)
+            logger.warning(f"上游过载，并发窗口缩小到 {self.limit:.1f}")
+        else:
+            self.limit = min(self.max_limit, self.limit + 1.0 / max(self.limit, 1.0))
+
+        if retry_after:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + retry_after)
+        self._wake_waiters()
+
+    def _has_capacity(self) -> bool:
+        return self.in_flight < int(self.limit) and time.monotonic() >= self._blocked_until
+
+    def _wake_waiters(self) -> None:
+        while self._waiters and self._has_capacity():
+            _, _, future = heapq.heappop(self._waiters)
+            if future.done():  # 等待者已取消
+                continue
+            self.in_flight += 1
+            future.set_result(None)
+        self._schedule_wakeup()
+
+    def _schedule_wakeup(self) -> None:
+        """Retry-After 暂停期间有等待者时，到期后再尝试唤醒"""
+        delay = self._blocked_until - time.monotonic()
+        if self._waiters and delay > 0:
+            asyncio.get_running_loop().call_later(delay, self._wake_waiters)
+
+    @property
+    def waiting(self) -> int:
+        return sum(1 for _, _, future in self._waiters if not future.done())
+
+
+@dataclass
+class LimiterConfig:
+    """单个提供商的限流配置（全部可通过环境变量调整；rpm / tpm 为 0 表示不限制）"""
+    rpm: int = 600
+    tpm: int = 0
+    initial_concurrency: int = 16
+    min_concurrency: int = 2
+    max_concurrency: int = 128
+    latency_threshold: float = 30.0
+
+    @classmethod
+    def from_env(cls) -> "LimiterConfig":
+        return cls(
+            rpm=int(os.getenv("LLM_RPM", cls.rpm)),
+            tpm=int(os.getenv("LLM_TPM", cls.tpm)),
+            initial_concurrency=int(os.getenv("LLM_INITIAL_CONCURRENCY", cls.initial_concurrency)),
+            min_concurrency=int(os.getenv("LLM_MIN_CONCURRENCY", cls.min_concurrency)),
+            max_concurrency=int(os.getenv("LLM_MAX_CONCURRENCY", cls.max_concurrency)),
+            latency_threshold=float(os.getenv("LLM_LATENCY_THRESHOLD", cls.latency_threshold))
+        )
+
+
+class RequestSlot:
+    """一次上游调用占用的名额；调用方通过 record() 反馈结果"""
+
+    def __init__(self, estimated_tokens: int):
+        self.estimated_tokens = estimated_tokens
+        self.started_at = time.monotonic()
+        self.status_code: Optional[int] = None
+        self.latency: Optional[float] = None
+        self.retry_after: Optional[float] = None
+        self.used_tokens: Optional[int] = None  # 响应 usage.total_tokens，用于修正 token 预算
+
+    def record(self, status_code: int, retry_after: Optional[float] = None) -> None:
+        """记录上游响应状态（收到响应头时调用，latency 从拿到名额开始计）"""
+        self.status_code = status_code
+        self.latency = time.monotonic() - self.started_at
+        self.retry_after = retry_after
+
+
+class ProviderLimiter:
+    """单个提供商的请求预算 + token 预算 + 自适应并发窗口"""
+
+    def __init__(self, config: LimiterConfig):
+        self.config = config
+        self.requests = TokenBucket(config.rpm / 60.0, max(config.rpm / 60.0, 1.0) * 10) if config.rpm else None
+        self.tokens = TokenBucket(config.tpm / 60.0, config.tpm / 6.0) if config.tpm else None
+        self.concurrency = AdaptiveConcurrencyLimiter(
+            initial_limit=config.initial_concurrency,
+            min_limit=config.min_concurrency,
+            max_limit=config.max_concurrency,
+            latency_threshold=config.latency_threshold
+        )
+        self.throttled_total = 0  # 收到 429 的次数
+
+    @asynccontextmanager
+    async def slot(self, estimated_tokens: int = 0, priority: Optional[Priority] = None):
+        """占用一个上游调用名额（先按优先级排队拿并发名额，再扣请求 / token 预算）"""
+        await self.concurrency.acquire(priority if priority is not None else current_priority())
+        slot = RequestSlot(estimated_tokens)
+        try:
+            if self.requests:
+                await self.requests.acquire(1)
+            if self.tokens and estimated_tokens:
+                await self.tokens.acquire(estimated_tokens)
+            slot.started_at = time.monotonic()
+            yield slot
+        finally:
+            overloaded = slot.status_code == 429
+            if overloaded:
+                self.throttled_total += 1
+            if self.tokens and slot.used_tokens is not None:
+                self.tokens.adjust(slot.used_tokens - estimated_tokens)
+            self.concurrency.release(overloaded=overloaded, latency=slot.latency, retry_after=slot.retry_after)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "concurrency_limit": round(self.concurrency.limit, 2),
+            "in_flight": self.concurrency.in_flight,
+            "waiting": self.concurrency.waiting,
+            "throttled_total": self.throttled_total,
+            "request_budget": round(self.requests.available, 2) if self.requests else None,
+            "token_budget": round(self.tokens.available, 2) if self.tokens else None
+        }
+
+
+def estimate_tokens(messages: List[Dict[str, str]], system_prompt: Optional[str], max_tokens: Optional[int]) -> int:
+    """粗略估算一次调用的 token 数（中日文约 1 字 1 token，上限按 max_tokens 计）"""
+    prompt_chars = sum(len(m.get("content") or "") for m in messages) + len(system_prompt or "")
+    return prompt_chars + (max_tokens or 1000)
+
+
+_provider_limiters: Dict[str, ProviderLimiter] = {}
+
+
+def get_provider_limiter(provider: str, config: Optional[LimiterConfig] = None) -> ProviderLimiter:
+    """获取提供商的全局限流器（同一提供商的所有客户端共享预算）"""
+    limiter = _provider_limiters.get(provider)
+    if limiter is None:
+        limiter = _provider_limiters[provider] = ProviderLimiter(config or LimiterConfig.from_env())
+    return limiter
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🎌 会话状态存储 - 按 session 隔离的对话记忆
+
+智能体实例是全进程共享的（见 src/core/agents/agent_registry.py），
+对话记忆 / 上下文 / 用户画像不能挂在智能体实例上，否则并发用户的对话会互相串台。
+本模块按 session_id 保存这些状态：
+- 每个 (session, agent) 一个定长环形缓冲区（deque(maxlen)），只保留最近 N 轮
+- 按最后访问时间做 TTL 过期淘汰
+- 总内存超过上限时按 LRU 淘汰最久未访问的会话
+- 没有 session_id 的调用不读也不写任何记忆（不同调用方之间没有可共享的会话）
+"""
+
+import logging
+import sys
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+from utils.config import settings
+
+logger = logging.getLogger(__name__)
+
+def _turn_size(turn: Dict[str, Any]) -> int:
+    """估算一轮对话占用的字节数"""
+    return sys.getsizeof(turn.get("user", "")) + sys.getsizeof(turn.get("agent", ""))
+
+
+@dataclass
+class SessionState:
+    """单个会话的状态"""
+    turns: Dict[str, Deque[Dict[str, Any]]] = field(default_factory=dict)  # agent_id -> 最近 N 轮
+    user_profile: Dict[str, Any] = field(default_factory=dict)
+    last_access: float = 0.0
+    size: int = 0
+
+
+class SessionStore:
+    """会话状态存储（环形缓冲区 + TTL + 内存上限）"""
+
+    def __init__(
+        self,
+        max_turns: int = 10,
+        ttl_seconds: float = 3600.0,
+        max_bytes: int = 32 * 1024 * 1024,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.max_turns = max_turns
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self._clock = clock
+        # 按最后访问时间排序（最久未访问的在最前），TTL / LRU 淘汰都从头部开始
+        self._sessions: "OrderedDict[str, SessionState]" = OrderedDict()
+        self._total_bytes = 0
+
+    # -------- 对话记忆 --------
+    def append_turn(self, session_id: Optional[str], agent_id: str, user_input: str, agent_response: str,
+                    emotion: Optional[str] = None) -> None:
+        """记录一轮对话；超过 max_turns 时最旧的一轮自动出队；没有 session_id 时不记录"""
+        state = self._touch(session_id, create=True)
+        if state is None:
+            return
+        buffer = state.turns.get(agent_id)
+        if buffer is None:
+            buffer = state.turns[agent_id] = deque(maxlen=self.max_turns)
+
+        if len(buffer) == buffer.maxlen:
+            self._resize(state, -_turn_size(buffer[0]))
+
+        turn = {
+            "timestamp": time.time(),
+            "user": user_input,
+            "agent": agent_response,
+            "emotion": emotion
+        }
+        buffer.append(turn)
+        self._resize(state, _turn_size(turn))
+        self._evict()
+
+    def get_turns(self, session_id: Optional[str], agent_id: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """获取某个智能体在该会话中的最近几轮对话（旧 → 新）"""
+        state = self._touch(session_id)
+        if state is None or agent_id not in state.turns:
+            return []
+        turns = list(state.turns[agent_id])
+        return turns[-limit:] if limit else turns
+
+    def get_history_messages(self, session_id: Optional[str], agent_id: str, limit: int) -> List[Dict[str, str]]:
+        """以 LLM 消息格式返回最近几轮对话：[{role: user}, {role: assistant}, ...]"""
+        messages = []
+        for turn in self.get_turns(session_id, agent_id, limit):
+            messages.append({"role": "user", "content": turn["user"]})
+            messages.append({"role": "assistant", "content": turn["agent"]})
+        return messages
+
+    # -------- 用户画像 --------
+    def update_user_profile(self, session_id: Optional[str], observations: Dict[str, Any]) -> None:
+        state = self._touch(session_id, create=True)
+        if state is not None:
+            state.user_profile.update(observations)
+
+    def get_user_profile(self, session_id: Optional[str]) -> Dict[str, Any]:
+        state = self._touch(session_id)
+        return dict(state.user_profile) if state else {}
+
+    # -------- 管理 --------
+    def clear(self, session_id: Optional[str], agent_id: Optional[str] = None) -> None:
+        """清空会话（或会话中某个智能体）的对话记忆"""
+        state = self._sessions.get(session_id) if session_id else None
+        if state is None:
+            return
+        if agent_id is None:
+            self._drop(session_id)
+            return
+        buffer = state.turns.pop(agent_id, None)
+        if buffer:
+            self._resize(state, -sum(_turn_size(turn) for turn in buffer))
+
+    def count_turns(self, agent_id: str) -> int:
+        """某个智能体在所有活跃会话中的记忆条数"""
+        return sum(len(state.turns.get(agent_id, ())) for state in self._sessions.values())
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "sessions": len(self._sessions),
+            "total_bytes": self._total_bytes,
+            "max_bytes": self.max_bytes,
+            "max_turns": self.max_turns,
+            "ttl_seconds": self.ttl_seconds
+        }
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def __contains__(self, session_id: str) -> bool:
+        return session_id in self._sessions
+
+    # -------- 内部 --------
+    def _touch(self, session_id: Optional[str], create: bool = False) -> Optional[SessionState]:
+        """取出会话并刷新访问时间；顺带淘汰已过期的会话；没有 session_id 时返回 None"""
+        self._expire()
+        if not session_id:
+            return None
+        state = self._sessions.get(session_id)
+        if state is None:
+            if not create:
+                return None
+            state = self._sessions[session_id] = SessionState()
+        else:
+            self._sessions.move_to_end(session_id)
+        state.last_access = self._clock()
+        return state
+
+    def _resize(self, state: SessionState, delta: int) -> None:
+        state.size += delta
+        self._total_bytes += delta
+
+    def _drop(self, key: str) -> None:
+        state = self._sessions.pop(key)
+        self._total_bytes -= state.size
+
+    def _expire(self) -> None:
+        deadline = self._clock() - self.ttl_seconds
+        while self._sessions:
+            key, state = next(iter(self._sessions.items()))
+            if state.last_access > deadline:
+                break
+            self._drop(key)
+            logger.debug(f"会话 {key} 已过期")
+
+    def _evict(self) -> None:
+        # 至少保留当前（最新）会话
+        while self._total_bytes > self.max_bytes and len(self._sessions) > 1:
+            key = next(iter(self._sessions))
+            self._drop(key)
+            logger.info(f"会话存储超过内存上限，淘汰会话 {key}")
+
+
+session_store: Optional[SessionStore] = None
+
+
+def get_session_store() -> SessionStore:
+    """获取全局会话状态存储"""
+    global session_store
+    if session_store is None:
+        session_store = SessionStore(
+            max_turns=settings.SESSION_MAX_TURNS,
+            ttl_seconds=settings.SESSION_TTL_SECONDS,
+            max_bytes=settings.SESSION_STORE_MAX_BYTES
+        )
+    return session_store
@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🎌 tracing - 日语学习Multi-Agent系统
+
+轻量级请求追踪（进程内，不依赖 OpenTelemetry）：
+- start_trace：每个请求一条 trace，trace_id 经 contextvars 传递到其中创建的 asyncio 任务，
+  同时写入 session_context["trace_id"]，脱离调用链的代码可凭 trace_id 接回同一条 trace
+- span：嵌套的计时片段（名称、父子关系、耗时、属性、异常）
+- 最近的 trace 保存在内存环形缓冲中，可按 id 导出为 JSON；可选逐条写入 TRACE_EXPORT_DIR
+"""
+
+import contextvars
+import functools
+import inspect
+import json
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+from utils.config import settings
+from utils.metrics import ORCHESTRATOR_STAGE_DURATION
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Span:
+    """一个计时片段"""
+    name: str
+    span_id: str
+    parent_id: Optional[str]
+    start_offset_ms: float  # 相对 trace 开始的偏移
+    duration_ms: Optional[float] = None
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    error: Optional[str] = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+
+class Trace:
+    """一次请求的全部 span"""
+
+    def __init__(self, name: str, trace_id: Optional[str] = None):
+        self.trace_id = trace_id or uuid.uuid4().hex
+        self.name = name
+        self.started_at = datetime.now().isoformat()
+        self._started = time.perf_counter()
+        self.spans: List[Span] = []
+        self._lock = threading.Lock()
+
+    def new_span(self, name: str, parent_id: Optional[str], attributes: Dict[str, Any]) -> Span:
+        span = Span(
+            name=name,
+            span_id=uuid.uuid4().hex[:16],
+            parent_id=parent_id,
+            start_offset_ms=self.elapsed_ms(),
+            attributes=dict(attributes)
+        )
+        with self._lock:
+            self.spans.append(span)
+        return span
+
+    def elapsed_ms(self) -> float:
+        return round((time.perf_counter() - self._started) * 1000, 3)
+
+    @property
+    def duration_ms(self) -> Optional[float]:
+        return self.spans[0].duration_ms if self.spans else None
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "name": self.name,
+            "started_at": self.started_at,
+            "duration_ms": self.duration_ms,
+            "span_count": len(self.spans),
+            "error": any(s.error for s in self.spans)
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = self.summary()
+        with self._lock:
+            data["spans"] = [asdict(s) for s in self.spans]
+        return data
+
+
+class TraceStore:
+    """进行中的 trace + 最近完成的 trace（环形缓冲）"""
+
+    def __init__(self, max_traces: int = 200, export_dir: Optional[str] = None):
+        self.max_traces = max_traces
+        self.export_dir = Path(export_dir) if export_dir else None
+        self._active: Dict[str, Trace] = {}
+        self._recent: "OrderedDict[str, Trace]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def begin(self, trace: Trace) -> None:
+        with self._lock:
+            self._active[trace.trace_id] = trace
+
+    def finish(self, trace: Trace) -> None:
+        with self._lock:
+            self._active.pop(trace.trace_id, None)
+            self._recent[trace.trace_id] = trace
+            self._recent.move_to_end(trace.trace_id)
+            while len(self._recent) > self.max_traces:
+                self._recent.popitem(last=False)
+        if self.export_dir:
+            self._export(trace)
+
+    def _export(self, trace: Trace) -> None:
+        try:
+            self.export_dir.mkdir(parents=True, exist_ok=True)
+            path = self.export_dir / f"{trace.trace_id}.json"
+            path.write_text(json.dumps(trace.to_dict(), ensure_ascii=False, default=str), encoding="utf-8")
+        except OSError as e:
+            logger.warning(f"导出trace失败 {trace.trace_id}: {e}")
+
+    def get(self, trace_id: str) -> Optional[Trace]:
+        with self._lock:
+            return self._active.get(trace_id) or self._recent.get(trace_id)
+
+    def recent(self, limit: int = 50) -> List[Trace]:
+        """最近完成的 trace（新的在前）"""
+        with self._lock:
+            return list(reversed(self._recent.values()))[:limit]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._active.clear()
+            self._recent.clear()
+
+
+trace_store: Optional[TraceStore] = None
+
+
+def get_trace_store() -> TraceStore:
+    """获取全局 trace 存储"""
+    global trace_store
+    if trace_store is None:
+        trace_store = TraceStore(settings.TRACE_BUFFER_SIZE, settings.TRACE_EXPORT_DIR or None)
+    return trace_store
+
+
+# 当前 trace / 当前 span（asyncio 任务创建时复制上下文，子任务中的 span 自动挂到父 span 下）
+_current_trace: contextvars.ContextVar = contextvars.ContextVar("current_trace", default=None)
+_current_span: contextvars.ContextVar = contextvars.ContextVar("current_span", default=None)
+
+
+def current_trace_id() -> Optional[str]:
+    trace = _current_trace.get()
+    return trace.trace_id if trace else None
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+@contextmanager
+def _activate(trace: Trace, name: str, attributes: Dict[str, Any]) -> Iterator[Span]:
+    parent = _current_span.get()
+    if parent is None and trace.spans:
+        parent = trace.spans[0]  # 凭 trace_id 接回时挂到根 span 下
+    span = trace.new_span(name, parent.span_id if parent else None, attributes)
+    trace_token = _current_trace.set(trace)
+    span_token = _current_span.set(span)
+    try:
+        yield span
+    except BaseException as e:
+        span.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        span.duration_ms = round(trace.elapsed_ms() - span.start_offset_ms, 3)
+        _current_span.reset(span_token)
+        _current_trace.reset(trace_token)
+
+
+@contextmanager
+def start_trace(name: str, trace_id: Optional[str] = None, **attributes: Any) -> Iterator[Optional[Span]]:
+    """
+    开始一条 trace（根 span 名为 name）；已在 trace 中时退化为普通 span
+    TRACE_ENABLED=false 时不记录，产出 None
+    """
+    if not settings.TRACE_ENABLED:
+        yield None
+        return
+    if _current_trace.get() is not None:
+        with span(name, **attributes) as child:
+            yield child
+        return
+
+    store = get_trace_store()
+    trace = Trace(name, trace_id)
+    store.begin(trace)
+    try:
+        with _activate(trace, name, attributes) as root:
+            yield root
+    finally:
+        store.finish(trace)
+
+
+@contextmanager
+def span(name: str, trace_id: Optional[str] = None, **attributes: Any) -> Iterator[Optional[Span]]:
+    """
+    在当前 trace 中记录一个 span；不在 trace 中时按 trace_id（如 session_context["trace_id"]）
+    找回进行中的 trace，都没有时不记录，产出 None
+    """
+    trace = _current_trace.get()
+    if trace is None and trace_id:
+        trace = get_trace_store().get(trace_id)
+    if trace is None:
+        yield None
+        return
+    with _activate(trace, name, attributes) as current:
+        yield current
+
+
+def record_span(name: str, started: float, error: Optional[str] = None, **attributes: Any) -> Optional[Span]:
+    """
+    补记一个已结束的 span（started 为 time.perf_counter() 起点）
+    用于异步生成器等不适合切换 contextvars 的场景（如流式 LLM 调用）
+    """
+    trace = _current_trace.get()
+    if trace is None:
+        return None
+    duration_ms = round((time.perf_counter() - started) * 1000, 3)
+    parent = _current_span.get()
+    recorded = trace.new_span(name, parent.span_id if parent else None, attributes)
+    recorded.start_offset_ms = round(recorded.start_offset_ms - duration_ms, 3)
+    recorded.duration_ms = duration_ms
+    recorded.error = error
+    return recorded
+
+
+@contextmanager
+def orchestrator_stage(orchestrator: str, stage: str) -> Iterator[Optional[Span]]:
+    """协作阶段：同时记 span 与 orchestrator_stage_duration_seconds 直方图"""
+    with ORCHESTRATOR_STAGE_DURATION.time(orchestrator=orchestrator, stage=stage), \
+            span(f"orchestrator.{stage}", orchestrator=orchestrator) as current:
+        yield current
+
+
+def traced(name: str):
+    """装饰器：把被装饰的函数 / 协程函数记为一个 span"""
+    def decorator(func):
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with span(name):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -17,6 +17,8 @@ class WebSocketManager:
 
     def __init__(self):
         self.active_connections: Dict[str, WebSocket] = {}
+        # 已发起但尚未写完的消息数（对端读得慢时会堆积）
+        self.pending_sends = 0
 
     async def connect(self, websocket: WebSocket, session_id: str):
         """建立WebSocket连接"""
@@ -35,11 +37,19 @@ class WebSocketManager:
         if session_id in self.active_connections:
             try:
                 websocket = self.active_connections[session_id]
-                await websocket.send_text(json.dumps(message, ensure_ascii=False))
+                await self._send_text(websocket, json.dumps(message, ensure_ascii=False))
             except Exception as e:
                 logger.error(f"❌ 发送WebSocket消息失败 {session_id}: {e}")
                 self.disconnect(session_id)
 
+    async def _send_text(self, websocket: WebSocket, text: str):
+        """写出一条消息，期间计入待发送数"""
+        self.pending_sends += 1
+        try:
+            await websocket.send_text(text)
+        finally:
+            self.pending_sends -= 1
+
     async def broadcast_message(self, message: dict, exclude_session: Optional[str] = None):
         """广播消息给所有连接"""
         disconnected = []
@@ -49,7 +59,7 @@ class WebSocketManager:
                 continue
 
             try:
-                await websocket.send_text(json.dumps(message, ensure_ascii=False))
+                await self._send_text(websocket, json.dumps(message, ensure_ascii=False))
             except Exception as e:
                 logger.error(f"❌ 广播消息失败 {session_id}: {e}")
                 disconnected.append(session_id)
@@ -73,6 +83,10 @@ class WebSocketManager:
         """获取活跃连接数"""
         return len(self.active_connections)
 
+    def get_send_queue_depth(self) -> int:
+        """获取待发送消息数"""
+        return self.pending_sends
+
     def is_connected(self, session_id: str) -> bool:
         """检查指定会话是否连接"""
         return session_id in self.active_connections
\ No newline at end of file